@@ -0,0 +1,72 @@
+"""
+Shared bootstrapping for the benchmark scripts.
+
+Run a benchmark from the project root, e.g.
+    python -m benchmarks.driver_assignment
+
+Each script works on a throwaway test database created from the configured
+DATABASES (SQLite uses a temporary file so worker threads share it).
+"""
+import contextlib
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_django():
+    if PROJECT_ROOT not in sys.path:
+        sys.path.insert(0, PROJECT_ROOT)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "bulk_delivery_project.settings")
+
+    import django
+    django.setup()
+
+
+@contextlib.contextmanager
+def benchmark_database():
+    from django.db import connection, connections
+
+    # Shared by every thread's connection to the default database
+    database = connection.settings_dict
+    tmp_dir = None
+
+    if connection.vendor == "sqlite":
+        tmp_dir = tempfile.mkdtemp(prefix="bench-")
+        database["TEST"]["NAME"] = os.path.join(tmp_dir, "bench.sqlite3")
+        database["OPTIONS"]["timeout"] = 30
+        # Take the write lock up front so concurrent writers wait instead of failing
+        database["OPTIONS"]["transaction_mode"] = "IMMEDIATE"
+
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False
+    )
+    try:
+        yield
+    finally:
+        connections.close_all()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        if tmp_dir:
+            os.rmdir(tmp_dir)
+
+
+def timed(func, repeat):
+    """
+    Call func() `repeat` times; return per-call latencies in milliseconds.
+    """
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return f"mean {statistics.mean(samples):8.3f} ms   p95 {p95:8.3f} ms"
@@ -0,0 +1,289 @@
+"""
+WSGI vs ASGI load benchmark for the driver endpoints.
+
+--drivers drivers work through their deliveries at the same time. Each one
+searches its assigned deliveries and picks one up, once per package, then
+searches again and delivers each package: 4 requests per package. The same
+workload runs three ways, in process with no network server:
+
+- wsgi: the sync views behind Django's WSGI handler, served by a pool of
+  --threads worker threads (a threaded gunicorn worker); requests beyond
+  the pool wait in its queue;
+- asgi sync views: the sync views behind the ASGI handler, which runs each
+  one in a thread;
+- asgi async views: ASYNC_VIEWS=True, the async search and update views.
+
+Latency is measured per request from the moment the driver sends it, so
+queueing counts. Throttling is switched off for the run.
+
+    python -m benchmarks.async_views [--drivers 500] [--packages 2] [--threads 32] [--repeat 3]
+"""
+import argparse
+import asyncio
+import io
+import json
+import statistics
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from ._setup import benchmark_database, setup_django
+
+HOST = "localhost"
+
+
+def seed(riders, packages_per_rider):
+    """
+    One assigned order of `packages_per_rider` packages per rider. Returns
+    {rider_id: [package ids]}.
+    """
+
+    from django.db import transaction
+    from delivery.models import Delivery
+    from delivery.utils import generate_delivery_ids
+    from order.models import Order, Package
+    from order.utils import generate_order_ids, generate_package_ids
+
+    with transaction.atomic():
+        Delivery.objects.all().delete()
+        Package.objects.all().delete()
+        Order.objects.all().delete()
+
+        orders = Order.objects.bulk_create(
+            [
+                Order(
+                    id=order_id,
+                    customer_id=customer,
+                    driver_id=rider,
+                    order_status=Order.Status.ASSIGNED,
+                    pickup_address="Accra",
+                )
+                for order_id, (customer, rider) in zip(generate_order_ids(len(riders)), riders)
+            ],
+            batch_size=500,
+        )
+        packages = Package.objects.bulk_create(
+            [
+                Package(id=package_id, order_id=order, description="Box", value=10)
+                for order in orders
+                for package_id in generate_package_ids(packages_per_rider)
+            ],
+            batch_size=500,
+        )
+        Delivery.objects.bulk_create(
+            [
+                Delivery(id=delivery_id, package_id=package, rider=package.order_id.driver_id, address="Tema")
+                for delivery_id, package in zip(generate_delivery_ids(len(packages)), packages)
+            ],
+            batch_size=500,
+        )
+
+    assigned = {}
+    for package in packages:
+        assigned.setdefault(package.order_id.driver_id.pk, []).append(package.id)
+    return assigned
+
+
+def driver_requests(package_ids):
+    """
+    (method, path, query string, JSON body) of one driver's session, in order.
+    """
+
+    for status in ("picked_up", "delivered"):
+        for package_id in package_ids:
+            yield "GET", "/api/v1/search/delivery/", "delivery_status=assigned&pagination=cursor", None
+            yield "PUT", "/api/v1/delivery/update/", "", {"package_id": package_id, "delivery_status": status}
+
+
+def wsgi_call(application, token, method, path, query, body):
+    payload = json.dumps(body).encode() if body is not None else b""
+    environ = {
+        "REQUEST_METHOD": method,
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "SCRIPT_NAME": "",
+        "SERVER_NAME": HOST,
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": HOST,
+        "HTTP_AUTHORIZATION": f"Bearer {token}",
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(payload)),
+        "wsgi.input": io.BytesIO(payload),
+        "wsgi.errors": sys.stderr,
+        "wsgi.url_scheme": "http",
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+        "wsgi.version": (1, 0),
+    }
+    status = []
+
+    result = application(environ, lambda line, headers, exc_info=None: status.append(line))
+    try:
+        b"".join(result)
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+
+    return int(status[0].split()[0])
+
+
+async def asgi_call(application, token, method, path, query, body):
+    payload = json.dumps(body).encode() if body is not None else b""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [
+            (b"host", HOST.encode()),
+            (b"authorization", f"Bearer {token}".encode()),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(payload)).encode()),
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": (HOST, 80),
+    }
+    messages = [{"type": "http.request", "body": payload, "more_body": False}]
+    status = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # The client stays connected; the handler cancels this wait
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await application(scope, receive, send)
+    return status[0]
+
+
+async def run_drivers(call, tokens, assigned):
+    """
+    Every driver's session at once; returns (wall seconds, request
+    latencies in ms, Counter of failed requests' status codes).
+    """
+
+    latencies = []
+    failures = Counter()
+
+    async def driver(rider_id):
+        for request in driver_requests(assigned[rider_id]):
+            start = time.perf_counter()
+            status = await call(tokens[rider_id], *request)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status >= 400:
+                failures[status] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(driver(rider_id) for rider_id in assigned))
+    return time.perf_counter() - start, latencies, failures
+
+
+def use_async_views(enabled):
+    import importlib
+    from django.conf import settings
+    from django.urls import clear_url_caches
+    import bulk_delivery_project.urls
+    import delivery.urls
+    import order.urls
+
+    settings.ASYNC_VIEWS = enabled
+    for module in (order.urls, delivery.urls, bulk_delivery_project.urls):
+        importlib.reload(module)
+    clear_url_caches()
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--drivers", type=int, default=500)
+    parser.add_argument("--packages", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.asgi import get_asgi_application
+    from django.core.wsgi import get_wsgi_application
+    from rest_framework.settings import api_settings
+    from rest_framework_simplejwt.tokens import AccessToken
+    from core.testing import clear_caches
+    from customer.models import CustomUser, DriverProfile
+
+    # The throttle classes share this dict; no rate means no throttling
+    for scope in ("user", "anon"):
+        api_settings.DEFAULT_THROTTLE_RATES[scope] = None
+
+    with benchmark_database():
+        customer = CustomUser.objects.create_user(
+            email="customer@bench.local", phone_number="bench", role="customer"
+        )
+        drivers = [
+            CustomUser.objects.create_user(
+                email=f"driver{index}@bench.local", phone_number=f"bench-{index}", role="driver", is_active=True
+            )
+            for index in range(args.drivers)
+        ]
+        DriverProfile.objects.update(is_complete=True, is_approved=True, approval_status="approved")
+
+        riders = [(customer, driver.driverprofile) for driver in drivers]
+        tokens = {driver.driverprofile.pk: str(AccessToken.for_user(driver)) for driver in drivers}
+
+        pool = ThreadPoolExecutor(max_workers=args.threads)
+        wsgi = get_wsgi_application()
+        asgi = get_asgi_application()
+
+        async def wsgi_request(*request):
+            return await asyncio.get_running_loop().run_in_executor(pool, wsgi_call, wsgi, *request)
+
+        async def asgi_request(*request):
+            return await asgi_call(asgi, *request)
+
+        setups = [
+            (f"wsgi ({args.threads} threads)", False, wsgi_request),
+            ("asgi sync views", False, asgi_request),
+            ("asgi async views", True, asgi_request),
+        ]
+
+        requests = args.drivers * args.packages * 4
+        print(f"{args.drivers} concurrent drivers, {requests} requests per run")
+
+        for name, async_views, call in setups:
+            use_async_views(async_views)
+            throughput = []
+            latencies = []
+            failures = Counter()
+
+            for _ in range(args.repeat):
+                assigned = seed(riders, args.packages)
+                clear_caches()
+                seconds, samples, failed = asyncio.run(run_drivers(call, tokens, assigned))
+                throughput.append(len(samples) / seconds)
+                latencies += samples
+                failures.update(failed)
+
+            print(
+                f"  {name:<20} {statistics.mean(throughput):7.0f} req/s   "
+                f"p50 {percentile(latencies, 0.5):8.1f} ms   p99 {percentile(latencies, 0.99):8.1f} ms   "
+                f"{sum(failures.values())} failed {dict(failures) or ''}"
+            )
+
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Driver auto-assignment benchmark.
+
+1. Latency of claiming a driver as the order table grows, for the legacy
+   anti-join (exclude drivers with open orders) and order.services.claim_driver.
+2. Concurrent order creation from several threads, checking that no driver
+   ends up with more open orders than MAX_OPEN_ORDERS_PER_DRIVER.
+
+    python -m benchmarks.driver_assignment [--threads 8] [--orders-per-thread 25]
+"""
+import argparse
+import datetime
+import threading
+from ._setup import benchmark_database, setup_django, summarize, timed
+
+ORDER_TABLE_SIZES = [0, 1_000, 10_000, 50_000]
+DRIVERS = 200
+REPEAT = 200
+
+
+def make_drivers(count, prefix):
+    from customer.models import CustomUser, DriverProfile
+
+    users = CustomUser.objects.bulk_create([
+        CustomUser(
+            email=f"{prefix}{i}@bench.local",
+            username=f"{prefix}{i}",
+            phone_number=f"{prefix}{i}",
+            role=CustomUser.Role.DRIVER,
+        )
+        for i in range(count)
+    ])
+    return DriverProfile.objects.bulk_create([
+        DriverProfile(
+            user=user,
+            is_complete=True,
+            approval_status="approved",
+            is_approved=True,
+        )
+        for user in users
+    ])
+
+
+def grow_orders(customer, drivers, target):
+    from order.models import Order
+    from order.utils import generate_order_id
+
+    missing = target - Order.objects.count()
+    if missing <= 0:
+        return
+
+    # Historical orders are closed, so they only add rows to the anti-join
+    Order.objects.bulk_create(
+        [
+            Order(
+                id=generate_order_id(),
+                customer_id=customer,
+                driver_id=drivers[i % len(drivers)],
+                order_status=Order.Status.DELIVERED,
+                created_at=datetime.date(2025, 1, 1),
+            )
+            for i in range(missing)
+        ],
+        batch_size=2000,
+    )
+
+
+def busy_drivers(customer, drivers):
+    """
+    Give the first half of the drivers an open order, so a claim has to
+    skip past them.
+    """
+
+    from order.models import Order
+    from order.utils import generate_order_id
+    from django.db.models import F
+    from customer.models import DriverProfile
+
+    busy = drivers[:len(drivers) // 2]
+    Order.objects.bulk_create([
+        Order(
+            id=generate_order_id(),
+            customer_id=customer,
+            driver_id=driver,
+            order_status=Order.Status.ASSIGNED,
+        )
+        for driver in busy
+    ])
+    DriverProfile.objects.filter(pk__in=[driver.pk for driver in busy]).update(
+        active_orders=F("active_orders") + 1
+    )
+
+
+def legacy_claim():
+    from customer.models import DriverProfile
+
+    return (
+        DriverProfile.objects
+        .filter(availability_status=True, is_complete=True, approval_status="approved")
+        .exclude(dorders__order_status__in=["pending", "assigned"])
+        .first()
+    )
+
+
+def service_claim():
+    from django.db import transaction
+    from order.services import claim_driver
+
+    # Rolled back so every sample sees the same driver pool
+    with transaction.atomic():
+        claim_driver()
+        transaction.set_rollback(True)
+
+
+def latency_benchmark(customer):
+    drivers = make_drivers(DRIVERS, "latency")
+    busy_drivers(customer, drivers)
+
+    print("Claim latency as the order table grows")
+    for size in ORDER_TABLE_SIZES:
+        grow_orders(customer, drivers, size)
+        print(f"  {size:>7} orders  legacy anti-join  {summarize(timed(legacy_claim, REPEAT))}")
+        print(f"  {size:>7} orders  claim_driver      {summarize(timed(service_claim, REPEAT))}")
+
+
+def concurrency_benchmark(customer, threads, orders_per_thread):
+    from customer.models import DriverProfile
+    from django.db import close_old_connections, connection
+    from django.db.models import Count, Q
+    from order.models import Order
+    from order.services import MAX_OPEN_ORDERS_PER_DRIVER, claim_driver
+    from django.db import transaction
+
+    DriverProfile.objects.update(availability_status=False)
+    make_drivers(threads * orders_per_thread // 2, "concurrent")
+
+    errors = []
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        try:
+            barrier.wait()
+            for _ in range(orders_per_thread):
+                with transaction.atomic():
+                    driver = claim_driver()
+                    Order.objects.create(
+                        customer_id=customer,
+                        driver_id=driver,
+                        order_status="assigned" if driver else "pending",
+                    )
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            close_old_connections()
+            connection.close()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    overloaded = (
+        DriverProfile.objects
+        .annotate(open_orders=Count("dorders", filter=Q(dorders__order_status="assigned")))
+        .filter(open_orders__gt=MAX_OPEN_ORDERS_PER_DRIVER)
+        .count()
+    )
+    assigned = Order.objects.filter(order_status="assigned", created_at__gt=datetime.date(2025, 1, 1)).count()
+
+    print(f"Concurrent creation: {threads} threads x {orders_per_thread} orders")
+    print(f"  assigned {assigned}, drivers over limit {overloaded}, errors {len(errors)}")
+    for exc in errors[:5]:
+        print(f"  error: {exc!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--orders-per-thread", type=int, default=25)
+    args = parser.parse_args()
+
+    setup_django()
+    from customer.models import CustomUser
+
+    with benchmark_database():
+        customer = CustomUser.objects.create_user(
+            email="customer@bench.local", phone_number="bench", role="customer"
+        )
+        latency_benchmark(customer)
+        concurrency_benchmark(customer, args.threads, args.orders_per_thread)
+
+
+if __name__ == "__main__":
+    main()
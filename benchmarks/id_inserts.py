@@ -0,0 +1,95 @@
+"""
+Primary key insert throughput benchmark.
+
+Bulk inserts --rows packages in batches of --batch-size with ids from the
+original random-hex scheme (RandomHexIdGenerator) and from the time-ordered
+one (TimeOrderedIdGenerator), reporting overall rows/s, the rate over the
+last tenth of the table (where random keys scatter across a large index),
+how many generated ids collided with earlier ones, and the cost of
+generating the ids alone.
+
+    python -m benchmarks.id_inserts [--rows 200000] [--batch-size 1000]
+"""
+import argparse
+import time
+from ._setup import benchmark_database, setup_django, summarize, timed
+
+
+def insert_packages(order, generator, rows, batch_size):
+    from django.db import transaction
+    from order.models import Package
+
+    batch_seconds = []
+    issued = set()
+    collisions = 0
+
+    for _ in range(0, rows, batch_size):
+        ids = generator.generate_batch("PKG", batch_size)
+
+        # Ids already in the table would fail the insert; count and replace them
+        while issued.intersection(ids):
+            clashes = issued.intersection(ids)
+            collisions += len(clashes)
+            ids = [pk for pk in ids if pk not in clashes] + generator.generate_batch("PKG", len(clashes))
+        issued.update(ids)
+
+        packages = [
+            Package(
+                id=package_id,
+                order_id=order,
+                description="Box",
+                receiver_name="Ama Mensah",
+                receiver_phone="+233200000000",
+            )
+            for package_id in ids
+        ]
+
+        start = time.perf_counter()
+        with transaction.atomic():
+            Package.objects.bulk_create(packages, batch_size=batch_size)
+        batch_seconds.append(time.perf_counter() - start)
+
+    return batch_seconds, collisions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+    from core.ids import RandomHexIdGenerator, TimeOrderedIdGenerator
+    from customer.models import CustomUser
+    from order.models import Order, Package
+
+    generators = [RandomHexIdGenerator(), TimeOrderedIdGenerator()]
+
+    print(f"Generating {args.batch_size} ids")
+    for generator in generators:
+        samples = timed(lambda: generator.generate_batch("PKG", args.batch_size), 20)
+        print(f"  {type(generator).__name__:<24} {summarize(samples)}")
+
+    with benchmark_database():
+        customer = CustomUser.objects.create_user(
+            email="customer@bench.local", phone_number="bench", role="customer"
+        )
+        order = Order.objects.create(customer_id=customer)
+
+        print(f"\nInserting {args.rows} packages, {args.batch_size} per batch")
+        for generator in generators:
+            Package.objects.all().delete()
+
+            batches, collisions = insert_packages(order, generator, args.rows, args.batch_size)
+            tail = batches[-max(1, len(batches) // 10):]
+
+            print(
+                f"  {type(generator).__name__:<24} "
+                f"{args.rows / sum(batches):9.0f} rows/s overall   "
+                f"{len(tail) * args.batch_size / sum(tail):9.0f} rows/s last 10%   "
+                f"{collisions} id collision(s)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Order pickup benchmark.
+
+Picks up orders of 1 to 1,000 packages through OrderUpdateSerializer (one
+aggregate ownership check and one UPDATE) and through the previous
+per-delivery implementation, reproduced here, which dereferenced
+delivery.rider.user for every delivery and saved each delivery on its own.
+
+    python -m benchmarks.order_pickup [--sizes 1 10 100 1000] [--repeat 3]
+"""
+import argparse
+import time
+from types import SimpleNamespace
+from ._setup import benchmark_database, setup_django, summarize
+
+
+def seed_order(customer, rider, size):
+    from delivery.models import Delivery
+    from delivery.utils import generate_delivery_ids
+    from order.models import Order, Package
+    from order.utils import generate_package_ids
+
+    order = Order.objects.create(
+        customer_id=customer, driver_id=rider, order_status=Order.Status.ASSIGNED
+    )
+    packages = Package.objects.bulk_create(
+        [
+            Package(
+                id=package_id,
+                order_id=order,
+                description="Box",
+                receiver_name="Ama Mensah",
+                receiver_phone="+233200000000",
+            )
+            for package_id in generate_package_ids(size)
+        ],
+        batch_size=500,
+    )
+    Delivery.objects.bulk_create(
+        [
+            Delivery(id=delivery_id, package_id=package, rider=rider)
+            for delivery_id, package in zip(generate_delivery_ids(size), packages)
+        ],
+        batch_size=500,
+    )
+    return order
+
+
+def per_delivery_pickup(order, user):
+    from django.db import transaction
+    from django.utils import timezone
+    from delivery.models import Delivery
+    from order.models import Order
+    from order.services import release_driver
+
+    for delivery in Delivery.objects.filter(package_id__order_id=order.id):
+        if delivery.rider.user != user:
+            raise ValueError("You can only update orders assigned to you.")
+
+    with transaction.atomic():
+        order = Order.objects.select_for_update().get(pk=order.pk)
+        now = timezone.now()
+
+        for delivery in Delivery.objects.select_for_update().filter(package_id__order_id=order.id):
+            delivery.delivery_status = Delivery.Status.PICKED_UP
+            delivery.picked_up_at = now
+            delivery.save()
+
+        release_driver(order)
+        order.order_status = Order.Status.IN_TRANSIT
+        order.save(update_fields=["order_status"])
+
+
+def set_based_pickup(order, user):
+    from order.serializers import OrderUpdateSerializer
+
+    serializer = OrderUpdateSerializer(
+        data={"order_id": order.pk, "status": "picked_up"},
+        context={"request": SimpleNamespace(user=user)},
+    )
+    serializer.is_valid(raise_exception=True)
+    serializer.save()
+
+
+def measure(pickup, customer, driver, size, repeat):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    samples = []
+    queries = 0
+    for _ in range(repeat):
+        order = seed_order(customer, driver.driverprofile, size)
+        # The query log is capped; start every run with an empty one
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            pickup(order, driver)
+            samples.append((time.perf_counter() - start) * 1000)
+        queries = len(captured)
+    return samples, queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from customer.models import CustomUser
+
+    with benchmark_database():
+        customer = CustomUser.objects.create_user(
+            email="customer@bench.local", phone_number="bench", role="customer"
+        )
+        driver = CustomUser.objects.create_user(
+            email="driver@bench.local", phone_number="bench-driver", role="driver"
+        )
+
+        # Warm up imports and the cached permission context
+        for pickup in (per_delivery_pickup, set_based_pickup):
+            measure(pickup, customer, driver, 1, 1)
+
+        for size in args.sizes:
+            old_samples, old_queries = measure(per_delivery_pickup, customer, driver, size, args.repeat)
+            new_samples, new_queries = measure(set_based_pickup, customer, driver, size, args.repeat)
+            speedup = sum(old_samples) / sum(new_samples)
+
+            print(f"{size} package(s)")
+            print(f"  {'per delivery':<12} {old_queries:5d} queries   {summarize(old_samples)}")
+            print(f"  {'set based':<12} {new_queries:5d} queries   {summarize(new_samples)}   {speedup:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Rider performance benchmark.
+
+Seeds --deliveries delivered deliveries spread over --riders riders and
+--days days, then times:
+
+- the ad hoc report: every delivered delivery read back and reduced per
+  rider to throughput, on-time rate and exact median latency in Python;
+- a full refresh_rider_performance rebuild;
+- an incremental refresh after one more day of deliveries;
+- a page of the summary endpoint's queryset.
+
+    python -m benchmarks.rider_performance [--deliveries 100000] [--riders 200] [--days 90] [--repeat 3]
+"""
+import argparse
+import datetime
+import random
+import statistics
+from ._setup import benchmark_database, setup_django, summarize, timed
+
+
+def seed(customer, riders, count, start, days):
+    """
+    `count` delivered deliveries with delivered_at spread over `days` days from `start`.
+    """
+
+    from django.db import transaction
+    from delivery.models import Delivery
+    from delivery.utils import generate_delivery_ids
+    from order.models import Order, Package
+    from order.utils import generate_order_ids, generate_package_ids
+
+    rng = random.Random(count)
+    batch = 5000
+
+    for offset in range(0, count, batch):
+        size = min(batch, count - offset)
+        with transaction.atomic():
+            orders = Order.objects.bulk_create(
+                [
+                    Order(
+                        id=order_id,
+                        customer_id=customer,
+                        delivery_date=(start + datetime.timedelta(days=rng.randrange(days) + 1)).date(),
+                    )
+                    for order_id in generate_order_ids(size)
+                ],
+                batch_size=500,
+            )
+            packages = Package.objects.bulk_create(
+                [
+                    Package(id=package_id, order_id=order, description="Box")
+                    for package_id, order in zip(generate_package_ids(size), orders)
+                ],
+                batch_size=500,
+            )
+
+            deliveries = []
+            for delivery_id, package in zip(generate_delivery_ids(size), packages):
+                delivered_at = start + datetime.timedelta(seconds=rng.randrange(days * 86400))
+                deliveries.append(Delivery(
+                    id=delivery_id,
+                    package_id=package,
+                    rider=rng.choice(riders),
+                    delivery_status=Delivery.Status.DELIVERED,
+                    picked_up_at=delivered_at,
+                    delivered_at=delivered_at,
+                ))
+            Delivery.objects.bulk_create(deliveries, batch_size=500)
+
+            # assigned_at is auto_now_add; move it before the delivery
+            for delivery in deliveries:
+                delivery.assigned_at = delivery.delivered_at - datetime.timedelta(minutes=rng.randrange(5, 600))
+            Delivery.objects.bulk_update(deliveries, ["assigned_at"], batch_size=500)
+
+
+def ad_hoc_report():
+    from collections import defaultdict
+    from django.utils import timezone
+    from delivery.models import Delivery
+
+    latencies = defaultdict(list)
+    scheduled = defaultdict(int)
+    on_time = defaultdict(int)
+
+    rows = (
+        Delivery.objects
+        .filter(rider__isnull=False, delivered_at__isnull=False)
+        .values_list("rider_id", "assigned_at", "delivered_at", "package_id__order_id__delivery_date")
+    )
+    for rider_id, assigned_at, delivered_at, delivery_date in rows.iterator(chunk_size=2000):
+        latencies[rider_id].append((delivered_at - assigned_at).total_seconds())
+        if delivery_date is not None:
+            scheduled[rider_id] += 1
+            on_time[rider_id] += timezone.localdate(delivered_at) <= delivery_date
+
+    return {
+        rider_id: (len(values), on_time[rider_id] / scheduled[rider_id], statistics.median(values))
+        for rider_id, values in latencies.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--deliveries", type=int, default=100_000)
+    parser.add_argument("--riders", type=int, default=200)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.utils import timezone
+    from customer.models import CustomUser
+    from delivery.models import RiderPerformanceSummary
+    from delivery.performance import refresh_rider_performance
+
+    no_lag = datetime.timedelta(0)
+
+    with benchmark_database():
+        customer = CustomUser.objects.create_user(
+            email="customer@bench.local", phone_number="bench", role="customer"
+        )
+        riders = [
+            CustomUser.objects.create_user(
+                email=f"driver{index}@bench.local", phone_number=f"bench-{index}", role="driver"
+            ).driverprofile
+            for index in range(args.riders)
+        ]
+
+        # History ends --repeat days ago; each incremental refresh adds one of those days
+        history_end = timezone.now() - datetime.timedelta(days=args.repeat)
+        seed(customer, riders, args.deliveries, history_end - datetime.timedelta(days=args.days), args.days)
+        print(f"{args.deliveries} deliveries, {args.riders} riders, {args.days} days")
+
+        print(f"  {'ad hoc report':<22} {summarize(timed(ad_hoc_report, args.repeat))}")
+
+        full = timed(lambda: refresh_rider_performance(lag=timezone.now() - history_end, full=True), args.repeat)
+        print(f"  {'full refresh':<22} {summarize(full)}")
+
+        # One more day of deliveries on top of the refreshed summaries
+        daily = args.deliveries // args.days
+        incremental = []
+        processed = []
+        for day in range(args.repeat):
+            day_start = history_end + datetime.timedelta(days=day)
+            seed(customer, riders, daily, day_start, 1)
+            lag = timezone.now() - (day_start + datetime.timedelta(days=1))
+            incremental += timed(lambda: processed.append(refresh_rider_performance(lag=lag)), 1)
+        print(f"  {'incremental (1 day)':<22} {summarize(incremental)}   ({min(processed)}-{max(processed)} deliveries per refresh)")
+
+        page = lambda: list(RiderPerformanceSummary.objects.order_by("-delivered", "rider")[:10])
+        print(f"  {'summary page read':<22} {summarize(timed(page, 20))}")
+
+        exact = ad_hoc_report()
+        refresh_rider_performance(lag=no_lag, full=True)
+        errors = [
+            abs(summary.median_latency_seconds - exact[summary.rider_id][2]) / exact[summary.rider_id][2]
+            for summary in RiderPerformanceSummary.objects.filter(rider_id__in=list(exact))
+        ]
+        print(f"  histogram median error vs exact: mean {statistics.mean(errors):.1%}, max {max(errors):.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+List serialization benchmark.
+
+Renders 10k-row exports of orders (with nested packages), packages and
+deliveries to JSON through the ModelSerializers and through the values()
+read path used by the search endpoints. Both outputs are compared byte for
+byte before timing.
+
+    python -m benchmarks.serialization [--rows 10000] [--repeat 5]
+"""
+import argparse
+import datetime
+from ._setup import benchmark_database, setup_django, summarize, timed
+
+PACKAGES_PER_ORDER = 2
+
+
+def seed(rows):
+    from customer.models import CustomUser, DriverProfile
+    from delivery.models import Delivery
+    from delivery.utils import generate_delivery_ids
+    from django.utils import timezone
+    from order.models import Order, Package
+    from order.utils import generate_order_id, generate_package_ids
+
+    customer = CustomUser.objects.create_user(
+        email="customer@bench.local", phone_number="bench", role="customer"
+    )
+    driver = CustomUser.objects.create_user(
+        email="driver@bench.local", phone_number="bench-driver", role="driver"
+    )
+    rider = DriverProfile.objects.get(user=driver)
+
+    orders = Order.objects.bulk_create(
+        [
+            Order(
+                id=generate_order_id(),
+                customer_id=customer,
+                driver_id=rider if i % 2 else None,
+                pickup_address=f"Pickup {i}",
+                total_price=i * 1.5,
+                created_at=datetime.date(2026, 1, 1) + datetime.timedelta(days=i % 90),
+            )
+            for i in range(rows)
+        ],
+        batch_size=2000,
+    )
+
+    package_ids = iter(generate_package_ids(rows * PACKAGES_PER_ORDER))
+    packages = Package.objects.bulk_create(
+        [
+            Package(
+                id=next(package_ids),
+                order_id=order,
+                description="Box",
+                dimensions="Small",
+                value=10.0 + j,
+                receiver_name="Ama Mensah",
+                receiver_phone="+233200000000",
+            )
+            for order in orders
+            for j in range(PACKAGES_PER_ORDER)
+        ],
+        batch_size=2000,
+    )
+
+    now = timezone.now()
+    Delivery.objects.bulk_create(
+        [
+            Delivery(
+                id=delivery_id,
+                package_id=package,
+                rider=rider,
+                address="Accra",
+                picked_up_at=now if i % 3 else None,
+            )
+            for i, (delivery_id, package) in enumerate(
+                zip(generate_delivery_ids(rows), packages[:rows])
+            )
+        ],
+        batch_size=2000,
+    )
+
+
+def exports():
+    from delivery.models import Delivery
+    from delivery.serializers import DeliverySerializer
+    from order.models import Order, Package
+    from order.serializers import OrderSerializer, PackageSerializer
+
+    return [
+        ("orders + packages", OrderSerializer, Order.objects.prefetch_related("packages").order_by("-created_at", "id")),
+        ("packages", PackageSerializer, Package.objects.order_by("-value", "id")),
+        ("deliveries", DeliverySerializer, Delivery.objects.order_by("-assigned_at", "id")),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from core.serializers import values_serializer_for
+    from rest_framework.renderers import JSONRenderer
+
+    renderer = JSONRenderer()
+
+    with benchmark_database():
+        seed(args.rows)
+
+        for label, serializer_class, queryset in exports():
+            values = values_serializer_for(serializer_class)
+
+            def model_path():
+                return renderer.render(serializer_class(queryset.all(), many=True).data)
+
+            def values_path():
+                return renderer.render(values.to_representation(values.values(queryset.all())))
+
+            if model_path() != values_path():
+                raise SystemExit(f"{label}: values() output differs from {serializer_class.__name__}")
+
+            model_samples = timed(model_path, args.repeat)
+            values_samples = timed(values_path, args.repeat)
+            speedup = sum(model_samples) / sum(values_samples)
+
+            print(f"{label} ({queryset.count()} rows, identical output)")
+            print(f"  {serializer_class.__name__:<22} {summarize(model_samples)}")
+            print(f"  {'values() read path':<22} {summarize(values_samples)}   {speedup:4.1f}x")
+
+
+if __name__ == "__main__":
+    main()
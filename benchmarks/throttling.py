@@ -0,0 +1,118 @@
+"""
+Throttle check overhead benchmark.
+
+Times UserRateThrottle.allow_request per request against each cache backend
+the "throttle" alias can point at: the in-process LocMem default, the
+SQLite-backed DatabaseCache and FileBasedCache stand-ins, and Redis when
+--redis-url is given. Requests cycle through --users users so histories
+stay at realistic lengths.
+
+It then compares the list-history UserRateThrottle with the fixed-memory
+SlidingWindowRateThrottle for one busy client on LocMem as the allowed rate
+(and so the stored history) grows.
+
+    python -m benchmarks.throttling [--requests 5000] [--users 500] [--repeat 3] [--redis-url redis://localhost:6379/15]
+"""
+import argparse
+import shutil
+import tempfile
+from ._setup import benchmark_database, setup_django, timed
+
+
+def backends(file_dir, redis_url):
+    # Large enough that no history is culled mid-run
+    options = {"MAX_ENTRIES": 100_000}
+    configured = {
+        "locmem": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "bench"},
+        "database (sqlite)": {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "bench_cache"},
+        "file": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": file_dir},
+    }
+    for config in configured.values():
+        config["OPTIONS"] = options
+    if redis_url:
+        configured["redis"] = {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": redis_url}
+    return configured
+
+
+def history_growth(request, requests, repeat):
+    from core.throttles import SlidingWindowRateThrottle, UserRateThrottle
+
+    class SlidingWindowThrottle(SlidingWindowRateThrottle):
+        scope = "bench"
+
+    print("\nOne client, rate N/hour (locmem)")
+    for allowed in (10, 100, 1000):
+        for throttle_class in (UserRateThrottle, SlidingWindowThrottle):
+            throttle_class.cache.clear()
+            rate = f"{allowed}/hour"
+
+            def check():
+                for _ in range(requests):
+                    throttle = throttle_class.__new__(throttle_class)
+                    throttle.rate = rate
+                    throttle.num_requests, throttle.duration = throttle.parse_rate(rate)
+                    throttle.allow_request(request, None)
+
+            samples = timed(check, repeat)
+            per_check = sum(samples) * 1000 / (requests * repeat)
+            print(f"  N={allowed:<5} {throttle_class.__name__:<24} {per_check:8.1f} us/check")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--redis-url")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.core.cache import caches
+    from django.core.management import call_command
+    from django.test import override_settings
+    from rest_framework.test import APIRequestFactory
+    from types import SimpleNamespace
+    from core.throttles import UserRateThrottle
+
+    factory = APIRequestFactory()
+    requests = []
+    for index in range(args.users):
+        request = factory.get("/api/v1/search/order/")
+        request.user = SimpleNamespace(is_authenticated=True, pk=index)
+        requests.append(request)
+
+    file_dir = tempfile.mkdtemp(prefix="bench-cache-")
+    try:
+        with benchmark_database():
+            configured = backends(file_dir, args.redis_url)
+
+            for label, config in configured.items():
+                with override_settings(CACHES={**settings.CACHES, "throttle": config}):
+                    if config["BACKEND"].endswith("DatabaseCache"):
+                        call_command("createcachetable", verbosity=0)
+                    caches["throttle"].clear()
+
+                    throttled = 0
+
+                    def check():
+                        nonlocal throttled
+                        for index in range(args.requests):
+                            if not UserRateThrottle().allow_request(requests[index % args.users], None):
+                                throttled += 1
+
+                    samples = timed(check, args.repeat)
+                    # Milliseconds per round of checks -> microseconds per check
+                    per_check = [sample * 1000 / args.requests for sample in samples]
+                    print(
+                        f"{label:<18} mean {sum(per_check) / len(per_check):8.1f} us/check   "
+                        f"({args.requests} checks x {args.repeat}, {throttled} throttled)"
+                    )
+
+        history_growth(requests[0], args.requests, args.repeat)
+    finally:
+        shutil.rmtree(file_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     'customer',
     'order',
     'delivery',
+    'core',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -55,6 +56,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,7 +64,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'django_auto_logout.middleware.auto_logout',
+    'core.middleware.AutoLogoutMiddleware',
 ]
 
 ROOT_URLCONF = 'bulk_delivery_project.urls'
@@ -129,7 +131,9 @@ AUTO_LOGOUT = {'IDLE_TIME' : 1800, 'REDIRECT_TO_LOGIN_IMMEDIATELY': True,
                }
 
 
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# OTP emails are queued in EmailOutbox and sent by `python manage.py send_outbox`
+EMAIL_BACKEND = env('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
+EMAIL_FILE_PATH = env('EMAIL_FILE_PATH', default=str(BASE_DIR / 'sent_emails'))
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
@@ -155,13 +159,18 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
  
+# Authenticate from the access token's permission claims instead of loading the user on every request
+JWT_STATELESS_AUTH = env.bool('JWT_STATELESS_AUTH', default=False)
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
+    'customer.authentication.StatelessJWTAuthentication'
+    if JWT_STATELESS_AUTH else
     'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.UserRateThrottle",
-        "rest_framework.throttling.AnonRateThrottle",
+        "core.throttles.UserRateThrottle",
+        "core.throttles.AnonRateThrottle",
     ],
     "DEFAULT_THROTTLE_RATES": {
         "anon": "5/minute",
@@ -178,6 +187,9 @@ REST_FRAMEWORK = {
         "rest_framework.pagination.PageNumberPagination",
 
     "PAGE_SIZE": 10,
+
+    # Money fields are Decimal; render them as JSON numbers, as before
+    "COERCE_DECIMAL_TO_STRING": False,
 }
 
 SPECTACULAR_SETTINGS = {
@@ -187,8 +199,40 @@ SPECTACULAR_SETTINGS = {
     'SERVE_INCLUDE_SCHEMA': False,
 }
 
+# Adds X-DB-Query-Count / X-DB-Query-Time-ms headers to every response
+QUERY_BUDGET_HEADERS = env.bool('QUERY_BUDGET_HEADERS', default=False)
+
+# Route the search endpoints and driver delivery updates to their async views; only worth it under ASGI
+ASYNC_VIEWS = env.bool('ASYNC_VIEWS', default=False)
+
+# Prebuilt schema files served by /api/schema/ (python manage.py build_schema)
+SCHEMA_CACHE_DIR = BASE_DIR / "schema"
+
 AUTH_USER_MODEL = "customer.CustomUser"
 
+# Primary keys of orders, packages, deliveries and payments (see core/ids.py)
+ID_GENERATOR = env.str('ID_GENERATOR', default='core.ids.TimeOrderedIdGenerator')
+
+# Shared cache for permission contexts and the token blacklist, and for
+# throttle counters unless THROTTLE_CACHE_URL sets a separate one.
+# Use Redis in production (CACHE_URL=redis://localhost:6379/0); the
+# in-process default is only correct with a single worker, and
+# `manage.py check --deploy` warns about it. For several
+# local workers without Redis, dbcache://cache_table (after
+# `python manage.py createcachetable`) or filecache:///tmp/bulk-delivery-cache
+# shares state through SQLite or the filesystem. Django culls these
+# backends past MAX_ENTRIES (300 unless set), dropping throttle histories,
+# so size it above the number of active clients.
+CACHES = {
+    'default': env.cache_url('CACHE_URL', default='locmemcache://default?MAX_ENTRIES=10000'),
+    'throttle': env.cache_url(
+        'THROTTLE_CACHE_URL', default=env.str('CACHE_URL', default='locmemcache://throttle?MAX_ENTRIES=10000')
+    ),
+}
+
+# Seconds a user's cached permission context (role, profile completeness, approval) is reused
+PERMISSION_CONTEXT_TTL = 60
+
 # Internationalization
 # https://docs.djangoproject.com/en/6.0/topics/i18n/
 
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Cache backends whose entries are only seen by the process that wrote them
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+# Cache alias -> (what it holds, setting that points it at a shared cache)
+SHARED_CACHES = {
+    "default": ("permission context versions and the token blacklist", "CACHE_URL"),
+    "throttle": ("throttle counters", "THROTTLE_CACHE_URL or CACHE_URL"),
+}
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_caches(app_configs, **kwargs):
+    """
+    Warn when a cache that several workers must agree on is process-local.
+    Run with `manage.py check --deploy`.
+    """
+
+    warnings = []
+
+    for alias, (contents, setting) in SHARED_CACHES.items():
+        backend = settings.CACHES.get(alias, {}).get("BACKEND")
+        if backend in PROCESS_LOCAL_CACHE_BACKENDS:
+            warnings.append(Warning(
+                f"The '{alias}' cache holds {contents} but {backend} is local to each process.",
+                hint=f"Set {setting} to a shared cache such as Redis when running more than one worker.",
+                id="core.W001",
+            ))
+
+    return warnings
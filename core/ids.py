@@ -0,0 +1,141 @@
+import functools
+import os
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Crockford base32; character order matches numeric order, so ids sort by value
+ENCODING = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+# 50 bits of milliseconds since the Unix epoch, then 55 random bits
+TIME_LENGTH = 10
+RANDOM_LENGTH = 11
+RANDOM_MAX = 32 ** RANDOM_LENGTH - 1
+
+# A new millisecond starts its random part below this, leaving room to
+# increment through large batches without overflowing
+RANDOM_START_BITS = 54
+
+
+def encode(value, length):
+    chars = []
+    for _ in range(length):
+        value, index = divmod(value, 32)
+        chars.append(ENCODING[index])
+    return "".join(reversed(chars))
+
+
+class TimeOrderedIdGenerator:
+    """
+    ULID-style ids: the prefix, a 10 character millisecond timestamp and 11
+    random characters, 24 characters in all.
+
+    Ids sort by creation time, so primary key inserts append to the end of
+    the index instead of landing on random pages. Within a millisecond the
+    random part is incremented rather than redrawn, which keeps one
+    process's ids unique and in order, and lets a batch take consecutive
+    values from a single draw.
+    """
+
+    length = 3 + TIME_LENGTH + RANDOM_LENGTH
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+        # A forked worker must not continue its parent's sequence
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._last_ms = -1
+        self._last_random = 0
+
+    def _reserve(self, count):
+        """
+        (millisecond, first random value) of `count` consecutive unused ids.
+        """
+
+        with self._lock:
+            ms = time.time_ns() // 1_000_000
+
+            if ms <= self._last_ms:
+                # Same millisecond, or the clock went back: carry on counting
+                ms = self._last_ms
+                start = self._last_random + 1
+            else:
+                start = int.from_bytes(os.urandom(8), "big") >> (64 - RANDOM_START_BITS)
+
+            if start + count - 1 > RANDOM_MAX:
+                ms += 1
+                start = int.from_bytes(os.urandom(8), "big") >> (64 - RANDOM_START_BITS)
+
+            self._last_ms = ms
+            self._last_random = start + count - 1
+
+        return ms, start
+
+    def generate(self, prefix):
+        return self.generate_batch(prefix, 1)[0]
+
+    def generate_batch(self, prefix, count):
+        ms, start = self._reserve(count)
+        stamp = prefix + encode(ms, TIME_LENGTH)
+        return [stamp + encode(start + offset, RANDOM_LENGTH) for offset in range(count)]
+
+
+class RandomHexIdGenerator:
+    """
+    The original scheme: the prefix and 8 random hex characters of a UUID4.
+    """
+
+    length = 3 + 8
+
+    def generate(self, prefix):
+        return f"{prefix}{uuid.uuid4().hex[:8].upper()}"
+
+    def generate_batch(self, prefix, count):
+        ids = set()
+        while len(ids) < count:
+            ids.add(self.generate(prefix))
+        return list(ids)
+
+
+@functools.lru_cache(maxsize=None)
+def load_id_generator(path):
+    return import_string(path)()
+
+
+def id_generator():
+    """
+    The ID_GENERATOR instance, shared by the process.
+    """
+
+    return load_id_generator(settings.ID_GENERATOR)
+
+
+def new_id(prefix):
+    return id_generator().generate(prefix)
+
+
+def new_ids(prefix, count):
+    return id_generator().generate_batch(prefix, count)
+
+
+def unused_ids(model, generate_ids, count):
+    """
+    `count` ids from `generate_ids(count)` that are not already primary
+    keys of `model`, in generation order. Costs one query; ids that collide
+    with existing rows are replaced and checked again.
+    """
+
+    ids = {}
+
+    while len(ids) < count:
+        candidates = [pk for pk in generate_ids(count - len(ids)) if pk not in ids]
+        taken = set(
+            model._default_manager.filter(pk__in=candidates).values_list("pk", flat=True)
+        )
+        ids.update(dict.fromkeys(pk for pk in candidates if pk not in taken))
+
+    return list(ids)
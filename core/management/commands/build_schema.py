@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from core.views import build_schema_files, schema_path
+import os
+
+
+class Command(BaseCommand):
+    help = "Write the OpenAPI schema to versioned YAML/JSON files served by /api/schema/."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate even if the URLconf and serializers are unchanged.",
+        )
+
+    def handle(self, *args, **options):
+        current = all(os.path.exists(schema_path(fmt)) for fmt in ("yaml", "json"))
+
+        paths = build_schema_files(force=options["force"])
+
+        if current and not options["force"]:
+            self.stdout.write("Schema is up to date.")
+
+        for path in paths.values():
+            self.stdout.write(self.style.SUCCESS(path))
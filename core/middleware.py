@@ -0,0 +1,115 @@
+import time
+from contextlib import ExitStack
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django_auto_logout.middleware import _auto_logout
+
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+QUERY_TIME_HEADER = "X-DB-Query-Time-ms"
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper that counts queries and sums their time.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class QueryBudgetMiddleware:
+    """
+    Reports the number of SQL queries and the total database time of each
+    request in the X-DB-Query-Count and X-DB-Query-Time-ms response headers.
+
+    Opt-in with QUERY_BUDGET_HEADERS = True. Queries run while a streaming
+    response is consumed happen after the headers are sent and are not counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "QUERY_BUDGET_HEADERS", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        recorder = QueryRecorder()
+
+        with ExitStack() as stack:
+            self.record(stack, recorder)
+            response = self.get_response(request)
+
+        return self.add_headers(response, recorder)
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+
+        # Async ORM queries run on the request's connections in a worker
+        # thread, so the wrappers installed here still see them
+        with ExitStack() as stack:
+            self.record(stack, recorder)
+            response = await self.get_response(request)
+
+        return self.add_headers(response, recorder)
+
+    @staticmethod
+    def record(stack, recorder):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+
+    @staticmethod
+    def add_headers(response, recorder):
+        response[QUERY_COUNT_HEADER] = str(recorder.count)
+        response[QUERY_TIME_HEADER] = f"{recorder.duration * 1000:.2f}"
+        return response
+
+
+class AutoLogoutMiddleware:
+    """
+    django_auto_logout's idle logout for admin sessions, usable under ASGI
+    without pushing every request through a thread. Async requests load
+    the session user with request.auser(); only signed-in sessions pay for
+    the synchronous session bookkeeping.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if not request.user.is_anonymous and hasattr(settings, "AUTO_LOGOUT"):
+            _auto_logout(request, settings.AUTO_LOGOUT)
+
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        user = await request.auser()
+        if not user.is_anonymous and hasattr(settings, "AUTO_LOGOUT"):
+            await sync_to_async(_auto_logout)(request, settings.AUTO_LOGOUT)
+
+        return await self.get_response(request)
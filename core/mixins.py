@@ -0,0 +1,179 @@
+import asyncio
+import csv
+import json
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from .serializers import values_serializer_for
+
+
+class ValuesListMixin:
+    """
+    list() for read-only search endpoints, rendered from `.values()` rows by a
+    ValuesSerializer built from the view's serializer_class. The JSON is the
+    same as the ModelSerializer path; filtering, ordering and both pagination
+    modes still apply.
+    """
+
+    def list(self, request, *args, **kwargs):
+        serializer = values_serializer_for(self.get_serializer_class())
+        queryset = self.values_queryset(serializer)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.to_representation(page))
+
+        return Response(serializer.to_representation(queryset))
+
+    def values_queryset(self, serializer):
+        # Keyset pagination reads its position from the row
+        cursor_columns = [
+            serializer.model._meta.get_field(name.lstrip("-")).attname
+            for name in getattr(self, "cursor_ordering", ())
+        ]
+
+        return serializer.values(
+            self.filter_queryset(self.get_queryset()),
+            extra=cursor_columns
+        )
+
+
+class AsyncDispatchMixin:
+    """
+    Runs a DRF view as a native async Django view under ASGI.
+
+    Handlers may be coroutines. Authentication, permissions and throttles
+    are synchronous DRF code that can read the database or cache, so they
+    run together in one sync_to_async call before the handler; the
+    handler's own queries use the async ORM on the event loop.
+    """
+
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+class AsyncValuesListMixin(AsyncDispatchMixin, ValuesListMixin):
+    """
+    ValuesListMixin for async views: the count, the page and nested rows
+    are read with the async ORM.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        serializer = values_serializer_for(self.get_serializer_class())
+        queryset = self.values_queryset(serializer)
+
+        # pagination_class must provide apaginate_queryset, as SearchPagination does
+        page = None
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+
+        if page is not None:
+            return self.get_paginated_response(await serializer.ato_representation(page))
+
+        return Response(await serializer.ato_representation(queryset))
+
+
+class Echo:
+    """
+    File-like object for csv.writer that hands each line straight back.
+    """
+
+    def write(self, value):
+        return value
+
+
+class StreamingExportMixin:
+    """
+    Streams the view's filtered queryset as NDJSON or CSV (`?output=csv`).
+
+    Rows are read with `.iterator(chunk_size=...)` and rendered one chunk at
+    a time, so memory stays flat however many rows match and the first chunk
+    is sent while the rest of the query is still being read. Nested fields
+    are written as JSON in CSV cells.
+    """
+
+    output_query_param = "output"
+    export_chunk_size = 2000
+    export_name = "export"
+    pagination_class = None
+
+    def list(self, request, *args, **kwargs):
+        output = request.query_params.get(self.output_query_param, "ndjson")
+        if output not in ("ndjson", "csv"):
+            raise ValidationError({self.output_query_param: "Choose 'ndjson' or 'csv'."})
+
+        serializer = values_serializer_for(self.get_serializer_class())
+        queryset = serializer.values(self.filter_queryset(self.get_queryset()))
+        items = self.export_items(serializer, queryset)
+
+        if output == "csv":
+            response = StreamingHttpResponse(
+                self.csv_chunks(serializer.keys, items), content_type="text/csv"
+            )
+        else:
+            response = StreamingHttpResponse(
+                self.ndjson_chunks(items), content_type="application/x-ndjson"
+            )
+
+        response["Content-Disposition"] = f'attachment; filename="{self.export_name}.{output}"'
+        return response
+
+    def export_items(self, serializer, queryset):
+        """
+        Yields lists of serialized rows, `export_chunk_size` at a time.
+        """
+
+        chunk = []
+        for row in queryset.iterator(chunk_size=self.export_chunk_size):
+            chunk.append(row)
+            if len(chunk) == self.export_chunk_size:
+                yield serializer.to_representation(chunk)
+                chunk = []
+
+        if chunk:
+            yield serializer.to_representation(chunk)
+
+    def ndjson_chunks(self, items):
+        encoder = JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+        for chunk in items:
+            yield "".join(f"{encoder.encode(item)}\n" for item in chunk)
+
+    def csv_chunks(self, keys, items):
+        writer = csv.writer(Echo())
+        yield writer.writerow(keys)
+
+        for chunk in items:
+            yield "".join(
+                writer.writerow([
+                    json.dumps(value, cls=JSONEncoder, separators=(",", ":"))
+                    if isinstance(value, list) else value
+                    for value in item.values()
+                ])
+                for item in chunk
+            )
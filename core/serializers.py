@@ -0,0 +1,152 @@
+import functools
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models import QuerySet
+from rest_framework import serializers
+
+
+class ValuesSerializer:
+    """
+    Read-only list rendering for a ModelSerializer from `.values()` rows.
+
+    Model instances and per-field attribute lookups are skipped; each column
+    is converted with the serializer field's own to_representation, so rows
+    equal `serializer_class(queryset, many=True).data`. Supports model fields,
+    primary key relations and nested `many=True` ModelSerializers over a
+    reverse foreign key (fetched with one extra query, like prefetch_related).
+    """
+
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        self.model = serializer.Meta.model
+        self.pk_column = self.model._meta.pk.attname
+
+        # Output keys in the serializer's field order
+        self.keys = []
+
+        # (output key, values() key, converter or None)
+        self.columns = []
+        # (output key, child ValuesSerializer, foreign key column on the child)
+        self.nested = []
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+
+            self.keys.append(name)
+
+            try:
+                model_field = self.model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(
+                    f"{serializer_class.__name__}.{name} cannot be read from values()."
+                )
+
+            if isinstance(field, serializers.ListSerializer):
+                if not model_field.one_to_many:
+                    raise ImproperlyConfigured(
+                        f"{serializer_class.__name__}.{name}: only reverse foreign keys can be nested."
+                    )
+                child = ValuesSerializer(type(field.child))
+                self.nested.append((name, child, model_field.field.attname))
+                continue
+
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                convert = field.pk_field.to_representation if field.pk_field else None
+            elif isinstance(field, serializers.ModelField) or not model_field.concrete:
+                raise ImproperlyConfigured(
+                    f"{serializer_class.__name__}.{name} cannot be read from values()."
+                )
+            else:
+                convert = field.to_representation
+
+            self.columns.append((name, model_field.attname, convert))
+
+    def value_names(self, *extra):
+        names = [column for _, column, _ in self.columns]
+        for name in (self.pk_column, *extra):
+            if name not in names:
+                names.append(name)
+        return names
+
+    def values(self, queryset, extra=()):
+        """
+        `queryset` as dict rows holding every column the serializer reads,
+        plus `extra` attnames (e.g. the cursor ordering).
+        """
+
+        return queryset.prefetch_related(None).values(*self.value_names(*extra))
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        data = self.render_columns(rows)
+
+        for key, child, foreign_key in self.nested:
+            parents = self.attach_children(rows, data, key)
+            child_rows = list(self.children_of(child, foreign_key, parents))
+            self.fill_children(parents, foreign_key, child_rows, child.to_representation(child_rows))
+
+        return self.ordered(data)
+
+    async def ato_representation(self, rows):
+        """
+        to_representation for async views: querysets, including the nested
+        children, are read with the async ORM.
+        """
+
+        rows = [row async for row in rows] if isinstance(rows, QuerySet) else list(rows)
+        data = self.render_columns(rows)
+
+        for key, child, foreign_key in self.nested:
+            parents = self.attach_children(rows, data, key)
+            child_rows = [row async for row in self.children_of(child, foreign_key, parents)]
+            self.fill_children(parents, foreign_key, child_rows, await child.ato_representation(child_rows))
+
+        return self.ordered(data)
+
+    def render_columns(self, rows):
+        columns = self.columns
+
+        return [
+            {
+                key: None if (value := row[column]) is None
+                else value if convert is None
+                else convert(value)
+                for key, column, convert in columns
+            }
+            for row in rows
+        ]
+
+    def attach_children(self, rows, data, key):
+        """
+        Give every item an empty `key` list; returns {parent pk: that list}.
+        """
+
+        parents = {}
+        for row, item in zip(rows, data):
+            item[key] = parents.setdefault(row[self.pk_column], [])
+        return parents
+
+    @staticmethod
+    def children_of(child, foreign_key, parents):
+        return child.values(
+            child.model._default_manager.filter(**{f"{foreign_key}__in": list(parents)}),
+            extra=(foreign_key,)
+        )
+
+    @staticmethod
+    def fill_children(parents, foreign_key, child_rows, child_data):
+        for child_row, child_item in zip(child_rows, child_data):
+            parents[child_row[foreign_key]].append(child_item)
+
+    def ordered(self, data):
+        # Nested keys were added after the columns; restore the field order
+        if self.nested:
+            keys = self.keys
+            data = [{key: item[key] for key in keys} for item in data]
+
+        return data
+
+
+@functools.lru_cache(maxsize=None)
+def values_serializer_for(serializer_class):
+    return ValuesSerializer(serializer_class)
@@ -0,0 +1,103 @@
+from django.core.cache import caches
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from customer.models import CustomUser
+from .middleware import QUERY_COUNT_HEADER
+
+# Row counts every budget is checked at
+BUDGET_SIZES = (1, 10, 100)
+
+
+def clear_caches():
+    """
+    Empty every configured cache: throttle counters and cached permission
+    contexts must not leak between tests that reuse user ids.
+    """
+
+    for cache in caches.all(initialized_only=False):
+        cache.clear()
+
+
+def make_customer(email="customer@example.com"):
+    user = CustomUser.objects.create_user(
+        email=email,
+        phone_number=email,
+        password="password",
+        role="customer",
+        is_active=True,
+    )
+    profile = user.customer_profile
+    profile.customer_name = "Customer"
+    profile.address = "Accra"
+    profile.is_complete = True
+    profile.save()
+    return user
+
+
+def make_driver(email="driver@example.com"):
+    user = CustomUser.objects.create_user(
+        email=email,
+        phone_number=email,
+        password="password",
+        role="driver",
+        is_active=True,
+    )
+    profile = user.driverprofile
+    profile.vehicle_type = "Motor"
+    profile.vehicle_number = "MT-1"
+    profile.license_number = "DV1"
+    profile.is_complete = True
+    profile.approval_status = "approved"
+    profile.is_approved = True
+    profile.save()
+    return user
+
+
+def make_admin(email="admin@example.com"):
+    return CustomUser.objects.create_superuser(
+        email=email,
+        phone_number=email,
+        password="password",
+        is_active=True,
+    )
+
+
+@override_settings(
+    QUERY_BUDGET_HEADERS=True,
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+)
+class QueryBudgetTestCase(APITestCase):
+    """
+    Base class for per-endpoint query budgets, read from the
+    QueryBudgetMiddleware headers.
+    """
+
+    sizes = BUDGET_SIZES
+
+    def setUp(self):
+        super().setUp()
+        clear_caches()
+
+    def query_count(self, response):
+        self.assertLess(response.status_code, 400, getattr(response, "data", None))
+        return int(response[QUERY_COUNT_HEADER])
+
+    def assertQueryBudget(self, budget, call):
+        """
+        `call(size)` seeds `size` rows and returns the response of the request
+        under test; only that request's queries are counted. Each size runs
+        in a savepoint that is rolled back afterwards.
+        """
+
+        counts = {}
+
+        for size in self.sizes:
+            clear_caches()
+            with transaction.atomic():
+                counts[size] = self.query_count(call(size))
+                transaction.set_rollback(True)
+
+        over = {size: count for size, count in counts.items() if count > budget}
+        self.assertFalse(over, f"Query budget of {budget} exceeded: {counts}")
+        return counts
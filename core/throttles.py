@@ -0,0 +1,85 @@
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+from rest_framework import throttling
+
+# Request histories go to the "throttle" cache, which every worker must share
+throttle_cache = ConnectionProxy(caches, "throttle")
+
+
+class UserRateThrottle(throttling.UserRateThrottle):
+    cache = throttle_cache
+
+
+class AnonRateThrottle(throttling.AnonRateThrottle):
+    cache = throttle_cache
+
+
+class SlidingWindowRateThrottle(throttling.SimpleRateThrottle):
+    """
+    Sliding-window counter throttle with a fixed two counters per key.
+
+    Each key counts requests in the current and previous fixed windows with
+    atomic cache increments; the previous window's count is weighted by how
+    much of it still overlaps the sliding window. A request is counted before
+    it is checked, so concurrent workers each see a distinct count and no more
+    than the rate gets through. Requests over the limit keep counting, which
+    holds a client that keeps retrying at the limit.
+
+    Override get_idents() to throttle on several identities at once (e.g. IP
+    address and email); the request is refused if any of them is over.
+    The limits hold across workers only on a shared cache with an atomic
+    incr, such as Redis. LocMem increments atomically but keeps separate
+    counters in every process; the database and file caches are shared but
+    do not increment atomically.
+    """
+
+    cache = throttle_cache
+
+    def get_idents(self, request, view):
+        return [self.get_ident(request)]
+
+    def get_cache_key(self, request, view):
+        # Keys are per ident and window, see window_keys()
+        return None
+
+    def window_keys(self, ident, window):
+        key = self.cache_format % {"scope": self.scope, "ident": ident}
+        return f"{key}_{window}", f"{key}_{window - 1}"
+
+    def hit(self, key):
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # First request of the window; kept while it is the current or
+            # the previous one. Another worker may have created it first.
+            if self.cache.add(key, 1, self.duration * 2):
+                return 1
+            return self.cache.incr(key)
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        idents = [ident for ident in self.get_idents(request, view) if ident]
+        if not idents:
+            return True
+
+        self.now = self.timer()
+        window, offset = divmod(self.now, self.duration)
+        # Share of the previous window still inside the sliding window
+        self.overlap = 1 - offset / self.duration
+
+        keys = [self.window_keys(ident, int(window)) for ident in idents]
+        previous = self.cache.get_many([previous_key for _, previous_key in keys])
+
+        allowed = True
+        for current_key, previous_key in keys:
+            count = self.hit(current_key) + previous.get(previous_key, 0) * self.overlap
+            if count > self.num_requests:
+                allowed = False
+
+        return allowed
+
+    def wait(self):
+        # At least until the current window ends
+        return self.duration * self.overlap
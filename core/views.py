@@ -0,0 +1,133 @@
+import contextlib
+import functools
+import hashlib
+import os
+import tempfile
+from importlib import import_module
+from django.apps import apps
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.views import SpectacularAPIView
+
+# Modules whose changes can change the generated schema
+SCHEMA_SOURCE_MODULES = ("urls", "views", "serializers", "filters", "schema", "pagination")
+
+SCHEMA_RENDERERS = {
+    "yaml": OpenApiYamlRenderer,
+    "json": OpenApiJsonRenderer,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def schema_fingerprint():
+    """
+    Hash of the URLconf, the schema-relevant modules of the project apps and
+    SPECTACULAR_SETTINGS. Source does not change in a running process, so it
+    is computed once.
+    """
+
+    base_dir = str(settings.BASE_DIR)
+    paths = {import_module(settings.ROOT_URLCONF).__file__}
+
+    for app_config in apps.get_app_configs():
+        if not app_config.path.startswith(base_dir) or "site-packages" in app_config.path:
+            continue
+        for name in SCHEMA_SOURCE_MODULES:
+            path = os.path.join(app_config.path, f"{name}.py")
+            if os.path.exists(path):
+                paths.add(path)
+
+    digest = hashlib.sha256()
+    digest.update(repr(sorted(settings.SPECTACULAR_SETTINGS.items())).encode("utf-8"))
+
+    for path in sorted(paths):
+        digest.update(os.path.relpath(path, base_dir).encode("utf-8"))
+        with open(path, "rb") as source:
+            digest.update(source.read())
+
+    return digest.hexdigest()[:16]
+
+
+def schema_path(fmt):
+    return os.path.join(
+        settings.SCHEMA_CACHE_DIR,
+        f"openapi-{spectacular_settings.VERSION}-{schema_fingerprint()}.{fmt}"
+    )
+
+
+def build_schema_files(force=False):
+    """
+    Generate the schema once and write it as YAML and JSON, named by API
+    version and source fingerprint. Older schema files are removed.
+    Returns the written (or already current) paths.
+    """
+
+    paths = {fmt: schema_path(fmt) for fmt in SCHEMA_RENDERERS}
+
+    if not force and all(os.path.exists(path) for path in paths.values()):
+        return paths
+
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(request=None, public=True)
+
+    os.makedirs(settings.SCHEMA_CACHE_DIR, exist_ok=True)
+
+    for fmt, path in paths.items():
+        content = SCHEMA_RENDERERS[fmt]().render(schema, renderer_context={})
+        # Each writer has its own temp file, so concurrent builds (several
+        # workers serving their first request) never share a partial file
+        with tempfile.NamedTemporaryFile(
+            dir=settings.SCHEMA_CACHE_DIR, prefix=".openapi-", delete=False
+        ) as output:
+            output.write(content)
+        os.replace(output.name, path)
+
+    current = {os.path.basename(path) for path in paths.values()}
+    for name in os.listdir(settings.SCHEMA_CACHE_DIR):
+        if name.startswith("openapi-") and name not in current:
+            # Another build may have removed it first
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(settings.SCHEMA_CACHE_DIR, name))
+
+    return paths
+
+
+@functools.lru_cache(maxsize=None)
+def read_schema_file(path):
+    with open(path, "rb") as schema_file:
+        return schema_file.read()
+
+
+# Serves the prebuilt schema file with ETag / If-None-Match support
+class CachedSpectacularAPIView(SpectacularAPIView):
+
+    def _get_schema_response(self, request):
+        fmt = request.accepted_renderer.format
+
+        # Per-request variants are still generated on the fly
+        if fmt not in SCHEMA_RENDERERS or request.GET.get("lang") or request.GET.get("version"):
+            return super()._get_schema_response(request)
+
+        etag = f'"{schema_fingerprint()}-{fmt}"'
+
+        # Compares each If-None-Match entry exactly (weakly, as RFC 9110 asks)
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            response["ETag"] = etag
+            return response
+
+        path = schema_path(fmt)
+        if not os.path.exists(path):
+            build_schema_files()
+
+        content_type = request.accepted_renderer.media_type
+        if request.accepted_renderer.charset:
+            content_type = f"{content_type}; charset={request.accepted_renderer.charset}"
+
+        response = HttpResponse(read_schema_file(path), content_type=content_type)
+        response["ETag"] = etag
+        response["Content-Disposition"] = f'inline; filename="{self._get_filename(request, None)}"'
+        return response
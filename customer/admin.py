@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import CustomUser, CustomerProfile, DriverProfile,EmailOTP
+from .models import CustomUser, CustomerProfile, DriverProfile,EmailOTP, EmailOutbox
 
 
 @admin.register(CustomUser)
@@ -27,3 +27,10 @@ class DriverProfileAdmin(admin.ModelAdmin):
 class EmailOTPAdmin(admin.ModelAdmin):
     list_display = ("user", "created_at", "is_verified")
     search_fields = ("user__email","created_at")
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ("recipient", "subject", "status", "attempt_count", "next_attempt_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("recipient",)
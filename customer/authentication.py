@@ -0,0 +1,80 @@
+from django.core.cache import cache
+from django.db import router
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .context import context_from_claims
+
+
+def blacklist_key(jti):
+    return f"jwt-blacklist:{jti}"
+
+
+def blacklist_jti(jti, expires_at):
+    """
+    Mirror a blacklisted token into the cache until it would expire anyway
+    """
+    timeout = int((expires_at - timezone.now()).total_seconds())
+    if timeout > 0:
+        cache.set(blacklist_key(jti), True, timeout)
+
+
+def is_blacklisted(jti):
+    return jti is not None and cache.get(blacklist_key(jti)) is not None
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that trusts the permission claims of a verified
+    access token instead of loading the user on every request.
+
+    request.user is a CustomUser holding only id, role, is_staff and
+    is_active; any other field is loaded from the database the first time a
+    view reads it. Tokens without the claims, or issued before the user or
+    their profile last changed, take the regular database path.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        context = context_from_claims(validated_token)
+        if context is None:
+            return self.get_user(validated_token), validated_token
+
+        # Permission checks read the context instead of the database
+        request._permission_context = context
+        return self.user_from_context(context), validated_token
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+
+        if is_blacklisted(validated_token.get(api_settings.JTI_CLAIM)):
+            raise InvalidToken(_("Token is blacklisted"))
+
+        return validated_token
+
+    def user_from_context(self, context):
+        known = {
+            self.user_model._meta.pk.attname: context.user_id,
+            "role": context.role,
+            "is_staff": context.is_staff,
+            "is_active": True,
+        }
+        field_names = [
+            field.attname for field in self.user_model._meta.concrete_fields
+            if field.attname in known
+        ]
+        # Saving it later only writes the fields that were loaded or assigned
+        return self.user_model.from_db(
+            router.db_for_read(self.user_model), field_names, [known[name] for name in field_names]
+        )
@@ -0,0 +1,158 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from .models import CustomUser
+
+# Token claims a PermissionContext can be rebuilt from
+PERMISSION_CLAIMS = ("role", "is_staff", "profile_id", "profile_complete", "approved")
+# Claim holding the context version the permission claims were read at
+CONTEXT_VERSION_CLAIM = "context_version"
+
+
+class PermissionContext:
+    """
+    What the permission checks need to know about a user: role, staff flag,
+    the id of their role profile, whether it is complete and (for drivers)
+    whether it is approved.
+    """
+
+    __slots__ = ("user_id", "role", "is_staff", "profile_id", "profile_complete", "approved")
+
+    def __init__(self, user_id, role, is_staff, profile_id, profile_complete, approved):
+        self.user_id = user_id
+        self.role = role
+        self.is_staff = is_staff
+        self.profile_id = profile_id
+        self.profile_complete = bool(profile_complete)
+        self.approved = bool(approved)
+
+    @property
+    def has_profile(self):
+        return self.profile_id is not None
+
+    def as_tuple(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def as_claims(self):
+        return {name: getattr(self, name) for name in PERMISSION_CLAIMS}
+
+
+def permission_context_key(user_id):
+    return f"permission-context:{user_id}"
+
+
+def permission_context_version_key(user_id):
+    return f"permission-context-version:{user_id}"
+
+
+def load_permission_context(user_id):
+    """
+    The user and both role profiles in one joined query.
+    """
+
+    row = (
+        CustomUser.objects
+        .filter(pk=user_id)
+        .values(
+            "role",
+            "is_staff",
+            customer_profile_pk=F("customer_profile__id"),
+            customer_complete=F("customer_profile__is_complete"),
+            driver_profile_pk=F("driverprofile__id"),
+            driver_complete=F("driverprofile__is_complete"),
+            driver_approval=F("driverprofile__approval_status"),
+        )
+        .first()
+    )
+
+    if row is None:
+        return None
+
+    if row["role"] == CustomUser.Role.DRIVER:
+        profile = (row["driver_profile_pk"], row["driver_complete"], row["driver_approval"] == "approved")
+    elif row["role"] == CustomUser.Role.CUSTOMER:
+        profile = (row["customer_profile_pk"], row["customer_complete"], None)
+    else:
+        profile = (None, False, None)
+
+    return PermissionContext(user_id, row["role"], row["is_staff"], *profile)
+
+
+def get_permission_context(request):
+    """
+    Permission context of the authenticated user, loaded at most once per
+    request and cached for PERMISSION_CONTEXT_TTL seconds across requests.
+    """
+
+    context = getattr(request, "_permission_context", None)
+    if context is not None and context.user_id == request.user.pk:
+        return context
+
+    key = permission_context_key(request.user.pk)
+    cached = cache.get(key)
+
+    if cached is not None:
+        context = PermissionContext(*cached)
+    else:
+        context = load_permission_context(request.user.pk)
+        if context is None:
+            return None
+        cache.set(key, context.as_tuple(), settings.PERMISSION_CONTEXT_TTL)
+
+    request._permission_context = context
+    return context
+
+
+def permission_claims(user_id):
+    """
+    Permission claims for a new token, tagged with the context version they
+    were read at. The version is read first so a change racing the query
+    leaves the claims stale rather than wrong.
+    """
+
+    version = cache.get(permission_context_version_key(user_id), 0)
+    context = load_permission_context(user_id)
+    if context is None:
+        return {}
+
+    return {**context.as_claims(), CONTEXT_VERSION_CLAIM: version}
+
+
+def context_from_claims(token):
+    """
+    PermissionContext from a verified token's claims, or None when the token
+    lacks them or the user or a profile changed after it was issued.
+    """
+
+    if any(claim not in token for claim in (*PERMISSION_CLAIMS, CONTEXT_VERSION_CLAIM)):
+        return None
+
+    user_id = CustomUser._meta.pk.to_python(token[jwt_settings.USER_ID_CLAIM])
+
+    if cache.get(permission_context_version_key(user_id), 0) != token[CONTEXT_VERSION_CLAIM]:
+        return None
+
+    return PermissionContext(user_id, *(token[claim] for claim in PERMISSION_CLAIMS))
+
+
+def invalidate_permission_context(user_id):
+    """
+    Drop the cached context and bump the context version, which makes the
+    claims of already issued access tokens stale. Done now and again once
+    the transaction commits, so a request in between cannot keep the old
+    values.
+    """
+
+    def invalidate():
+        cache.delete(permission_context_key(user_id))
+        cache.set(
+            permission_context_version_key(user_id),
+            time.time(),
+            int(jwt_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+        )
+
+    invalidate()
+    transaction.on_commit(invalidate)
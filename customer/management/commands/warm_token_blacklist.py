@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from customer.authentication import blacklist_jti
+
+
+class Command(BaseCommand):
+    help = "Copy unexpired blacklisted tokens into the cache, e.g. after a cache flush."
+
+    def handle(self, *args, **options):
+        tokens = (
+            BlacklistedToken.objects
+            .filter(token__expires_at__gt=timezone.now())
+            .values_list("token__jti", "token__expires_at")
+        )
+
+        count = 0
+        for jti, expires_at in tokens.iterator():
+            blacklist_jti(jti, expires_at)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Cached {count} blacklisted token(s)."))
@@ -0,0 +1,41 @@
+# Generated by Django 6.0 on 2026-10-18 12:34
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_active_orders(apps, schema_editor):
+    DriverProfile = apps.get_model("customer", "DriverProfile")
+
+    drivers = DriverProfile.objects.annotate(
+        actual_active=Count(
+            "dorders",
+            filter=Q(dorders__order_status__in=["pending", "assigned"])
+        ),
+    ).filter(actual_active__gt=0)
+
+    for driver in drivers.iterator(chunk_size=2000):
+        DriverProfile.objects.filter(pk=driver.pk).update(
+            active_orders=driver.actual_active
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0011_emailoutbox'),
+        ('order', '0014_list_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='driverprofile',
+            name='active_orders',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='driverprofile',
+            index=models.Index(condition=models.Q(('approval_status', 'approved'), ('availability_status', True), ('is_complete', True)), fields=['active_orders', 'id'], name='driver_assignable_load_idx'),
+        ),
+        migrations.RunPython(backfill_active_orders, migrations.RunPython.noop),
+    ]
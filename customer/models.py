@@ -100,8 +100,34 @@ class DriverProfile(models.Model):
         default="pending"
     )
     rejection_reason = models.TextField(blank=True, null=True)
+
+    # Orders of this driver still pending/assigned, kept by order.services
+    active_orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["active_orders", "id"],
+                name="driver_assignable_load_idx",
+                condition=models.Q(
+                    availability_status=True,
+                    is_complete=True,
+                    approval_status="approved",
+                ),
+            ),
+        ]
     
 
+    def save(self, *args, **kwargs):
+        # active_orders only changes through F() updates; a plain save of a
+        # stale instance must not overwrite it
+        if not self._state.adding and not kwargs.get("update_fields"):
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "active_orders"
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.user.email} - {self.approval_status}"
     
@@ -132,4 +158,34 @@ class EmailOTP(models.Model):
         return self.attempt_count >= self.max_attempts
 
     def __str__(self):
-        return f"{self.user.email} - {self.otp}"
\ No newline at end of file
+        return f"{self.user.email} - {self.otp}"
+
+
+#Outbox for emails sent by the worker (python manage.py send_outbox)
+class EmailOutbox(models.Model):
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        SENT = "sent", "Sent"
+        FAILED = "failed", "Failed"
+
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+
+    attempt_count = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient} - {self.subject} ({self.status})"
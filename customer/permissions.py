@@ -1,5 +1,5 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
-from .models import CustomerProfile, DriverProfile
+from .context import get_permission_context
 
 class IsAdmin(BasePermission):
     """
@@ -75,15 +75,16 @@ class IsCustomerProfileComplete(BasePermission):
             self.message = "Only customers can create orders."
             return False
 
-        try:
-            profile = user.customer_profile
-            if not profile.is_complete:
-                self.message =  f"Complete your profile before creating/updating/cancelling orders. {user.email} {profile.is_complete}"
-                return False
-        except CustomerProfile.DoesNotExist:
+        context = get_permission_context(request)
+
+        if context is None or not context.has_profile:
             self.message = "Customer profile not found. Please complete your profile."
             return False
 
+        if not context.profile_complete:
+            self.message = "Complete your profile before creating/updating/cancelling orders."
+            return False
+
         return True
     
 
@@ -104,13 +105,14 @@ class IsDriverProfileComplete(BasePermission):
             self.message = "Only drivers can update delivery."
             return False
 
-        try:
-            profile = user.driverprofile
-            if not profile.is_complete:
-                self.message = "Complete your profile before updating deliviries."
-                return False
-        except DriverProfile.DoesNotExist:
+        context = get_permission_context(request)
+
+        if context is None or not context.has_profile:
             self.message = "Driver profile not found. Please complete your profile."
             return False
 
-        return True
\ No newline at end of file
+        if not context.profile_complete:
+            self.message = "Complete your profile before updating deliviries."
+            return False
+
+        return True
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from .models import CustomUser, CustomerProfile, DriverProfile
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from .context import permission_claims
 from django.contrib.auth import get_user_model
 from django.db import transaction
 from django.contrib.auth.password_validation import validate_password
@@ -220,6 +222,9 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
         token = super().get_token(user)
         # Add custom claims
         token['role'] = user.role
+        # Permission claims let StatelessJWTAuthentication skip the user query
+        for claim, value in permission_claims(user.pk).items():
+            token[claim] = value
         return token
 
     def validate(self, attrs):
@@ -238,6 +243,20 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
         return data
 
 
+# Serializer for JWT token refresh that re-reads the permission claims
+class MyTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        # The new access token copies the refresh token's claims, which may
+        # predate a profile update or approval
+        access = self.token_class.access_token_class(data["access"])
+        user_id = User._meta.pk.to_python(access[jwt_settings.USER_ID_CLAIM])
+        for claim, value in permission_claims(user_id).items():
+            access[claim] = value
+        data["access"] = str(access)
+        return data
+
+
 # Serializer for Driver approval after registration and driver profile update
 class DriverApprovalSerializer(serializers.ModelSerializer):
     class Meta:
@@ -1,8 +1,19 @@
-from django.core.mail import send_mail
+from datetime import timedelta
+from django.core.mail import EmailMessage, get_connection
 from django.conf import settings
-from .models import EmailOTP
+from django.db import transaction
+from django.utils import timezone
+from .models import EmailOTP, EmailOutbox
 from .utils import generate_otp
 
+# Retry backoff for the outbox worker: 30s, 60s, 120s, ... capped at 1 hour
+OUTBOX_BACKOFF_BASE = timedelta(seconds=30)
+OUTBOX_BACKOFF_MAX = timedelta(hours=1)
+
+# How long a claimed batch is hidden from other workers while it is sent
+OUTBOX_LEASE = timedelta(minutes=5)
+
+
 def send_otp(user, otp_purpose = ""):
 
     # Delete old OTPs
@@ -16,9 +27,106 @@ def send_otp(user, otp_purpose = ""):
         otp_purpose=otp_purpose
     )
 
-    send_mail(
+    # Delivered by the send_outbox worker, not inside the request
+    enqueue_email(
         subject="Your Verification Code",
-        message=f"Your OTP is {code}. It expires in 5 minutes.",
-        from_email=settings.EMAIL_HOST_USER,
-        recipient_list=[user.email],
-    )
\ No newline at end of file
+        body=f"Your OTP is {code}. It expires in 5 minutes.",
+        recipient=user.email,
+    )
+
+
+def enqueue_email(subject, body, recipient):
+    return EmailOutbox.objects.create(
+        subject=subject,
+        body=body,
+        recipient=recipient,
+    )
+
+
+def claim_outbox_batch(batch_size):
+    """
+    Claim due outbox rows by pushing their next attempt past the lease,
+    so concurrent workers skip them while they are being sent.
+    """
+
+    now = timezone.now()
+
+    with transaction.atomic():
+        batch = list(
+            EmailOutbox.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=EmailOutbox.Status.PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at")[:batch_size]
+        )
+
+        EmailOutbox.objects.filter(pk__in=[item.pk for item in batch]).update(
+            next_attempt_at=now + OUTBOX_LEASE
+        )
+
+    return batch
+
+
+def drain_outbox(batch_size=50, connection=None):
+    """
+    Send one batch of due outbox emails over a single reused connection.
+    Failed emails are retried with exponential backoff until max_attempts.
+    Returns (sent, failed) counts for the batch.
+    """
+
+    batch = claim_outbox_batch(batch_size)
+    if not batch:
+        return 0, 0
+
+    connection = connection or get_connection()
+    sent = failed = 0
+
+    try:
+        connection.open()
+    except Exception as exc:
+        for item in batch:
+            record_outbox_failure(item, exc)
+        return 0, len(batch)
+
+    try:
+        for item in batch:
+            message = EmailMessage(
+                subject=item.subject,
+                body=item.body,
+                from_email=settings.EMAIL_HOST_USER,
+                to=[item.recipient],
+                connection=connection,
+            )
+
+            try:
+                message.send()
+            except Exception as exc:
+                failed += 1
+                record_outbox_failure(item, exc)
+            else:
+                sent += 1
+                EmailOutbox.objects.filter(pk=item.pk).update(
+                    status=EmailOutbox.Status.SENT,
+                    attempt_count=item.attempt_count + 1,
+                    sent_at=timezone.now(),
+                    last_error="",
+                )
+    finally:
+        connection.close()
+
+    return sent, failed
+
+
+def record_outbox_failure(item, exc):
+    attempts = item.attempt_count + 1
+    backoff = min(OUTBOX_BACKOFF_BASE * (2 ** item.attempt_count), OUTBOX_BACKOFF_MAX)
+
+    EmailOutbox.objects.filter(pk=item.pk).update(
+        attempt_count=attempts,
+        last_error=str(exc),
+        next_attempt_at=timezone.now() + backoff,
+        status=(
+            EmailOutbox.Status.FAILED
+            if attempts >= item.max_attempts
+            else EmailOutbox.Status.PENDING
+        ),
+    )
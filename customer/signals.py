@@ -1,8 +1,11 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.conf import settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
 
 from .models import CustomUser, CustomerProfile, DriverProfile
+from .context import invalidate_permission_context
+from .authentication import blacklist_jti
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
@@ -18,3 +21,25 @@ def create_user_profile(sender, instance, created, **kwargs):
 
     elif instance.role == CustomUser.Role.DRIVER:
         DriverProfile.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_save, sender=CustomerProfile)
+@receiver(post_save, sender=DriverProfile)
+def clear_permission_context(sender, instance, created, **kwargs):
+    """
+    Role, staff, completeness and approval changes must reach the cached
+    permission context straight away
+    """
+    user_id = instance.pk if sender is CustomUser else instance.user_id
+    invalidate_permission_context(user_id)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def cache_blacklisted_token(sender, instance, created, **kwargs):
+    """
+    StatelessJWTAuthentication checks revoked tokens in the cache, not the
+    blacklist table
+    """
+    if created:
+        blacklist_jti(instance.token.jti, instance.token.expires_at)
@@ -1,3 +1,535 @@
-from django.test import TestCase
+import datetime
+import io
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.conf import settings
+from django.core import mail
+from django.core.cache import caches
+from django.core.checks import run_checks
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from drf_spectacular.settings import spectacular_settings
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from core.checks import check_shared_caches
+from core.middleware import QUERY_COUNT_HEADER, QUERY_TIME_HEADER
+from core.testing import QueryBudgetTestCase, clear_caches, make_admin, make_customer, make_driver
+from core.views import read_schema_file, schema_path
+from .authentication import StatelessJWTAuthentication, blacklist_jti
+from .context import get_permission_context, load_permission_context
+from .models import CustomerProfile, EmailOTP, EmailOutbox
+from .permissions import IsCustomerProfileComplete
+from .serializers import MyTokenObtainPairSerializer
+from .services import OUTBOX_LEASE, claim_outbox_batch, drain_outbox, enqueue_email, send_otp
+from .throttles import OTPRegisterThrottle, OTPVerifyThrottle
 
-# Create your tests here.
+
+# Tests for the query budget response headers
+class QueryBudgetMiddlewareTests(QueryBudgetTestCase):
+
+    def test_headers_report_queries(self):
+        self.client.force_authenticate(make_customer())
+        response = self.client.get("/api/v1/profile/update/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(int(response[QUERY_COUNT_HEADER]), 0)
+        self.assertGreaterEqual(float(response[QUERY_TIME_HEADER]), 0)
+
+
+@override_settings(QUERY_BUDGET_HEADERS=False)
+class QueryBudgetMiddlewareDisabledTests(APITestCase):
+
+    def test_no_headers_when_disabled(self):
+        self.client.force_authenticate(make_customer())
+        response = self.client.get("/api/v1/profile/update/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header(QUERY_COUNT_HEADER))
+
+
+# Query budgets for the profile endpoints
+class ProfileQueryBudgetTests(QueryBudgetTestCase):
+
+    def test_customer_profile(self):
+        def call(size):
+            for index in range(size):
+                make_customer(f"customer{index}@example.com")
+            self.client.force_authenticate(make_customer())
+            return self.client.get("/api/v1/profile/update/")
+
+        self.assertQueryBudget(2, call)
+
+    def test_driver_profile_update(self):
+        def call(size):
+            for index in range(size):
+                make_driver(f"driver{index}@example.com")
+            self.client.force_authenticate(make_driver())
+            return self.client.put(
+                "/api/v1/profile/update/",
+                {"first_name": "Issah", "vehicle_type": "Royal Motor"},
+                format="json",
+            )
+
+        self.assertQueryBudget(5, call)
+
+
+# Tests for the cached permission context
+class PermissionContextTests(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.driver = make_driver()
+
+    def request_for(self, user):
+        return SimpleNamespace(user=user)
+
+    def test_loads_in_one_query(self):
+        with self.assertNumQueries(1):
+            context = load_permission_context(self.driver.pk)
+
+        self.assertEqual(context.role, "driver")
+        self.assertEqual(context.profile_id, self.driver.driverprofile.pk)
+        self.assertTrue(context.profile_complete)
+        self.assertTrue(context.approved)
+
+    def test_cached_across_requests(self):
+        get_permission_context(self.request_for(self.driver))
+
+        with self.assertNumQueries(0):
+            context = get_permission_context(self.request_for(self.driver))
+
+        self.assertTrue(context.profile_complete)
+
+    def test_profile_save_invalidates(self):
+        get_permission_context(self.request_for(self.driver))
+
+        profile = self.driver.driverprofile
+        profile.is_complete = False
+        profile.save()
+
+        self.assertFalse(get_permission_context(self.request_for(self.driver)).profile_complete)
+
+
+class DriverPollingTests(APITestCase):
+
+    def setUp(self):
+        clear_caches()
+        driver = make_driver()
+        token = RefreshToken.for_user(driver).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def poll(self):
+        return self.client.put(
+            "/api/v1/delivery/update/",
+            {"package_id": "PKGMISSING", "delivery_status": "picked_up"},
+            format="json",
+        )
+
+    def test_at_most_one_auth_query_per_poll(self):
+        self.poll()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.poll()
+
+        self.assertEqual(response.status_code, 400)
+        auth_queries = [query for query in queries if '"customer_' in query["sql"]]
+        self.assertEqual(len(auth_queries), 1)
+
+
+# Tests for authentication from the access token's permission claims
+class StatelessJWTAuthenticationTests(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.driver = make_driver()
+        self.refresh = MyTokenObtainPairSerializer.get_token(self.driver)
+        self.access = self.refresh.access_token
+
+    def authenticate(self, token):
+        request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        return request, StatelessJWTAuthentication().authenticate(request)
+
+    def test_no_queries_with_claims(self):
+        with self.assertNumQueries(0):
+            request, (user, _) = self.authenticate(self.access)
+            request.user = user
+            context = get_permission_context(request)
+
+        self.assertEqual(user.pk, self.driver.pk)
+        self.assertEqual(user.role, "driver")
+        self.assertTrue(context.approved)
+        self.assertEqual(context.profile_id, self.driver.driverprofile.pk)
+
+        # Other fields load on first access
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, self.driver.email)
+
+    def test_incomplete_profile_denied_without_queries(self):
+        customer = make_customer("incomplete@example.com")
+        CustomerProfile.objects.filter(user=customer).update(is_complete=False)
+        access = MyTokenObtainPairSerializer.get_token(customer).access_token
+        permission = IsCustomerProfileComplete()
+
+        with self.assertNumQueries(0):
+            request, (user, _) = self.authenticate(access)
+            request.user = user
+            self.assertFalse(permission.has_permission(request, None))
+
+        self.assertEqual(permission.message, "Complete your profile before creating/updating/cancelling orders.")
+
+    def test_profile_change_falls_back_to_database(self):
+        profile = self.driver.driverprofile
+        profile.is_complete = False
+        profile.save()
+
+        with self.assertNumQueries(1):
+            request, (user, _) = self.authenticate(self.access)
+
+        self.assertFalse(hasattr(request, "_permission_context"))
+        self.assertEqual(user.email, self.driver.email)
+
+    def test_token_without_claims_uses_database(self):
+        access = RefreshToken.for_user(self.driver).access_token
+
+        with self.assertNumQueries(1):
+            self.authenticate(access)
+
+    def test_blacklisted_token_rejected(self):
+        blacklist_jti(self.access["jti"], self.access.current_time + self.access.lifetime)
+
+        with self.assertRaises(InvalidToken):
+            self.authenticate(self.access)
+
+    def test_refresh_reissues_claims(self):
+        profile = self.driver.driverprofile
+        profile.approval_status = "rejected"
+        profile.save()
+
+        response = self.client.post("/api/v1/auth/token/refresh/", {"refresh": str(self.refresh)})
+        access = AccessToken(response.json()["access"])
+
+        self.assertFalse(access["approved"])
+        self.assertTrue(response.json()["refresh"])
+
+
+# Tests for the idle logout of admin sessions under WSGI and ASGI
+@override_settings(AUTO_LOGOUT={"IDLE_TIME": 60, "MESSAGE": "Session Expired. Please Login again."})
+class AutoLogoutMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_admin()
+
+    def log_in(self, client, idle_seconds):
+        client.force_login(self.admin)
+        session = client.session
+        session["django_auto_logout_last_request"] = (
+            timezone.now() - datetime.timedelta(seconds=idle_seconds)
+        ).isoformat()
+        session.save()
+
+    def assertLoggedOut(self, client, response):
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response["Location"].startswith("/admin/login/"))
+        self.assertNotIn("_auth_user_id", client.session)
+
+    def test_wsgi_idle_session_is_logged_out(self):
+        self.log_in(self.client, idle_seconds=120)
+        self.assertLoggedOut(self.client, self.client.get("/admin/"))
+
+    def test_wsgi_active_session_stays(self):
+        self.log_in(self.client, idle_seconds=10)
+        self.assertEqual(self.client.get("/admin/").status_code, 200)
+        self.assertIn("_auth_user_id", self.client.session)
+
+    def test_asgi_idle_session_is_logged_out(self):
+        client = AsyncClient()
+        self.log_in(client, idle_seconds=120)
+        self.assertLoggedOut(client, async_to_sync(client.get)("/admin/"))
+
+    def test_asgi_active_session_stays(self):
+        client = AsyncClient()
+        self.log_in(client, idle_seconds=10)
+        self.assertEqual(async_to_sync(client.get)("/admin/").status_code, 200)
+        self.assertIn("_auth_user_id", client.session)
+
+
+# Tests for the deploy check on process-local caches
+class SharedCacheCheckTests(TestCase):
+
+    locmem = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    redis = {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://localhost:6379/0"}
+
+    def warned_aliases(self, **caches):
+        with override_settings(CACHES={**settings.CACHES, **caches}):
+            return [warning.msg.split("'")[1] for warning in check_shared_caches(None)]
+
+    def test_warns_on_process_local_default_cache(self):
+        self.assertEqual(self.warned_aliases(default=self.locmem, throttle=self.redis), ["default"])
+
+    def test_shared_default_cache_passes(self):
+        self.assertNotIn("default", self.warned_aliases(default=self.redis))
+
+    def test_warns_on_process_local_throttle_cache(self):
+        self.assertEqual(self.warned_aliases(default=self.redis, throttle=self.locmem), ["throttle"])
+        self.assertEqual(self.warned_aliases(default=self.redis, throttle=self.redis), [])
+
+    def test_runs_with_deploy_checks_only(self):
+        with override_settings(CACHES={**settings.CACHES, "default": self.locmem}):
+            self.assertNotIn("core.W001", [warning.id for warning in run_checks()])
+            self.assertIn("core.W001", [warning.id for warning in run_checks(include_deployment_checks=True)])
+
+
+# Throttle counters must live in the shared "throttle" cache
+class ThrottleCacheTests(APITestCase):
+
+    def setUp(self):
+        clear_caches()
+
+    def test_otp_throttle_uses_throttle_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_cache = {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": directory}
+            with override_settings(CACHES={**settings.CACHES, "throttle": file_cache}):
+                statuses = [self.client.post("/api/v1/register/request/", {}).status_code for _ in range(4)]
+
+                self.assertEqual(statuses, [400, 400, 400, 429])
+                key = OTPRegisterThrottle().window_keys("ip:127.0.0.1", int(time.time() // 60))[0]
+                self.assertEqual(caches["throttle"].get(key), 4)
+                self.assertIsNone(caches["default"].get(key))
+
+
+# Tests for the sliding-window OTP throttles
+class SlidingWindowThrottleTests(APITestCase):
+
+    def setUp(self):
+        clear_caches()
+        # otp_verify allows 5 requests a minute; start on a window boundary
+        self.now = 6000.0
+        patcher = mock.patch.object(OTPVerifyThrottle, "timer", lambda throttle: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def verify(self, email="user@example.com", ip="10.0.0.1"):
+        return self.client.post(
+            "/api/v1/register/verify/", {"email": email, "otp": "123456"}, REMOTE_ADDR=ip
+        ).status_code
+
+    def test_limits_each_ip(self):
+        statuses = [self.verify(email=f"user{index}@example.com") for index in range(6)]
+        self.assertEqual(statuses, [400] * 5 + [429])
+
+        self.assertEqual(self.verify(email="other@example.com", ip="10.0.0.2"), 400)
+
+    def test_limits_each_email_across_ips(self):
+        statuses = [self.verify(email="User@Example.com ", ip=f"10.0.1.{index}") for index in range(6)]
+        self.assertEqual(statuses, [400] * 5 + [429])
+
+    def test_password_reset_verify_is_throttled(self):
+        for _ in range(5):
+            self.verify()
+
+        response = self.client.post(
+            "/api/v1/password-reset/verify/",
+            {"email": "user@example.com", "otp": "123456"},
+            REMOTE_ADDR="10.0.0.9",
+        )
+        self.assertEqual(response.status_code, 429)
+
+    def test_window_slides(self):
+        for _ in range(5):
+            self.verify()
+
+        # Half way into the next window half of the previous requests still count
+        self.now += 90
+        self.assertEqual([self.verify() for _ in range(3)], [400, 400, 429])
+
+        # A window later the first burst no longer counts
+        self.now += 60
+        self.assertEqual(self.verify(), 400)
+
+    def test_fixed_memory_per_key(self):
+        for _ in range(50):
+            self.verify()
+
+        counters = caches["throttle"].get_many(OTPVerifyThrottle().window_keys("ip:10.0.0.1", 100))
+        self.assertEqual(list(counters.values()), [50])
+
+
+# Tests for the prebuilt schema file and its ETag
+class CachedSchemaTests(APITestCase):
+
+    def setUp(self):
+        clear_caches()
+        read_schema_file.cache_clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+        patcher = override_settings(SCHEMA_CACHE_DIR=self.directory)
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+
+    def get(self, **headers):
+        return self.client.get("/api/schema/?format=json", headers=headers)
+
+    def test_not_modified_for_matching_etag_only(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        for header in [etag, f'"other", {etag}', f"W/{etag}"]:
+            with self.subTest(header=header):
+                response = self.get(if_none_match=header)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response["ETag"], etag)
+
+        # An entry that only contains the ETag as a substring is not a match
+        self.assertEqual(self.get(if_none_match=f'"x{etag[1:-1]}x"').status_code, 200)
+
+    def test_serves_an_existing_file_without_rebuilding(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(schema_path("json"), "wb") as schema_file:
+            schema_file.write(b'{"prebuilt": true}')
+
+        with mock.patch("core.views.build_schema_files") as build:
+            response = self.get()
+
+        build.assert_not_called()
+        self.assertEqual(response.content, b'{"prebuilt": true}')
+
+    def test_rebuilds_when_the_fingerprint_changes(self):
+        with mock.patch("core.views.schema_fingerprint", return_value="old"):
+            old = self.get()
+        with mock.patch("core.views.schema_fingerprint", return_value="new"):
+            new = self.get()
+
+        self.assertEqual((old["ETag"], new["ETag"]), ('"old-json"', '"new-json"'))
+        self.assertEqual(
+            sorted(os.listdir(self.directory)),
+            [f"openapi-{spectacular_settings.VERSION}-new.{fmt}" for fmt in ("json", "yaml")],
+        )
+
+
+# Tests for the OTP email outbox and its worker
+class EmailOutboxTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_customer()
+
+    def enqueue(self, count=1, **fields):
+        items = [
+            enqueue_email(subject=f"Subject {index}", body="Body", recipient=f"user{index}@example.com")
+            for index in range(count)
+        ]
+        if fields:
+            EmailOutbox.objects.filter(pk__in=[item.pk for item in items]).update(**fields)
+        return items
+
+    def failing_send(self):
+        return mock.patch.object(
+            locmem.EmailBackend, "send_messages", side_effect=OSError("Connection refused")
+        )
+
+    def assertDueIn(self, item, seconds):
+        item.refresh_from_db()
+        delay = (item.next_attempt_at - timezone.now()).total_seconds()
+        self.assertAlmostEqual(delay, seconds, delta=5)
+
+    def test_send_otp_only_enqueues(self):
+        send_otp(self.user, otp_purpose="registration")
+
+        self.assertEqual(mail.outbox, [])
+        item = EmailOutbox.objects.get()
+        self.assertEqual((item.recipient, item.status), (self.user.email, EmailOutbox.Status.PENDING))
+        self.assertIn(EmailOTP.objects.get(user=self.user).otp, item.body)
+
+    @override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+    def test_drain_sends_and_marks_rows_sent(self):
+        self.enqueue(3)
+
+        self.assertEqual(drain_outbox(), (3, 0))
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), [f"user{index}@example.com" for index in range(3)])
+        self.assertEqual(
+            list(EmailOutbox.objects.values_list("status", "attempt_count").distinct()),
+            [(EmailOutbox.Status.SENT, 1)],
+        )
+        self.assertFalse(EmailOutbox.objects.filter(sent_at__isnull=True).exists())
+
+        self.assertEqual(drain_outbox(), (0, 0))
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_command_sends_through_the_file_backend(self):
+        self.enqueue(2)
+
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(
+                EMAIL_BACKEND="django.core.mail.backends.filebased.EmailBackend", EMAIL_FILE_PATH=directory
+            ):
+                output = io.StringIO()
+                call_command("send_outbox", stdout=output)
+
+            [name] = os.listdir(directory)
+            with open(os.path.join(directory, name)) as sent:
+                content = sent.read()
+
+        self.assertIn("Outbox drained: 2 sent, 0 failed.", output.getvalue())
+        self.assertIn("Subject: Subject 0", content)
+        self.assertIn("Subject: Subject 1", content)
+
+    @override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+    def test_failures_back_off_exponentially(self):
+        [item] = self.enqueue(max_attempts=20)
+
+        with self.failing_send():
+            for attempts, seconds in enumerate([30, 60, 120, 240], start=1):
+                self.assertEqual(drain_outbox(), (0, 1))
+                self.assertDueIn(item, seconds)
+                self.assertEqual((item.attempt_count, item.status), (attempts, EmailOutbox.Status.PENDING))
+                self.assertEqual(item.last_error, "Connection refused")
+
+                # Not due again until the backoff has passed
+                self.assertEqual(drain_outbox(), (0, 0))
+                EmailOutbox.objects.filter(pk=item.pk).update(next_attempt_at=timezone.now())
+
+            # 30 s * 2 ** 9 is well over an hour
+            EmailOutbox.objects.filter(pk=item.pk).update(attempt_count=9)
+            self.assertEqual(drain_outbox(), (0, 1))
+            self.assertDueIn(item, 3600)
+
+    @override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+    def test_rows_fail_after_the_last_attempt(self):
+        [item] = self.enqueue(attempt_count=4)
+
+        with self.failing_send():
+            self.assertEqual(drain_outbox(), (0, 1))
+
+        item.refresh_from_db()
+        self.assertEqual((item.attempt_count, item.status), (5, EmailOutbox.Status.FAILED))
+
+        EmailOutbox.objects.filter(pk=item.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(drain_outbox(), (0, 0))
+        self.assertEqual(mail.outbox, [])
+
+    def test_claimed_rows_are_leased_from_other_drainers(self):
+        items = self.enqueue(2)
+
+        self.assertEqual(len(claim_outbox_batch(10)), 2)
+        for item in items:
+            self.assertDueIn(item, OUTBOX_LEASE.total_seconds())
+
+        # A second worker finds nothing due until the lease runs out
+        self.assertEqual(claim_outbox_batch(10), [])
+        self.assertEqual(drain_outbox(), (0, 0))
+
+        EmailOutbox.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(len(claim_outbox_batch(10)), 2)
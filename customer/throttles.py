@@ -1,13 +1,23 @@
-from rest_framework.throttling import SimpleRateThrottle
+from core.throttles import SlidingWindowRateThrottle
 
-class OTPVerifyThrottle(SimpleRateThrottle):
+class OTPVerifyThrottle(SlidingWindowRateThrottle):
+    """
+    OTP guesses per client IP and per email, so spreading attempts at one
+    account over many addresses does not raise its limit
+    """
     scope = "otp_verify"
 
-    def get_cache_key(self, request, view):
-        return self.get_ident(request)
+    def get_idents(self, request, view):
+        idents = [f"ip:{self.get_ident(request)}"]
 
-class OTPRegisterThrottle(SimpleRateThrottle):
+        email = request.data.get("email") if hasattr(request.data, "get") else None
+        if isinstance(email, str) and email.strip():
+            idents.append(f"email:{email.strip().lower()}")
+
+        return idents
+
+class OTPRegisterThrottle(SlidingWindowRateThrottle):
     scope = "otp_register"
 
-    def get_cache_key(self, request, view):
-        return self.get_ident(request)
\ No newline at end of file
+    def get_idents(self, request, view):
+        return [f"ip:{self.get_ident(request)}"]
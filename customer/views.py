@@ -7,7 +7,7 @@ from rest_framework.views import APIView
 from rest_framework import status
 from rest_framework import viewsets, permissions
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken,AccessToken
+from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenVerifyView, TokenRefreshView
 from .services import send_otp
 from rest_framework_simplejwt.exceptions import TokenError
@@ -19,6 +19,7 @@ from .serializers import (
     CustomerProfileSerializer,
     DriverProfileSerializer,
     MyTokenObtainPairSerializer,
+    MyTokenRefreshSerializer,
     RegisterRequestSerializer,
     RegisterVerifySerializer,
     RegisterConfirmSerializer,
@@ -35,7 +36,7 @@ from drf_spectacular.utils import (
     OpenApiResponse,
     OpenApiParameter
 )
-from rest_framework_simplejwt.serializers import TokenVerifySerializer,TokenRefreshSerializer
+from rest_framework_simplejwt.serializers import TokenVerifySerializer
 # Create your views here.
 
 UserR = get_user_model()
@@ -115,12 +116,12 @@ class MyTokenVerifyView(TokenVerifyView):
     
 
 class MyTokenRefreshView(TokenRefreshView):
-    serializer_class = TokenRefreshSerializer
+    serializer_class = MyTokenRefreshSerializer
     @extend_schema(
         tags=["Authentication"],
         summary="Token Refresh",
         description="Refresh generated access JWT tokens.",
-        request=TokenRefreshSerializer,
+        request=MyTokenRefreshSerializer,
         responses={200: OpenApiResponse(description="JWT token Refresh")},
         examples=[
             OpenApiExample(
@@ -355,7 +356,7 @@ class RegisterConfirmAPIView(APIView):
         user.is_active = True
         user.save()
 
-        refresh = RefreshToken.for_user(user)
+        refresh = MyTokenObtainPairSerializer.get_token(user)
         
         return Response(
                 {
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Delivery,Payment
+from .models import Delivery,Payment,RiderDailyStats,RiderPerformanceSummary,SummaryWatermark
 # Register your models here.
 @admin.register(Delivery)
 class DeliveryAdmin(admin.ModelAdmin):
@@ -12,4 +12,21 @@ class DeliveryAdmin(admin.ModelAdmin):
 class PaymentAdmin(admin.ModelAdmin):
     list_display = ("package_id", "amount", "payment_method", "payment_status", "paid_at")
     list_filter = ("payment_method", "payment_status")
-    search_fields = ("transaction_reference",)
\ No newline at end of file
+    search_fields = ("transaction_reference",)
+
+
+@admin.register(RiderDailyStats)
+class RiderDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ("rider", "day", "picked_up", "delivered", "transit_seconds")
+    list_filter = ("day",)
+
+
+@admin.register(RiderPerformanceSummary)
+class RiderPerformanceSummaryAdmin(admin.ModelAdmin):
+    list_display = ("rider", "delivered", "on_time_rate", "median_latency_seconds", "last_delivered_at")
+
+
+@admin.register(SummaryWatermark)
+class SummaryWatermarkAdmin(admin.ModelAdmin):
+    list_display = ("name", "processed_until")
+
@@ -1,5 +1,5 @@
 from django_filters import rest_framework as filters
-from .models import Delivery
+from .models import Delivery, RiderDailyStats, RiderPerformanceSummary
 
 class DeliveryFilter(filters.FilterSet):
     # Date Range Filters
@@ -17,3 +17,34 @@ class DeliveryFilter(filters.FilterSet):
     class Meta:
         model = Delivery
         fields = ['delivery_status', 'driver', 'package_id','start_delivered_date', 'end_delivered_date', 'start_pickup_date', 'end_pickup_date']
+
+
+class RiderDailyStatsFilter(filters.FilterSet):
+    start_date = filters.DateFilter(field_name="day", lookup_expr="gte")
+    end_date = filters.DateFilter(field_name="day", lookup_expr="lte")
+    driver = filters.NumberFilter(field_name="rider")
+
+    class Meta:
+        model = RiderDailyStats
+        fields = ["start_date", "end_date", "driver"]
+
+
+class RiderPerformanceFilter(filters.FilterSet):
+    driver = filters.NumberFilter(field_name="rider")
+    min_delivered = filters.NumberFilter(field_name="delivered", lookup_expr="gte")
+    min_on_time_rate = filters.NumberFilter(field_name="on_time_rate", lookup_expr="gte")
+    max_on_time_rate = filters.NumberFilter(field_name="on_time_rate", lookup_expr="lte")
+    max_median_latency = filters.NumberFilter(field_name="median_latency_seconds", lookup_expr="lte")
+    active_since = filters.DateTimeFilter(field_name="last_delivered_at", lookup_expr="gte")
+
+    class Meta:
+        model = RiderPerformanceSummary
+        fields = [
+            "driver",
+            "min_delivered",
+            "min_on_time_rate",
+            "max_on_time_rate",
+            "max_median_latency",
+            "active_since",
+        ]
+
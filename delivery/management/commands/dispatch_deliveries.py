@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from delivery.models import Delivery
+from delivery.services import dispatch_deliveries
+
+
+class Command(BaseCommand):
+    help = "Assign riders to unassigned deliveries, claiming one driver per order."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        queued = Delivery.objects.filter(rider__isnull=True, delivery_status=Delivery.Status.ASSIGNED)
+        before = queued.count()
+
+        while True:
+            batch = list(queued.order_by("assigned_at", "id")[:options["batch_size"]])
+            if not batch:
+                break
+
+            # Nothing in the batch could be assigned; it stays queued for the next run
+            if not dispatch_deliveries(batch):
+                break
+
+        remaining = queued.count()
+        if remaining:
+            self.stdout.write(self.style.WARNING(f"{remaining} delivery(ies) still wait for a driver."))
+
+        self.stdout.write(self.style.SUCCESS(f"Dispatched {before - remaining} delivery(ies)."))
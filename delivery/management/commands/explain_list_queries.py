@@ -0,0 +1,102 @@
+import re
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework.request import Request
+from delivery.views import DeliveryListAPIView
+from order.views import OrderListAPIView, PackageListAPIView
+
+User = get_user_model()
+
+# Index usage as reported by SQLite (EXPLAIN QUERY PLAN) and PostgreSQL
+INDEX_PATTERN = re.compile(
+    r"(?:USING (?:COVERING )?INDEX|Index (?:Only )?Scan(?: Backward)? using|Bitmap Index Scan on)\s+\"?(\w+)"
+)
+SORT_PATTERN = re.compile(r"TEMP B-TREE FOR ORDER BY|^\s*(?:->\s*)?(?:Incremental )?Sort\b", re.MULTILINE)
+
+# (label, view, role, query params)
+SCENARIOS = [
+    ("deliveries / driver", DeliveryListAPIView, "driver", {}),
+    ("deliveries / driver / assigned", DeliveryListAPIView, "driver", {"delivery_status": "assigned"}),
+    ("deliveries / admin", DeliveryListAPIView, "admin", {}),
+    ("deliveries / admin / delivered", DeliveryListAPIView, "admin", {"delivery_status": "delivered"}),
+    ("deliveries / customer", DeliveryListAPIView, "customer", {}),
+    ("orders / customer", OrderListAPIView, "customer", {}),
+    ("orders / admin", OrderListAPIView, "admin", {}),
+    ("orders / admin / pending", OrderListAPIView, "admin", {"orderstatus": "pending"}),
+    ("packages / admin", PackageListAPIView, "admin", {}),
+    ("packages / customer", PackageListAPIView, "customer", {}),
+]
+
+
+def build_list_queryset(view_class, user, params):
+    """
+    Build the exact queryset a list view would paginate for this user:
+    role-scoped get_queryset() followed by the view's filter backends.
+    """
+
+    django_request = RequestFactory().get("/", params)
+    django_request.user = user
+
+    view = view_class()
+    view.setup(django_request)
+    view.request = Request(django_request)
+    view.request.user = user
+    view.format_kwarg = None
+
+    queryset = view.filter_queryset(view.get_queryset())
+
+    page_size = view.paginator.get_page_size(view.request) if view.paginator else None
+    return queryset[:page_size] if page_size else queryset
+
+
+class Command(BaseCommand):
+    help = "Run EXPLAIN on the list endpoint querysets and report whether an index is used."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--driver", help="Email of the driver to explain as.")
+        parser.add_argument("--customer", help="Email of the customer to explain as.")
+        parser.add_argument("--admin", help="Email of the admin to explain as.")
+        parser.add_argument("--verbose-plan", action="store_true", help="Print the full plans.")
+
+    def get_user(self, role, email):
+        users = User.objects.filter(role=role)
+        if email:
+            users = users.filter(email=email)
+        user = users.order_by("id").first()
+
+        # OrderListAPIView scopes admins through is_staff
+        if user is not None and role == "admin":
+            user.is_staff = True
+        return user
+
+    def handle(self, *args, **options):
+        users = {
+            role: self.get_user(role, options[role])
+            for role in ("driver", "customer", "admin")
+        }
+        missing_index = 0
+
+        for label, view_class, role, params in SCENARIOS:
+            user = users[role]
+            if user is None:
+                self.stdout.write(self.style.WARNING(f"{label}: skipped, no {role} user found"))
+                continue
+
+            plan = build_list_queryset(view_class, user, params).explain()
+            indexes = sorted(set(INDEX_PATTERN.findall(plan)))
+            sorts = bool(SORT_PATTERN.search(plan))
+
+            if indexes:
+                line = f"{label}: index used ({', '.join(indexes)})"
+                if sorts:
+                    line += ", extra sort step"
+                self.stdout.write(self.style.SUCCESS(line))
+            else:
+                missing_index += 1
+                self.stdout.write(self.style.ERROR(f"{label}: no index used"))
+
+            if options["verbose_plan"]:
+                self.stdout.write(plan)
+
+        self.stdout.write(f"{missing_index} scenario(s) without index usage.")
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from delivery.models import RiderDailyStats
+from delivery.services import actual_rider_daily_stats
+from order.models import OrderStatusCount
+from order.services import actual_order_status_counts
+
+
+class Command(BaseCommand):
+    help = "Rebuild (or check) the order status and rider daily stats rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report stale rollup rows; exit non-zero if any.",
+        )
+
+    def handle(self, *args, **options):
+        stale = 0
+
+        counts = actual_order_status_counts()
+        stored_counts = dict(OrderStatusCount.objects.values_list("order_status", "count"))
+
+        for status, count in counts.items():
+            if stored_counts.get(status) != count:
+                stale += 1
+                self.stdout.write(f"orders {status}: {stored_counts.get(status)} -> {count}")
+
+        stats = actual_rider_daily_stats()
+        stored_stats = {
+            (row.rider_id, row.day): row for row in RiderDailyStats.objects.iterator(chunk_size=2000)
+        }
+
+        for key in sorted(stats.keys() | stored_stats.keys(), key=str):
+            actual = stats.get(key, {"picked_up": 0, "delivered": 0, "transit_seconds": 0.0})
+            row = stored_stats.get(key)
+            stored = (row.picked_up, row.delivered, round(row.transit_seconds, 3)) if row else None
+
+            if stored != (actual["picked_up"], actual["delivered"], round(actual["transit_seconds"], 3)):
+                stale += 1
+                self.stdout.write(f"rider {key[0]} {key[1]}: {stored} -> {actual}")
+
+        if options["check"]:
+            if stale:
+                raise CommandError(f"{stale} rollup row(s) are stale.")
+        elif stale:
+            with transaction.atomic():
+                for status, count in counts.items():
+                    OrderStatusCount.objects.update_or_create(
+                        order_status=status, defaults={"count": count}
+                    )
+
+                RiderDailyStats.objects.all().delete()
+                RiderDailyStats.objects.bulk_create(
+                    [
+                        RiderDailyStats(rider_id=rider_id, day=day, **values)
+                        for (rider_id, day), values in stats.items()
+                    ],
+                    batch_size=500,
+                )
+
+        action = "Found" if options["check"] else "Rebuilt"
+        self.stdout.write(self.style.SUCCESS(f"{action} {stale} stale rollup row(s)."))
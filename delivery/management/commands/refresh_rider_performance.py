@@ -0,0 +1,28 @@
+import datetime
+from django.core.management.base import BaseCommand
+from delivery.performance import DEFAULT_REFRESH_LAG, refresh_rider_performance
+
+
+class Command(BaseCommand):
+    help = "Add deliveries delivered since the last refresh to the rider performance summaries."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Drop the summaries and rebuild them from every delivery.",
+        )
+        parser.add_argument(
+            "--lag",
+            type=int,
+            default=int(DEFAULT_REFRESH_LAG.total_seconds()),
+            help="Seconds behind now to stop at, so in-flight deliveries are not skipped.",
+        )
+
+    def handle(self, *args, **options):
+        processed = refresh_rider_performance(
+            lag=datetime.timedelta(seconds=options["lag"]),
+            full=options["full"],
+        )
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} delivered delivery(ies)."))
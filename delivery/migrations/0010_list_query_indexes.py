@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-18 12:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0010_emailotp_otp_purpose'),
+        ('delivery', '0009_alter_delivery_delivery_status'),
+        ('order', '0013_order_delivery_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['rider', '-assigned_at'], name='delivery_rider_assigned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['-assigned_at'], name='delivery_assigned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['delivery_status', '-assigned_at'], name='delivery_status_assigned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['picked_up_at'], name='delivery_picked_up_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['delivered_at'], name='delivery_delivered_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(condition=models.Q(('delivery_status__in', ['assigned', 'picked_up'])), fields=['rider', '-assigned_at'], name='delivery_rider_active_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery', '0010_list_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='delivery',
+            name='id',
+            field=models.CharField(editable=False, max_length=24, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='id',
+            field=models.CharField(editable=False, max_length=24, primary_key=True, serialize=False),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 6.0 on 2026-10-18 09:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate
+
+
+def seed_rider_daily_stats(apps, schema_editor):
+    Delivery = apps.get_model("delivery", "Delivery")
+    RiderDailyStats = apps.get_model("delivery", "RiderDailyStats")
+
+    stats = {}
+    ridden = Delivery.objects.filter(rider__isnull=False).order_by()
+
+    pickups = (
+        ridden.filter(picked_up_at__isnull=False)
+        .annotate(day=TruncDate("picked_up_at"))
+        .values_list("rider_id", "day")
+        .annotate(count=Count("pk"))
+    )
+    for rider_id, day, count in pickups:
+        stats.setdefault((rider_id, day), RiderDailyStats(rider_id=rider_id, day=day)).picked_up = count
+
+    deliveries = (
+        ridden.filter(delivered_at__isnull=False)
+        .annotate(day=TruncDate("delivered_at"))
+        .values_list("rider_id", "day")
+        .annotate(
+            count=Count("pk"),
+            transit=Sum(
+                ExpressionWrapper(F("delivered_at") - F("picked_up_at"), output_field=DurationField()),
+                filter=Q(picked_up_at__isnull=False),
+            ),
+        )
+    )
+    for rider_id, day, count, transit in deliveries:
+        row = stats.setdefault((rider_id, day), RiderDailyStats(rider_id=rider_id, day=day))
+        row.delivered = count
+        row.transit_seconds = transit.total_seconds() if transit else 0.0
+
+    RiderDailyStats.objects.bulk_create(stats.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0012_driverprofile_active_orders'),
+        ('delivery', '0011_widen_ids'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RiderDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('picked_up', models.PositiveIntegerField(default=0)),
+                ('delivered', models.PositiveIntegerField(default=0)),
+                ('transit_seconds', models.FloatField(default=0)),
+                ('rider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='customer.driverprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-day'], name='rider_daily_stats_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('rider', 'day'), name='rider_daily_stats_unique')],
+            },
+        ),
+        migrations.RunPython(seed_rider_daily_stats, migrations.RunPython.noop),
+    ]
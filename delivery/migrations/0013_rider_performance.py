@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-18 09:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0012_driverprofile_active_orders'),
+        ('delivery', '0012_status_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SummaryWatermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('processed_until', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RiderPerformanceSummary',
+            fields=[
+                ('rider', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='performance', serialize=False, to='customer.driverprofile')),
+                ('delivered', models.PositiveIntegerField(default=0)),
+                ('first_delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('last_delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('scheduled', models.PositiveIntegerField(default=0)),
+                ('on_time', models.PositiveIntegerField(default=0)),
+                ('latency_histogram', models.JSONField(default=list)),
+                ('on_time_rate', models.FloatField(blank=True, null=True)),
+                ('median_latency_seconds', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-delivered', 'rider'], name='rider_perf_delivered_idx')],
+            },
+        ),
+    ]
@@ -18,7 +18,7 @@ class Delivery(models.Model):
         CANCELLED = "cancelled"
     id = models.CharField(
         primary_key=True,
-        max_length=12,
+        max_length=24,
         editable=False
     )
     package_id =  models.OneToOneField(Package, default=None, on_delete=models.CASCADE,related_name="deliveries")
@@ -36,6 +36,21 @@ class Delivery(models.Model):
         on_delete=models.SET_NULL,
         related_name="assigned_deliveries"
     )
+
+    class Meta:
+        # Match the role-scoped querysets in DeliveryListAPIView (-assigned_at)
+        indexes = [
+            models.Index(fields=["rider", "-assigned_at"], name="delivery_rider_assigned_idx"),
+            models.Index(fields=["-assigned_at"], name="delivery_assigned_idx"),
+            models.Index(fields=["delivery_status", "-assigned_at"], name="delivery_status_assigned_idx"),
+            models.Index(fields=["picked_up_at"], name="delivery_picked_up_idx"),
+            models.Index(fields=["delivered_at"], name="delivery_delivered_idx"),
+            models.Index(
+                fields=["rider", "-assigned_at"],
+                name="delivery_rider_active_idx",
+                condition=models.Q(delivery_status__in=["assigned", "picked_up"]),
+            ),
+        ]
     
     def save(self, *args, **kwargs):
         if not self.id:
@@ -47,6 +62,78 @@ class Delivery(models.Model):
         return self.id
     
 
+# Rollup of each rider's deliveries per day for dashboards, kept in step
+# by delivery.services. Days are local dates of the pickup/delivery events.
+class RiderDailyStats(models.Model):
+    rider = models.ForeignKey(
+        DriverProfile,
+        on_delete=models.CASCADE,
+        related_name="daily_stats"
+    )
+    day = models.DateField()
+    picked_up = models.PositiveIntegerField(default=0)
+    delivered = models.PositiveIntegerField(default=0)
+
+    # Summed picked_up_at -> delivered_at time of the deliveries delivered
+    # that day; divide by delivered for the average
+    transit_seconds = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["rider", "day"], name="rider_daily_stats_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["-day"], name="rider_daily_stats_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.rider_id} {self.day}"
+
+
+# Per-rider delivery performance, refreshed incrementally by the
+# refresh_rider_performance command (see delivery.performance)
+class RiderPerformanceSummary(models.Model):
+    rider = models.OneToOneField(
+        DriverProfile,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name="performance"
+    )
+    delivered = models.PositiveIntegerField(default=0)
+    first_delivered_at = models.DateTimeField(null=True, blank=True)
+    last_delivered_at = models.DateTimeField(null=True, blank=True)
+
+    # Deliveries whose order has a delivery_date, and how many of them were
+    # delivered on or before it
+    scheduled = models.PositiveIntegerField(default=0)
+    on_time = models.PositiveIntegerField(default=0)
+
+    # Counts of assigned_at -> delivered_at latencies per
+    # delivery.performance.LATENCY_BUCKETS bucket
+    latency_histogram = models.JSONField(default=list)
+
+    # Derived from the counts above on every refresh, for filtering and ordering
+    on_time_rate = models.FloatField(null=True, blank=True)
+    median_latency_seconds = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-delivered", "rider"], name="rider_perf_delivered_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.rider_id}: {self.delivered} delivered"
+
+
+# Position up to which an incremental summary has processed its source rows
+class SummaryWatermark(models.Model):
+    name = models.CharField(primary_key=True, max_length=50)
+    processed_until = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name}: {self.processed_until}"
+
+
 # Model for Payment
 # This is linked to the Package for the orders
 class Payment(models.Model):
@@ -61,7 +148,7 @@ class Payment(models.Model):
         
     id = models.CharField(
         primary_key=True,
-        max_length=12,
+        max_length=24,
         editable=False
     )
     package_id = models.OneToOneField(Package, default=None, on_delete=models.CASCADE,related_name="payment")
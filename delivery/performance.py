@@ -0,0 +1,177 @@
+"""
+Incremental rider performance summaries.
+
+Each RiderPerformanceSummary holds running counts for one rider: deliveries
+delivered, how many of the scheduled ones (orders with a delivery_date) were
+delivered by that date, and a histogram of assigned_at -> delivered_at
+latencies from which the median is read. Counts only ever grow, so a refresh
+reads just the deliveries delivered since the "rider_performance" watermark
+and adds them to the stored rows.
+
+Delivered is a final status and delivered_at is written once, so
+delivered_at is the change marker. A refresh stops `lag` short of now: a
+delivery committed late by a long transaction still has a delivered_at after
+the watermark when it becomes visible.
+"""
+import bisect
+import datetime
+from django.db import transaction
+from django.utils import timezone
+from .models import Delivery, RiderPerformanceSummary, SummaryWatermark
+
+WATERMARK_NAME = "rider_performance"
+
+# Upper edges, in seconds, of the latency histogram buckets; a last bucket
+# holds everything slower
+LATENCY_BUCKETS = [
+    minutes * 60
+    for minutes in (5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 240, 360, 480, 720, 1440, 2880, 4320, 10080)
+]
+
+# How far behind now a refresh stops, so in-flight transactions can commit
+DEFAULT_REFRESH_LAG = datetime.timedelta(minutes=5)
+
+# Deliveries read per database round trip during a refresh
+REFRESH_CHUNK_SIZE = 2000
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def latency_bucket(seconds):
+    return bisect.bisect_left(LATENCY_BUCKETS, seconds)
+
+
+def histogram_median(histogram):
+    """
+    Median latency in seconds estimated from bucket counts, interpolating
+    linearly inside the bucket that holds it. None for an empty histogram.
+    """
+
+    total = sum(histogram)
+    if not total:
+        return None
+
+    middle = total / 2
+    seen = 0
+
+    for index, count in enumerate(histogram):
+        if count and seen + count >= middle:
+            lower = LATENCY_BUCKETS[index - 1] if index else 0
+            if index == len(LATENCY_BUCKETS):
+                # Open-ended last bucket; its lower edge is the best bound
+                return float(lower)
+            upper = LATENCY_BUCKETS[index]
+            return lower + (upper - lower) * (middle - seen) / count
+        seen += count
+
+    return None
+
+
+def empty_summary(rider_id):
+    return RiderPerformanceSummary(
+        rider_id=rider_id, latency_histogram=[0] * (len(LATENCY_BUCKETS) + 1)
+    )
+
+
+def add_delivery(summary, assigned_at, delivered_at, delivery_date):
+    """
+    Add one delivered delivery to a summary's counts.
+    """
+
+    summary.delivered += 1
+
+    if summary.first_delivered_at is None or delivered_at < summary.first_delivered_at:
+        summary.first_delivered_at = delivered_at
+    if summary.last_delivered_at is None or delivered_at > summary.last_delivered_at:
+        summary.last_delivered_at = delivered_at
+
+    if delivery_date is not None:
+        summary.scheduled += 1
+        if timezone.localdate(delivered_at) <= delivery_date:
+            summary.on_time += 1
+
+    summary.latency_histogram[latency_bucket((delivered_at - assigned_at).total_seconds())] += 1
+
+
+def merge_summary(summary, delta):
+    """
+    Add the counts of `delta` to a stored summary and refresh its derived
+    fields.
+    """
+
+    summary.delivered += delta.delivered
+    summary.scheduled += delta.scheduled
+    summary.on_time += delta.on_time
+    summary.first_delivered_at = min(
+        filter(None, [summary.first_delivered_at, delta.first_delivered_at])
+    )
+    summary.last_delivered_at = max(
+        filter(None, [summary.last_delivered_at, delta.last_delivered_at])
+    )
+
+    histogram = summary.latency_histogram
+    histogram.extend([0] * (len(delta.latency_histogram) - len(histogram)))
+    for index, count in enumerate(delta.latency_histogram):
+        histogram[index] += count
+
+    summary.on_time_rate = summary.on_time / summary.scheduled if summary.scheduled else None
+    summary.median_latency_seconds = histogram_median(histogram)
+
+
+def refresh_rider_performance(lag=DEFAULT_REFRESH_LAG, full=False):
+    """
+    Add the deliveries delivered since the watermark to the rider summaries
+    and move the watermark up to now - `lag`. `full` drops the summaries and
+    starts again from the first delivery. Returns the number of deliveries
+    processed.
+    """
+
+    with transaction.atomic():
+        watermark, _ = SummaryWatermark.objects.select_for_update().get_or_create(
+            name=WATERMARK_NAME, defaults={"processed_until": EPOCH}
+        )
+
+        if full:
+            RiderPerformanceSummary.objects.all().delete()
+            watermark.processed_until = EPOCH
+
+        until = timezone.now() - lag
+        if until <= watermark.processed_until:
+            return 0
+
+        deliveries = (
+            Delivery.objects
+            .filter(
+                rider__isnull=False,
+                delivered_at__gt=watermark.processed_until,
+                delivered_at__lte=until,
+            )
+            .order_by()
+            .values_list("rider_id", "assigned_at", "delivered_at", "package_id__order_id__delivery_date")
+        )
+
+        # One pass over the new deliveries, summed per rider
+        deltas = {}
+        processed = 0
+
+        for rider_id, assigned_at, delivered_at, delivery_date in deliveries.iterator(chunk_size=REFRESH_CHUNK_SIZE):
+            if rider_id not in deltas:
+                deltas[rider_id] = empty_summary(rider_id)
+            add_delivery(deltas[rider_id], assigned_at, delivered_at, delivery_date)
+            processed += 1
+
+        summaries = RiderPerformanceSummary.objects.select_for_update().in_bulk(list(deltas))
+
+        for rider_id, delta in deltas.items():
+            summary = summaries.setdefault(rider_id, empty_summary(rider_id))
+            merge_summary(summary, delta)
+
+        # Rewriting the locked rows is far cheaper than a bulk_update, whose
+        # CASE per field and row costs more to build than to run
+        RiderPerformanceSummary.objects.filter(pk__in=list(summaries)).delete()
+        RiderPerformanceSummary.objects.bulk_create(list(summaries.values()), batch_size=500)
+
+        watermark.processed_until = until
+        watermark.save(update_fields=["processed_until"])
+
+    return processed
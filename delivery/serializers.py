@@ -1,8 +1,19 @@
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
-from .models import Delivery, Payment
-from order.models import Package, Order
-from datetime import datetime
+from .models import Delivery, Payment, RiderDailyStats, RiderPerformanceSummary
+from order.models import Package
+from customer.context import get_permission_context
 from django.db import transaction
+from core.ids import unused_ids
+from .utils import generate_delivery_ids
+from .services import apply_delivery_updates, dispatch_deliveries, transition_error
+from order.services import add_order_deliveries
+
+# Rows per INSERT statement when bulk creating deliveries
+DELIVERY_BULK_BATCH_SIZE = 500
+
+# Packages accepted by one batch status update
+DELIVERY_UPDATE_BATCH_MAX = 200
 
 # Serializer for Delivery
 class DeliverySerializer(serializers.ModelSerializer):
@@ -27,58 +38,89 @@ class PaymentSerializer(serializers.ModelSerializer):
 # Serializer for DeliveryItem
 # Used in Creating deliveries serializer
 class DeliveryItemSerializer(serializers.Serializer):
-    package_id = serializers.PrimaryKeyRelatedField(
-        queryset=Package.objects.all()
-    )
+    # Resolved for the whole batch in CreateDeliveriesSerializer.validate
+    package_id = serializers.CharField()
     address = serializers.CharField(required=False, allow_blank=True)
 
+
+# Serializer for Creating deliveries for multiple packages
+class CreateDeliveriesSerializer(serializers.Serializer):
+    deliveries = DeliveryItemSerializer(many=True)
+
     def validate(self, attrs):
-        package = attrs["package_id"]
+        items = attrs["deliveries"]
 
-        # Prevent duplicate delivery
-        if hasattr(package, "deliveries"):
+        if not items:
             raise serializers.ValidationError(
-                f"Package {package.id} already has a delivery."
+                "At least one delivery is required."
             )
 
-        order = package.order_id  
+        package_ids = [item["package_id"] for item in items]
 
-        if not order.driver_id:
-            raise serializers.ValidationError(
-                f"Order {order.id} has no driver assigned."
-            )
+        # One query for the packages with their orders and drivers
+        packages = (
+            Package.objects
+            .select_related("order_id__driver_id")
+            .in_bulk(package_ids)
+        )
 
-        attrs["rider"] = order.driver_id
-        return attrs
-    
+        # One query for packages that already have a delivery
+        delivered_packages = set(
+            Delivery.objects
+            .filter(package_id__in=package_ids)
+            .values_list("package_id", flat=True)
+        )
 
+        errors = []
+        seen = set()
 
-# Serializer for Creating deliveries for multiple packages
-class CreateDeliveriesSerializer(serializers.Serializer):
-    deliveries = DeliveryItemSerializer(many=True)
+        for item in items:
+            package_id = item["package_id"]
+            package = packages.get(package_id)
+
+            if package is None:
+                errors.append(f"Package {package_id} does not exist.")
+                continue
+
+            # Prevent duplicate delivery
+            if package_id in delivered_packages or package_id in seen:
+                errors.append(f"Package {package_id} already has a delivery.")
+                continue
+
+            seen.add(package_id)
+
+            # Orders without a driver claim one when dispatched after the insert
+            item["package"] = package
+            item["rider"] = package.order_id.driver_id
+
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        return attrs
 
     def create(self, validated_data):
         deliveries_data = validated_data["deliveries"]
 
-        delivery_objects = []
-
-        for item in deliveries_data:
-            rider = item.pop("rider")
-            package = item["package_id"]
+        # Pre-generate ids, skipping any that are already taken
+        delivery_ids = unused_ids(Delivery, generate_delivery_ids, len(deliveries_data))
 
-            delivery_objects.append(
-                Delivery(
-                    package_id=package,
-                    rider=rider,
-                    address=item.get("address", "")
-                )
+        delivery_objects = [
+            Delivery(
+                id=delivery_id,
+                package_id=item["package"],
+                rider=item["rider"],
+                address=item.get("address", "")
             )
+            for delivery_id, item in zip(delivery_ids, deliveries_data)
+        ]
 
-        created_deliveries = []
+        created_deliveries = Delivery.objects.bulk_create(
+            delivery_objects,
+            batch_size=DELIVERY_BULK_BATCH_SIZE
+        )
 
-        for delivery in delivery_objects:
-            delivery.save() 
-            created_deliveries.append(delivery)
+        add_order_deliveries(created_deliveries)
+        dispatch_deliveries(created_deliveries)
 
         return created_deliveries
 
@@ -107,70 +149,166 @@ class DriverDeliveryUpdateSerializer(serializers.Serializer):
         
                 
         # Ensure delivery belongs to this rider
-        if delivery.rider.user != request.user:
+        context = get_permission_context(request)
+        if context is None or delivery.rider_id != context.profile_id:
             raise serializers.ValidationError(
                 "You can only update deliveries assigned to you."
             )
         
-        new_delivery_status = attrs["delivery_status"]
-        current_status = delivery.delivery_status
-
         # Prevent rollback
-        valid_transitions = {
-            "assigned": ["picked_up"],
-            "picked_up": ["delivered"],
-            "delivered": []
-        }
-
-        if new_delivery_status not in valid_transitions[current_status]:
-            raise serializers.ValidationError(
-                f"Invalid status transition from '{current_status}' to '{new_delivery_status}'."
-            )
+        error = transition_error(delivery.delivery_status, attrs["delivery_status"])
+        if error:
+            raise serializers.ValidationError(error)
 
         attrs["delivery"] = delivery
+        attrs["rider_id"] = context.profile_id
         return attrs
 
     def create(self, validated_data):
 
         with transaction.atomic():
-
-            delivery = Delivery.objects.select_for_update().get(
-                pk=validated_data["delivery"].pk
+            [delivery] = apply_delivery_updates(
+                validated_data["rider_id"],
+                {
+                    validated_data["delivery"].pk: (
+                        validated_data["delivery_status"],
+                        validated_data.get("delivery_notes", ""),
+                    )
+                },
             )
 
-            new_status = validated_data["delivery_status"]
-            delivery.delivery_notes = validated_data.get("delivery_notes", "")
+        return delivery
+
+
+# Serializer for one package of a batch delivery status update
+class DriverDeliveryStatusSerializer(serializers.Serializer):
+    package_id = serializers.CharField()
+    delivery_status = serializers.CharField()
+    delivery_notes = serializers.CharField(required=False, allow_blank=True)
 
-            if new_status == "picked_up":
-                delivery.picked_up_at = datetime.now()
 
-            if new_status == "delivered":
-                delivery.delivered_at = datetime.now()
+# Serializer for batch delivery status updates by assigned driver/riders
+class DriverDeliveryBatchUpdateSerializer(serializers.Serializer):
+    updates = DriverDeliveryStatusSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=DELIVERY_UPDATE_BATCH_MAX
+    )
 
-            delivery.delivery_status = new_status
-            delivery.save()
+    def validate(self, attrs):
+        items = attrs["updates"]
+        context = get_permission_context(self.context["request"])
+        rider_id = context.profile_id if context else None
+
+        # One query for the deliveries of every package
+        deliveries = {
+            row["package_id"]: row
+            for row in Delivery.objects
+            .filter(package_id__in=[item["package_id"] for item in items])
+            .values("pk", "package_id", "rider_id", "delivery_status")
+        }
 
-            order = delivery.package_id.order_id
+        errors = []
+        seen = set()
 
-            if new_status == "picked_up" and order.order_status != Order.Status.IN_TRANSIT:
-                order.order_status = Order.Status.IN_TRANSIT
-                order.save()
+        for item in items:
+            package_id = item["package_id"]
+            delivery = deliveries.get(package_id)
 
-            total = Delivery.objects.filter(
-                package_id__order_id=order.id
-            ).count()
+            if package_id in seen:
+                errors.append(f"Package {package_id} appears more than once.")
+                continue
 
-            delivered_count = Delivery.objects.filter(
-                package_id__order_id=order.id,
-                delivery_status=Delivery.Status.DELIVERED
-            ).count()
+            seen.add(package_id)
 
-            if total > 0 and total == delivered_count:
-                order.order_status = Order.Status.DELIVERED
-                order.save()
+            if delivery is None:
+                errors.append(f"Delivery not found for package {package_id}.")
+                continue
 
-                driver = delivery.rider
-                driver.availability_status = True
-                driver.save()
+            # Ensure delivery belongs to this rider
+            if rider_id is None or delivery["rider_id"] != rider_id:
+                errors.append(f"Package {package_id}: You can only update deliveries assigned to you.")
+                continue
+
+            error = transition_error(delivery["delivery_status"], item["delivery_status"])
+            if error:
+                errors.append(f"Package {package_id}: {error}")
+                continue
+
+            item["delivery_id"] = delivery["pk"]
+
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        attrs["rider_id"] = rider_id
+        return attrs
+
+    def create(self, validated_data):
+        updates = {
+            item["delivery_id"]: (item["delivery_status"], item.get("delivery_notes", ""))
+            for item in validated_data["updates"]
+        }
+
+        with transaction.atomic():
+            return apply_delivery_updates(validated_data["rider_id"], updates)
+
+
+# Serializer for a rider's deliveries on one day
+class RiderDailyStatsSerializer(serializers.ModelSerializer):
+    average_transit_seconds = serializers.SerializerMethodField()
+
+    class Meta:
+        model = RiderDailyStats
+        fields = [
+            "rider",
+            "day",
+            "picked_up",
+            "delivered",
+            "transit_seconds",
+            "average_transit_seconds",
+        ]
+
+    @extend_schema_field(serializers.FloatField(allow_null=True))
+    def get_average_transit_seconds(self, stats):
+        return stats.transit_seconds / stats.delivered if stats.delivered else None
+
+
+# Serializer for the deliveries of every rider on one day
+class DeliveryDailyStatsSerializer(serializers.Serializer):
+    day = serializers.DateField()
+    riders = serializers.IntegerField()
+    picked_up = serializers.IntegerField()
+    delivered = serializers.IntegerField()
+    average_transit_seconds = serializers.SerializerMethodField()
+
+    @extend_schema_field(serializers.FloatField(allow_null=True))
+    def get_average_transit_seconds(self, stats):
+        return stats["transit_seconds"] / stats["delivered"] if stats["delivered"] else None
+
+
+# Serializer for a rider's performance summary
+class RiderPerformanceSerializer(serializers.ModelSerializer):
+    deliveries_per_day = serializers.SerializerMethodField()
+
+    class Meta:
+        model = RiderPerformanceSummary
+        fields = [
+            "rider",
+            "delivered",
+            "deliveries_per_day",
+            "scheduled",
+            "on_time",
+            "on_time_rate",
+            "median_latency_seconds",
+            "first_delivered_at",
+            "last_delivered_at",
+        ]
+
+    @extend_schema_field(serializers.FloatField(allow_null=True))
+    def get_deliveries_per_day(self, summary):
+        # Throughput over the days from the first delivery to the last
+        if not summary.delivered:
+            return None
+        days = (summary.last_delivered_at.date() - summary.first_delivered_at.date()).days + 1
+        return summary.delivered / days
 
-        return delivery
@@ -1,24 +1,275 @@
+from collections import Counter, defaultdict
 from customer.models import DriverProfile
-from .models import Delivery
-from django.db.models import Count
+from order.models import Order
+from order.services import claim_drivers, count_order_statuses, move_order_status, record_delivery_delivered, release_driver
+from .models import Delivery, RiderDailyStats
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from rest_framework import serializers
+
+# Statuses a driver may move a delivery to; no rollback
+DELIVERY_TRANSITIONS = {
+    Delivery.Status.ASSIGNED: (Delivery.Status.PICKED_UP,),
+    Delivery.Status.PICKED_UP: (Delivery.Status.DELIVERED,),
+    Delivery.Status.DELIVERED: (),
+    Delivery.Status.CANCELLED: (),
+}
+
+# Rows per UPDATE statement when bulk updating deliveries
+DELIVERY_BULK_UPDATE_BATCH_SIZE = 500
+
+
+def dispatch_deliveries(deliveries):
+    """
+    Assign unassigned deliveries their order's driver.
+
+    Every delivery of an order goes to the order's driver, so the driver can
+    pick the order up as a whole. The batch's orders are locked in one query,
+    the pending ones without a driver claim drivers together with
+    claim_drivers() and move to assigned, and the riders of all their
+    unassigned deliveries, including ones outside the batch, are written
+    with one bulk_update. Orders left without a driver stay queued. Returns
+    the given deliveries that were assigned.
+    """
+
+    deliveries = {delivery.pk: delivery for delivery in deliveries if delivery.rider_id is None}
+    if not deliveries:
+        return []
+
+    with transaction.atomic():
+        orders = (
+            Order.objects
+            .select_for_update()
+            .filter(pk__in=Delivery.objects.filter(pk__in=list(deliveries)).values("package_id__order_id"))
+            .order_by("pk")
+            .in_bulk()
+        )
+
+        driverless = [
+            order for order in orders.values()
+            if order.driver_id_id is None and order.order_status == Order.Status.PENDING
+        ]
+        claimed = []
+        for order, driver in zip(driverless, claim_drivers(len(driverless))):
+            order.driver_id = driver
+            order.order_status = Order.Status.ASSIGNED
+            claimed.append(order)
+
+        if claimed:
+            Order.objects.bulk_update(claimed, ["driver_id", "order_status"])
+            move_order_status(Order.Status.PENDING, Order.Status.ASSIGNED, len(claimed))
+
+        unassigned = list(
+            Delivery.objects
+            .filter(
+                package_id__order_id__in=[pk for pk, order in orders.items() if order.driver_id_id],
+                rider__isnull=True,
+            )
+            .annotate(order_pk=F("package_id__order_id"))
+        )
+        for delivery in unassigned:
+            delivery.rider_id = orders[delivery.order_pk].driver_id_id
+
+        Delivery.objects.bulk_update(unassigned, ["rider"], batch_size=DELIVERY_BULK_UPDATE_BATCH_SIZE)
+
+    assigned = []
+    for delivery in unassigned:
+        if delivery.pk in deliveries:
+            deliveries[delivery.pk].rider_id = delivery.rider_id
+            assigned.append(deliveries[delivery.pk])
+
+    return assigned
 
 
 def assign_rider_to_delivery(delivery):
     """
-    Assign the least busy available rider to a delivery.
+    Assign a delivery to its order's driver, claiming one if the order has
+    none.
     """
 
-    rider = (
-        DriverProfile.objects
-        .filter(is_available=True)
-        .annotate(active_jobs=Count("assigned_deliveries"))
-        .order_by("active_jobs")
-        .first()
+    dispatch_deliveries([delivery])
+    return delivery.rider if delivery.rider_id else None
+
+
+def add_rider_stats(rider_id, day, **counts):
+    """
+    Add counts (picked_up, delivered, transit_seconds) to a rider's
+    RiderDailyStats row for `day`, creating the row on its first event.
+    """
+
+    counts = {field: amount for field, amount in counts.items() if amount}
+    if not counts:
+        return
+
+    increments = {field: F(field) + amount for field, amount in counts.items()}
+    rows = RiderDailyStats.objects.filter(rider_id=rider_id, day=day)
+
+    if rows.update(**increments):
+        return
+
+    # First event of the day; another request may be creating the row too
+    RiderDailyStats.objects.bulk_create(
+        [RiderDailyStats(rider_id=rider_id, day=day)], ignore_conflicts=True
     )
+    rows.update(**increments)
+
 
-    if rider:
-        delivery.rider = rider
-        delivery.status = "Assigned"
-        delivery.save()
+def actual_rider_daily_stats():
+    """
+    {(rider id, day): {picked_up, delivered, transit_seconds}} computed from
+    Delivery rows. Used to rebuild and check RiderDailyStats.
+    """
+
+    stats = defaultdict(lambda: {"picked_up": 0, "delivered": 0, "transit_seconds": 0.0})
+    ridden = Delivery.objects.filter(rider__isnull=False).order_by()
+
+    pickups = (
+        ridden.filter(picked_up_at__isnull=False)
+        .annotate(day=TruncDate("picked_up_at"))
+        .values_list("rider_id", "day")
+        .annotate(count=Count("pk"))
+    )
+    for rider_id, day, count in pickups:
+        stats[(rider_id, day)]["picked_up"] = count
+
+    deliveries = (
+        ridden.filter(delivered_at__isnull=False)
+        .annotate(day=TruncDate("delivered_at"))
+        .values_list("rider_id", "day")
+        .annotate(
+            count=Count("pk"),
+            transit=Sum(
+                ExpressionWrapper(F("delivered_at") - F("picked_up_at"), output_field=DurationField()),
+                filter=Q(picked_up_at__isnull=False),
+            ),
+        )
+    )
+    for rider_id, day, count, transit in deliveries:
+        stats[(rider_id, day)]["delivered"] = count
+        stats[(rider_id, day)]["transit_seconds"] = transit.total_seconds() if transit else 0.0
+
+    return dict(stats)
+
+
+def transition_error(current_status, new_status):
+    """
+    Error message for a driver status change, or None if it is allowed.
+    """
+
+    if new_status not in DELIVERY_TRANSITIONS.get(current_status, ()):
+        return f"Invalid status transition from '{current_status}' to '{new_status}'."
+    return None
+
+
+def apply_delivery_updates(rider_id, updates):
+    """
+    Apply driver status changes, {delivery id: (new status, notes)}.
+
+    Call inside a transaction. The orders of the deliveries are locked first,
+    in the same order as pick_up_order takes them, then the deliveries;
+    ownership and transitions are re-checked under the locks and the
+    deliveries written with one bulk_update.
+    Each affected order is advanced once: moved to in transit on its first
+    pickup, and its delivered counter bumped by the number delivered, which
+    completes it when every delivery is in. Returns the updated deliveries.
+    """
+
+    # Concurrent updates on one order see each other's status changes, so
+    # the driver is released and the rollup moved exactly once
+    orders = {
+        order.pk: order
+        for order in Order.objects
+        .select_for_update()
+        .filter(pk__in=Delivery.objects.filter(pk__in=list(updates)).values("package_id__order_id"))
+        .order_by("pk")
+    }
+
+    deliveries = list(
+        Delivery.objects
+        .select_for_update()
+        .filter(pk__in=list(updates))
+        .annotate(order_pk=F("package_id__order_id"))
+        .order_by("pk")
+    )
+
+    errors = []
+    for delivery in deliveries:
+        if delivery.rider_id != rider_id:
+            errors.append(f"Delivery {delivery.pk} is not assigned to you.")
+            continue
+
+        error = transition_error(delivery.delivery_status, updates[delivery.pk][0])
+        if error:
+            errors.append(f"Delivery {delivery.pk}: {error}")
+
+    if len(deliveries) != len(updates):
+        errors.append("Some deliveries no longer exist.")
+
+    if errors:
+        raise serializers.ValidationError(errors)
+
+    now = timezone.now()
+    picked_up_orders = set()
+    delivered_per_order = Counter()
+    picked_up = 0
+    transit_seconds = 0.0
+
+    for delivery in deliveries:
+        new_status, notes = updates[delivery.pk]
+        delivery.delivery_status = new_status
+        delivery.delivery_notes = notes
+
+        if new_status == Delivery.Status.PICKED_UP:
+            delivery.picked_up_at = now
+            picked_up_orders.add(delivery.order_pk)
+            picked_up += 1
+
+        if new_status == Delivery.Status.DELIVERED:
+            delivery.delivered_at = now
+            delivered_per_order[delivery.order_pk] += 1
+            if delivery.picked_up_at:
+                transit_seconds += (now - delivery.picked_up_at).total_seconds()
+
+    Delivery.objects.bulk_update(
+        deliveries,
+        ["delivery_status", "delivery_notes", "picked_up_at", "delivered_at"],
+        batch_size=DELIVERY_BULK_UPDATE_BATCH_SIZE,
+    )
+
+    completed = False
+    status_changes = Counter()
+
+    for order_id in sorted(picked_up_orders):
+        order = orders[order_id]
+        if order.order_status != Order.Status.IN_TRANSIT:
+            release_driver(order)
+            status_changes[order.order_status] -= 1
+            status_changes[Order.Status.IN_TRANSIT] += 1
+            order.order_status = Order.Status.IN_TRANSIT
+            order.save(update_fields=["order_status"])
+
+    # Completion is read from the order's counters, not counted
+    for order_id, count in sorted(delivered_per_order.items()):
+        order = orders[order_id]
+        if record_delivery_delivered(order, count):
+            status_changes[order.order_status] -= 1
+            status_changes[Order.Status.DELIVERED] += 1
+            order.order_status = Order.Status.DELIVERED
+            order.save(update_fields=["order_status"])
+            completed = True
+
+    if completed:
+        DriverProfile.objects.filter(pk=rider_id).update(availability_status=True)
+
+    count_order_statuses(status_changes)
+    add_rider_stats(
+        rider_id,
+        timezone.localdate(now),
+        picked_up=picked_up,
+        delivered=sum(delivered_per_order.values()),
+        transit_seconds=transit_seconds,
+    )
 
-    return rider
\ No newline at end of file
+    return deliveries
@@ -1,3 +1,945 @@
+import csv
+import datetime
+import io
+import json
+import re
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import TestCase
+from django.utils import timezone
+from drf_spectacular.generators import SchemaGenerator
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+from core.serializers import values_serializer_for
+from core.testing import QueryBudgetTestCase, clear_caches, make_admin, make_customer, make_driver
+from customer.models import DriverProfile
+from order.models import Order
+from order.models import OrderStatusCount
+from order.services import actual_order_status_counts, add_order_deliveries
+from order.tests import seed_packages
+from .management.commands.explain_list_queries import SCENARIOS
+from .models import Delivery, RiderDailyStats, RiderPerformanceSummary
+from .performance import histogram_median, refresh_rider_performance
+from .services import actual_rider_daily_stats, dispatch_deliveries
+from .serializers import DeliverySerializer
+from .utils import generate_delivery_ids
+from .views import (
+    AsyncDeliveryListAPIView,
+    AsyncDriverDeliveryBatchUpdateAPIView,
+    AsyncDriverDeliveryUpdateAPIView,
+    DeliveryListAPIView,
+)
 
-# Create your tests here.
+
+def seed_deliveries(packages, rider):
+    deliveries = Delivery.objects.bulk_create([
+        Delivery(id=delivery_id, package_id=package, rider=rider, address="Accra")
+        for delivery_id, package in zip(generate_delivery_ids(len(packages)), packages)
+    ])
+    add_order_deliveries(deliveries)
+    return deliveries
+
+
+# Query budgets for the delivery endpoints
+class DeliveryQueryBudgetTests(QueryBudgetTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+        cls.driver = make_driver()
+        cls.rider = cls.driver.driverprofile
+
+    def new_order(self, size):
+        order = Order.objects.create(
+            customer_id=self.customer,
+            driver_id=self.rider,
+            order_status=Order.Status.ASSIGNED,
+            pickup_address="Accra",
+        )
+        return order, seed_packages(order, size)
+
+    def test_create_deliveries(self):
+        self.client.force_authenticate(self.customer)
+
+        def call(size):
+            _, packages = self.new_order(size)
+            return self.client.post(
+                "/api/v1/delivery/create/",
+                {"deliveries": [{"package_id": package.id} for package in packages]},
+                format="json",
+            )
+
+        self.assertQueryBudget(8, call)
+
+    def test_create_deliveries_dispatches_driverless_orders(self):
+        self.client.force_authenticate(self.customer)
+
+        def call(size):
+            for index in range(size):
+                make_driver(f"dispatch{index}@example.com")
+            packages = [
+                package
+                for _ in range(size)
+                for package in seed_packages(Order.objects.create(customer_id=self.customer, pickup_address="Accra"), 2)
+            ]
+            response = self.client.post(
+                "/api/v1/delivery/create/",
+                {"deliveries": [{"package_id": package.id} for package in packages]},
+                format="json",
+            )
+            self.assertFalse(Delivery.objects.filter(package_id__in=packages, rider__isnull=True).exists())
+            return response
+
+        # Orders locked in one query, drivers claimed in one read and one
+        # UPDATE, riders written with one bulk_update
+        self.assertQueryBudget(20, call)
+
+    def test_search_deliveries_as_customer(self):
+        self.client.force_authenticate(self.customer)
+
+        def call(size):
+            _, packages = self.new_order(size)
+            seed_deliveries(packages, self.rider)
+            return self.client.get("/api/v1/search/delivery/")
+
+        self.assertQueryBudget(2, call)
+
+    def test_search_deliveries_as_driver(self):
+        self.client.force_authenticate(self.driver)
+
+        def call(size):
+            _, packages = self.new_order(size)
+            seed_deliveries(packages, self.rider)
+            return self.client.get("/api/v1/search/delivery/")
+
+        self.assertQueryBudget(2, call)
+
+    def test_driver_pickup(self):
+        self.client.force_authenticate(self.driver)
+
+        def call(size):
+            _, packages = self.new_order(size)
+            seed_deliveries(packages, self.rider)
+            return self.client.put(
+                "/api/v1/delivery/update/",
+                {"package_id": packages[0].id, "delivery_status": "picked_up"},
+                format="json",
+            )
+
+        # Includes the status rollup UPDATE and creating the rider's daily stats row
+        self.assertQueryBudget(14, call)
+
+    def test_driver_delivers_last_delivery(self):
+        self.client.force_authenticate(self.driver)
+
+        def call(size):
+            _, packages = self.new_order(size)
+            deliveries = seed_deliveries(packages, self.rider)
+            Delivery.objects.filter(pk__in=[d.pk for d in deliveries[1:]]).update(
+                delivery_status=Delivery.Status.DELIVERED
+            )
+            Delivery.objects.filter(pk=deliveries[0].pk).update(
+                delivery_status=Delivery.Status.PICKED_UP
+            )
+            Order.objects.filter(pk=packages[0].order_id_id).update(
+                delivered_deliveries=size - 1
+            )
+            return self.client.put(
+                "/api/v1/delivery/update/",
+                {"package_id": packages[0].id, "delivery_status": "delivered"},
+                format="json",
+            )
+
+        # Includes the status rollup UPDATE and creating the rider's daily stats row
+        self.assertQueryBudget(16, call)
+
+    def test_driver_batch_delivers_order(self):
+        self.client.force_authenticate(self.driver)
+
+        def call(size):
+            order, packages = self.new_order(size)
+            seed_deliveries(packages, self.rider)
+            Delivery.objects.filter(package_id__order_id=order).update(
+                delivery_status=Delivery.Status.PICKED_UP
+            )
+            return self.client.put(
+                "/api/v1/delivery/update/batch/",
+                {"updates": [
+                    {"package_id": package.id, "delivery_status": "delivered"} for package in packages
+                ]},
+                format="json",
+            )
+
+        # Includes the status rollup UPDATE and creating the rider's daily stats row
+        self.assertQueryBudget(15, call)
+
+
+# Tests for the validation of batch delivery creation
+class CreateDeliveriesTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+        cls.rider = make_driver().driverprofile
+
+    def setUp(self):
+        clear_caches()
+        self.client.force_authenticate(self.customer)
+        self.order = Order.objects.create(
+            customer_id=self.customer,
+            driver_id=self.rider,
+            order_status=Order.Status.ASSIGNED,
+        )
+        self.packages = seed_packages(self.order, 3)
+
+    def create(self, package_ids):
+        return self.client.post(
+            "/api/v1/delivery/create/",
+            {"deliveries": [{"package_id": package_id} for package_id in package_ids]},
+            format="json",
+        )
+
+    def assertRejected(self, response, errors):
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["non_field_errors"], errors)
+        self.assertFalse(Delivery.objects.exists())
+
+    def test_creates_a_delivery_per_package(self):
+        response = self.create([package.id for package in self.packages])
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(
+            set(Delivery.objects.values_list("package_id", "rider_id")),
+            {(package.id, self.rider.pk) for package in self.packages},
+        )
+
+    def test_unknown_package(self):
+        self.assertRejected(self.create(["PKG-MISSING"]), ["Package PKG-MISSING does not exist."])
+
+    def test_package_twice_in_one_batch(self):
+        package_id = self.packages[0].id
+        self.assertRejected(
+            self.create([package_id, package_id]),
+            [f"Package {package_id} already has a delivery."],
+        )
+
+    def test_package_with_a_delivery(self):
+        seed_deliveries(self.packages[:1], self.rider)
+        response = self.create([self.packages[0].id, self.packages[1].id])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data["non_field_errors"],
+            [f"Package {self.packages[0].id} already has a delivery."],
+        )
+        self.assertEqual(Delivery.objects.count(), 1)
+
+    def test_reports_every_bad_row_and_inserts_nothing(self):
+        first, second, third = (package.id for package in self.packages)
+        self.assertRejected(
+            self.create([first, "PKG-MISSING", second, first, third, "PKG-GONE"]),
+            [
+                "Package PKG-MISSING does not exist.",
+                f"Package {first} already has a delivery.",
+                "Package PKG-GONE does not exist.",
+            ],
+        )
+
+
+# Tests for the batch driver status update
+class DriverBatchUpdateTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+        cls.driver = make_driver()
+        cls.rider = cls.driver.driverprofile
+
+    def setUp(self):
+        clear_caches()
+        self.client.force_authenticate(self.driver)
+        self.orders = []
+        self.packages = []
+        for _ in range(2):
+            order = Order.objects.create(
+                customer_id=self.customer,
+                driver_id=self.rider,
+                order_status=Order.Status.ASSIGNED,
+            )
+            packages = seed_packages(order, 3)
+            seed_deliveries(packages, self.rider)
+            self.orders.append(order)
+            self.packages.extend(packages)
+
+    def update(self, updates):
+        return self.client.put(
+            "/api/v1/delivery/update/batch/",
+            {"updates": [
+                {"package_id": package.id, "delivery_status": new_status} for package, new_status in updates
+            ]},
+            format="json",
+        )
+
+    def test_pickup_then_deliver_completes_each_order_once(self):
+        response = self.update([(package, "picked_up") for package in self.packages])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["updated"], 6)
+        self.assertEqual(
+            set(Order.objects.values_list("order_status", flat=True)), {Order.Status.IN_TRANSIT}
+        )
+
+        response = self.update([(package, "delivered") for package in self.packages[:4]])
+        self.assertEqual(response.status_code, 200)
+
+        first, second = (Order.objects.get(pk=order.pk) for order in self.orders)
+        self.assertEqual((first.order_status, first.delivered_deliveries), (Order.Status.DELIVERED, 3))
+        self.assertEqual((second.order_status, second.delivered_deliveries), (Order.Status.IN_TRANSIT, 1))
+        self.assertFalse(Delivery.objects.filter(delivery_status="delivered", delivered_at__isnull=True).exists())
+
+    def test_invalid_item_rejects_whole_batch(self):
+        other = make_driver("other@example.com").driverprofile
+        Delivery.objects.filter(package_id=self.packages[1]).update(rider=other)
+
+        response = self.update([
+            (self.packages[0], "picked_up"),
+            (self.packages[1], "picked_up"),
+            (self.packages[2], "delivered"),
+            (self.packages[0], "picked_up"),
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data["non_field_errors"]), 3)
+        self.assertFalse(Delivery.objects.exclude(delivery_status="assigned").exists())
+        self.assertEqual(Order.objects.get(pk=self.orders[0].pk).order_status, Order.Status.ASSIGNED)
+
+
+# The values() read path must render exactly what DeliverySerializer does
+class ValuesSerializerTests(TestCase):
+
+    def test_deliveries(self):
+        customer = make_customer()
+        rider = make_driver().driverprofile
+        order = Order.objects.create(customer_id=customer, driver_id=rider)
+        packages = seed_packages(order, 4)
+        deliveries = seed_deliveries(packages, rider)
+
+        Delivery.objects.filter(pk=deliveries[0].pk).update(rider=None)
+        Delivery.objects.filter(pk=deliveries[1].pk).update(
+            delivery_status=Delivery.Status.PICKED_UP,
+            picked_up_at=timezone.now(),
+            delivery_notes="At the gate",
+        )
+
+        queryset = Delivery.objects.order_by("-assigned_at", "id")
+        values = values_serializer_for(DeliverySerializer)
+
+        self.assertEqual(
+            JSONRenderer().render(values.to_representation(values.values(queryset))),
+            JSONRenderer().render(DeliverySerializer(queryset, many=True).data),
+        )
+
+
+# Tests for the streaming delivery export
+class DeliveryExportTests(APITestCase):
+
+    def test_csv_uses_search_filters(self):
+        customer = make_customer()
+        rider = make_driver().driverprofile
+        order = Order.objects.create(customer_id=customer, driver_id=rider)
+        deliveries = seed_deliveries(seed_packages(order, 4), rider)
+        Delivery.objects.filter(pk=deliveries[0].pk).update(
+            rider=None, delivery_status=Delivery.Status.PICKED_UP
+        )
+
+        self.client.force_authenticate(make_admin())
+        response = self.client.get("/api/v1/export/delivery/?output=csv&delivery_status=assigned")
+
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode("utf-8"))))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({row["rider"] for row in rows}, {str(rider.pk)})
+
+
+# Tests for the order status and rider daily stats rollups
+class StatsRollupTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+        cls.driver = make_driver()
+        cls.rider = cls.driver.driverprofile
+        cls.admin = make_admin()
+
+    def setUp(self):
+        clear_caches()
+        self.orders = []
+        for _ in range(2):
+            order = Order.objects.create(
+                customer_id=self.customer,
+                driver_id=self.rider,
+                order_status=Order.Status.ASSIGNED,
+            )
+            seed_deliveries(seed_packages(order, 2), self.rider)
+            self.orders.append(order)
+
+        # Orders created directly are not counted; start from a rebuilt rollup
+        call_command("rebuild_stats", stdout=io.StringIO())
+
+    def assertRollupsMatch(self):
+        self.assertEqual(
+            dict(OrderStatusCount.objects.values_list("order_status", "count")),
+            actual_order_status_counts(),
+        )
+        stats = {
+            (row.rider_id, row.day): (row.picked_up, row.delivered)
+            for row in RiderDailyStats.objects.all()
+        }
+        self.assertEqual(
+            stats,
+            {key: (value["picked_up"], value["delivered"]) for key, value in actual_rider_daily_stats().items()},
+        )
+        call_command("rebuild_stats", "--check", stdout=io.StringIO())
+
+    def test_transitions_keep_rollups_in_step(self):
+        self.client.force_authenticate(self.driver)
+        first, second = self.orders
+
+        self.client.put(
+            "/api/v1/order/update/", {"order_id": first.id, "status": "picked_up"}, format="json"
+        )
+        packages = list(first.packages.all())
+        self.client.put(
+            "/api/v1/delivery/update/batch/",
+            {"updates": [{"package_id": package.id, "delivery_status": "delivered"} for package in packages]},
+            format="json",
+        )
+        self.assertRollupsMatch()
+
+        self.client.force_authenticate(self.customer)
+        self.client.put(
+            "/api/v1/order/cancel/", {"order_id": second.id, "cancel_reason": "Mistaken Order"}, format="json"
+        )
+        self.client.post("/api/v1/order/create/", {"pickup_address": "Accra"}, format="json")
+        self.assertRollupsMatch()
+
+        stats = RiderDailyStats.objects.get()
+        self.assertEqual((stats.picked_up, stats.delivered), (2, 2))
+        self.assertGreaterEqual(stats.transit_seconds, 0)
+
+    def test_missing_status_row_is_created(self):
+        OrderStatusCount.objects.filter(order_status__in=["in_transit", "delivered"]).delete()
+
+        self.client.force_authenticate(self.driver)
+        response = self.client.put(
+            "/api/v1/order/update/", {"order_id": self.orders[0].id, "status": "picked_up"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(OrderStatusCount.objects.get(order_status="in_transit").count, 1)
+        self.assertFalse(OrderStatusCount.objects.filter(order_status="delivered").exists())
+        self.assertEqual(OrderStatusCount.objects.get(order_status="assigned").count, 1)
+
+    def test_rebuild_repairs_drift(self):
+        OrderStatusCount.objects.filter(order_status="assigned").update(count=99)
+        RiderDailyStats.objects.create(rider=self.rider, day=datetime.date(2020, 1, 1), delivered=3)
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_stats", "--check", stdout=io.StringIO())
+
+        call_command("rebuild_stats", stdout=io.StringIO())
+        self.assertRollupsMatch()
+
+    def test_stats_endpoints(self):
+        self.client.force_authenticate(self.driver)
+        self.client.put(
+            "/api/v1/order/update/", {"order_id": self.orders[0].id, "status": "picked_up"}, format="json"
+        )
+
+        self.client.force_authenticate(self.admin)
+
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/v1/stats/orders/")
+        self.assertEqual(response.data["counts"]["assigned"], 1)
+        self.assertEqual(response.data["counts"]["in_transit"], 1)
+        self.assertEqual(response.data["total"], 2)
+
+        response = self.client.get(f"/api/v1/stats/riders/?driver={self.rider.pk}")
+        self.assertEqual(response.data["results"][0]["picked_up"], 2)
+        self.assertIsNone(response.data["results"][0]["average_transit_seconds"])
+
+        response = self.client.get("/api/v1/stats/deliveries/")
+        self.assertEqual(response.data["results"][0]["day"], str(timezone.localdate()))
+        self.assertEqual(response.data["results"][0]["riders"], 1)
+
+        self.client.force_authenticate(self.driver)
+        self.assertEqual(self.client.get("/api/v1/stats/orders/").status_code, 403)
+
+
+    def test_rider_stats_cursor_keeps_the_default_order(self):
+        RiderDailyStats.objects.all().delete()
+        riders = [self.rider, make_driver("second@example.com").driverprofile]
+        today = timezone.localdate()
+
+        # Inserted so that row ids disagree with (day, rider)
+        for rider in reversed(riders):
+            for offset in range(8):
+                RiderDailyStats.objects.create(rider=rider, day=today - datetime.timedelta(days=offset), delivered=1)
+
+        self.client.force_authenticate(self.admin)
+
+        def rows(url):
+            rows = []
+            while url:
+                page = self.client.get(url).json()
+                rows += [(row["day"], row["rider"]) for row in page["results"]]
+                url = page["next"]
+            return rows
+
+        expected = [
+            (str(today - datetime.timedelta(days=offset)), rider.pk)
+            for offset in range(8)
+            for rider in sorted(riders, key=lambda rider: rider.pk)
+        ]
+        self.assertEqual(rows("/api/v1/stats/riders/"), expected)
+        self.assertEqual(rows("/api/v1/stats/riders/?pagination=cursor"), expected)
+
+
+    def test_average_transit_is_documented_as_a_nullable_number(self):
+        components = SchemaGenerator().get_schema(request=None, public=True)["components"]["schemas"]
+
+        for component in ("RiderDailyStats", "DeliveryDailyStats"):
+            field = components[component]["properties"]["average_transit_seconds"]
+            self.assertEqual((field["type"], field.get("nullable")), ("number", True), component)
+
+
+# Tests for the incrementally refreshed rider performance summary
+class RiderPerformanceTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+        cls.rider = make_driver().driverprofile
+        cls.other = make_driver("other@example.com").driverprofile
+
+    def setUp(self):
+        clear_caches()
+        self.now = timezone.now()
+
+    def deliver(self, rider, minutes, hours_ago=1, delivery_date=None):
+        """
+        A delivery delivered `hours_ago` hours back, `minutes` after it was assigned.
+        """
+
+        delivered_at = self.now - datetime.timedelta(hours=hours_ago)
+        order = Order.objects.create(customer_id=self.customer, delivery_date=delivery_date)
+        delivery = seed_deliveries(seed_packages(order, 1), rider)[0]
+        Delivery.objects.filter(pk=delivery.pk).update(
+            delivery_status=Delivery.Status.DELIVERED,
+            assigned_at=delivered_at - datetime.timedelta(minutes=minutes),
+            picked_up_at=delivered_at,
+            delivered_at=delivered_at,
+        )
+
+    def test_refresh_only_reads_new_deliveries(self):
+        today = timezone.localdate(self.now - datetime.timedelta(hours=1))
+        self.deliver(self.rider, 10, delivery_date=today)
+        self.deliver(self.rider, 20, delivery_date=today - datetime.timedelta(days=1))
+        self.deliver(self.rider, 40)
+        self.deliver(self.other, 10)
+
+        self.assertEqual(refresh_rider_performance(), 4)
+        self.assertEqual(refresh_rider_performance(), 0)
+
+        summary = RiderPerformanceSummary.objects.get(rider=self.rider)
+        self.assertEqual((summary.delivered, summary.scheduled, summary.on_time), (3, 2, 1))
+        self.assertEqual(summary.on_time_rate, 0.5)
+        # 10, 20 and 40 minutes; the median falls in the 15-20 minute bucket
+        self.assertEqual(summary.median_latency_seconds, 1050)
+
+        # Inside the lag window until it has passed
+        self.deliver(self.rider, 10, hours_ago=0)
+        self.assertEqual(refresh_rider_performance(), 0)
+        self.assertEqual(refresh_rider_performance(lag=datetime.timedelta(0)), 1)
+
+        summary.refresh_from_db()
+        self.assertEqual(summary.delivered, 4)
+
+        incremental = list(RiderPerformanceSummary.objects.order_by("rider").values())
+        refresh_rider_performance(lag=datetime.timedelta(0), full=True)
+        self.assertEqual(list(RiderPerformanceSummary.objects.order_by("rider").values()), incremental)
+
+    def test_histogram_median(self):
+        self.assertIsNone(histogram_median([0, 0]))
+        self.assertEqual(histogram_median([0, 2]), 450)
+        self.assertEqual(histogram_median([0] * 18 + [1]), 10080 * 60)
+
+    def test_endpoint(self):
+        self.deliver(self.rider, 10, delivery_date=timezone.localdate(self.now))
+        self.deliver(self.rider, 10, hours_ago=30)
+        self.deliver(self.other, 10, delivery_date=datetime.date(2020, 1, 1))
+        call_command("refresh_rider_performance", stdout=io.StringIO())
+
+        self.client.force_authenticate(make_admin())
+        response = self.client.get("/api/v1/stats/riders/performance/")
+        self.assertEqual([row["rider"] for row in response.data["results"]], [self.rider.pk, self.other.pk])
+        self.assertEqual(response.data["results"][0]["delivered"], 2)
+
+        response = self.client.get("/api/v1/stats/riders/performance/?min_on_time_rate=0.5")
+        self.assertEqual([row["rider"] for row in response.data["results"]], [self.rider.pk])
+        self.assertEqual(response.data["results"][0]["on_time_rate"], 1.0)
+
+        self.client.force_authenticate(self.rider.user)
+        self.assertEqual(self.client.get("/api/v1/stats/riders/performance/").status_code, 403)
+
+    def test_deliveries_per_day_is_documented_as_a_nullable_number(self):
+        schema = SchemaGenerator().get_schema(request=None, public=True)
+        field = schema["components"]["schemas"]["RiderPerformance"]["properties"]["deliveries_per_day"]
+        self.assertEqual((field["type"], field.get("nullable")), ("number", True))
+
+
+# The async delivery search and driver update views must behave as the sync ones do
+class AsyncDeliveryViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+        cls.admin = make_admin()
+        cls.driver = make_driver()
+        cls.rider = cls.driver.driverprofile
+        other = make_driver("other@example.com").driverprofile
+
+        cls.orders = []
+        cls.packages = []
+        for rider in [cls.rider, cls.rider, other]:
+            order = Order.objects.create(
+                customer_id=cls.customer, driver_id=rider, order_status=Order.Status.ASSIGNED
+            )
+            packages = seed_packages(order, 5)
+            seed_deliveries(packages, rider)
+            cls.orders.append(order)
+            cls.packages.extend(packages)
+
+    def setUp(self):
+        clear_caches()
+
+    def call(self, view_class, method, path, user, data=None):
+        request = getattr(APIRequestFactory(), method)(path, data, format="json")
+        force_authenticate(request, user)
+
+        view = view_class.as_view()
+        response = async_to_sync(view)(request) if view_class.view_is_async else view(request)
+        return response.render()
+
+    def test_search(self):
+        for path in ["/", "/?page=2", "/?pagination=cursor", "/?delivery_status=assigned&ordering=assigned_at"]:
+            for user in [self.driver, self.customer, self.admin]:
+                with self.subTest(path=path, user=user.email):
+                    expected = self.call(DeliveryListAPIView, "get", path, user)
+                    actual = self.call(AsyncDeliveryListAPIView, "get", path, user)
+                    self.assertEqual(actual.status_code, expected.status_code)
+                    self.assertEqual(actual.content, expected.content)
+
+        page = json.loads(self.call(AsyncDeliveryListAPIView, "get", "/", self.driver).content)
+        self.assertEqual(page["count"], 10)
+
+    def test_driver_update(self):
+        response = self.call(
+            AsyncDriverDeliveryUpdateAPIView, "put", "/", self.driver,
+            {"package_id": self.packages[0].id, "delivery_status": "picked_up"},
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(Delivery.objects.get(package_id=self.packages[0]).delivery_status, "picked_up")
+        self.assertEqual(Order.objects.get(pk=self.orders[0].pk).order_status, Order.Status.IN_TRANSIT)
+
+        # Another rider's package
+        response = self.call(
+            AsyncDriverDeliveryUpdateAPIView, "put", "/", self.driver,
+            {"package_id": self.packages[10].id, "delivery_status": "picked_up"},
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_driver_batch_update(self):
+        updates = [{"package_id": package.id, "delivery_status": "picked_up"} for package in self.packages[:10]]
+        response = self.call(AsyncDriverDeliveryBatchUpdateAPIView, "put", "/", self.driver, {"updates": updates})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(json.loads(response.content)["updated"], 10)
+
+        self.assertEqual(
+            set(Order.objects.filter(driver_id=self.rider).values_list("order_status", flat=True)),
+            {Order.Status.IN_TRANSIT},
+        )
+
+        response = self.call(AsyncDriverDeliveryBatchUpdateAPIView, "put", "/", self.customer, {"updates": updates})
+        self.assertEqual(response.status_code, 403)
+
+
+# Tests for the per-order delivery counters
+class DeliveryCounterTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+        cls.driver = make_driver()
+        cls.rider = cls.driver.driverprofile
+
+    def setUp(self):
+        clear_caches()
+        self.client.force_authenticate(self.driver)
+        self.order = Order.objects.create(
+            customer_id=self.customer,
+            driver_id=self.rider,
+            order_status=Order.Status.ASSIGNED,
+        )
+        self.packages = seed_packages(self.order, 3)
+        seed_deliveries(self.packages, self.rider)
+
+    def update(self, package, new_status):
+        response = self.client.put(
+            "/api/v1/delivery/update/",
+            {"package_id": package.id, "delivery_status": new_status},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def counters(self):
+        self.order.refresh_from_db()
+        return self.order.total_deliveries, self.order.delivered_deliveries
+
+    def test_delivering_counts_and_completes_the_order(self):
+        self.assertEqual(self.counters(), (3, 0))
+
+        for package in self.packages:
+            self.update(package, "picked_up")
+        self.assertEqual(self.counters(), (3, 0))
+
+        for delivered, package in enumerate(self.packages, start=1):
+            self.assertEqual(self.order.order_status, Order.Status.IN_TRANSIT)
+            self.update(package, "delivered")
+            self.assertEqual(self.counters(), (3, delivered))
+
+        self.assertEqual(self.order.order_status, Order.Status.DELIVERED)
+        call_command("rebuild_delivery_counters", "--check", stdout=io.StringIO())
+
+    def test_one_batch_counts_every_order(self):
+        other = Order.objects.create(customer_id=self.customer, driver_id=self.rider, order_status=Order.Status.ASSIGNED)
+        packages = seed_packages(other, 2) + seed_packages(self.order, 1)
+
+        self.client.force_authenticate(self.customer)
+        response = self.client.post(
+            "/api/v1/delivery/create/",
+            {"deliveries": [{"package_id": package.id} for package in packages]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+
+        other.refresh_from_db()
+        self.assertEqual(other.total_deliveries, 2)
+        self.assertEqual(self.counters(), (4, 0))
+
+    def test_rebuild_repairs_corrupted_counters(self):
+        Delivery.objects.filter(package_id=self.packages[0]).update(delivery_status="delivered")
+        Order.objects.filter(pk=self.order.pk).update(total_deliveries=7, delivered_deliveries=0)
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_delivery_counters", "--check", stdout=io.StringIO())
+
+        output = io.StringIO()
+        call_command("rebuild_delivery_counters", stdout=output)
+        self.assertIn("Rebuilt 1 stale order(s).", output.getvalue())
+
+        self.assertEqual(self.counters(), (3, 1))
+        call_command("rebuild_delivery_counters", "--check", stdout=io.StringIO())
+
+
+# Tests for the order moves made by driver pickups
+class DeliveryPickupTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+        cls.driver = make_driver()
+        cls.rider = cls.driver.driverprofile
+
+    def setUp(self):
+        clear_caches()
+        self.client.force_authenticate(self.driver)
+        self.order = Order.objects.create(
+            customer_id=self.customer,
+            driver_id=self.rider,
+            order_status=Order.Status.ASSIGNED,
+        )
+        self.packages = seed_packages(self.order, 2)
+        seed_deliveries(self.packages, self.rider)
+
+        # The order plus one other open order
+        DriverProfile.objects.filter(pk=self.rider.pk).update(active_orders=2)
+        call_command("rebuild_stats", stdout=io.StringIO())
+
+    def assertReleasedOnce(self):
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.order_status, Order.Status.IN_TRANSIT)
+        self.assertEqual(DriverProfile.objects.get(pk=self.rider.pk).active_orders, 1)
+        call_command("rebuild_stats", "--check", stdout=io.StringIO())
+
+    def test_two_pickups_on_one_order_release_the_driver_once(self):
+        for package in self.packages:
+            response = self.client.put(
+                "/api/v1/delivery/update/",
+                {"package_id": package.id, "delivery_status": "picked_up"},
+                format="json",
+            )
+            self.assertEqual(response.status_code, 201, response.data)
+
+        self.assertReleasedOnce()
+
+    def test_two_batches_on_one_order_release_the_driver_once(self):
+        for package in self.packages:
+            response = self.client.put(
+                "/api/v1/delivery/update/batch/",
+                {"updates": [{"package_id": package.id, "delivery_status": "picked_up"}]},
+                format="json",
+            )
+            self.assertEqual(response.status_code, 200, response.data)
+
+        self.assertReleasedOnce()
+
+
+# Tests for dispatching deliveries one order at a time
+class DispatchDeliveriesTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+        cls.drivers = [make_driver(f"driver{index}@example.com") for index in range(2)]
+
+    def setUp(self):
+        clear_caches()
+
+    def new_order(self, driver=None):
+        order = Order.objects.create(
+            customer_id=self.customer,
+            driver_id=driver,
+            order_status=Order.Status.ASSIGNED if driver else Order.Status.PENDING,
+            pickup_address="Accra",
+        )
+        return order, seed_packages(order, 3)
+
+    def create_deliveries(self, packages):
+        self.client.force_authenticate(self.customer)
+        response = self.client.post(
+            "/api/v1/delivery/create/",
+            {"deliveries": [{"package_id": package.id, "address": "Tema"} for package in packages]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def riders(self, order):
+        return set(
+            Delivery.objects
+            .filter(package_id__order_id=order)
+            .values_list("rider_id", flat=True)
+        )
+
+    def loads(self):
+        return [
+            DriverProfile.objects.get(pk=driver.driverprofile.pk).active_orders
+            for driver in self.drivers
+        ]
+
+    def pick_up(self, order, driver):
+        self.client.force_authenticate(driver.user)
+        return self.client.put(
+            "/api/v1/order/update/",
+            {"order_id": order.id, "status": "picked_up"},
+            format="json",
+        )
+
+    def test_each_driverless_order_claims_one_driver(self):
+        first, first_packages = self.new_order()
+        second, second_packages = self.new_order()
+
+        self.create_deliveries(first_packages)
+        self.create_deliveries(second_packages)
+
+        for order in (first, second):
+            order.refresh_from_db()
+            self.assertEqual(order.order_status, Order.Status.ASSIGNED)
+            self.assertEqual(self.riders(order), {order.driver_id_id})
+
+        self.assertNotEqual(first.driver_id_id, second.driver_id_id)
+        self.assertEqual(self.loads(), [1, 1])
+
+        response = self.pick_up(first, first.driver_id)
+        self.assertEqual(response.status_code, 200, response.data)
+
+    def test_one_batch_claims_a_driver_per_order(self):
+        first, first_packages = self.new_order()
+        second, second_packages = self.new_order()
+
+        self.create_deliveries(first_packages + second_packages)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(self.riders(first), {first.driver_id_id})
+        self.assertEqual(self.riders(second), {second.driver_id_id})
+        self.assertNotEqual(first.driver_id_id, second.driver_id_id)
+        self.assertEqual(self.loads(), [1, 1])
+        call_command("rebuild_driver_load", "--check", stdout=io.StringIO())
+
+    def test_order_driver_keeps_its_deliveries(self):
+        rider = self.drivers[1].driverprofile
+        order, packages = self.new_order(rider)
+        deliveries = seed_deliveries(packages, None)
+
+        self.assertEqual(len(dispatch_deliveries(deliveries)), 3)
+        self.assertEqual(self.riders(order), {rider.pk})
+        self.assertEqual(self.loads(), [0, 0])
+
+    def test_command_dispatches_queued_deliveries(self):
+        DriverProfile.objects.update(availability_status=False)
+        order, packages = self.new_order()
+        self.create_deliveries(packages)
+
+        order.refresh_from_db()
+        self.assertEqual(order.order_status, Order.Status.PENDING)
+        self.assertEqual(self.riders(order), {None})
+
+        output = io.StringIO()
+        call_command("dispatch_deliveries", stdout=output)
+        self.assertIn("3 delivery(ies) still wait for a driver.", output.getvalue())
+        self.assertIn("Dispatched 0 delivery(ies).", output.getvalue())
+
+        DriverProfile.objects.update(availability_status=True)
+        output = io.StringIO()
+        call_command("dispatch_deliveries", "--batch-size", "2", stdout=output)
+        self.assertIn("Dispatched 3 delivery(ies).", output.getvalue())
+
+        order.refresh_from_db()
+        self.assertEqual(order.order_status, Order.Status.ASSIGNED)
+        self.assertEqual(self.riders(order), {order.driver_id_id})
+
+        response = self.pick_up(order, order.driver_id)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.loads(), [0, 0])
+
+
+# Smoke test for the EXPLAIN report over the list endpoints
+class ExplainListQueriesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        make_customer()
+        make_driver()
+        make_admin()
+
+    def test_reports_a_plan_per_list_endpoint(self):
+        output = io.StringIO()
+        call_command("explain_list_queries", "--verbose-plan", stdout=output)
+        report = output.getvalue()
+
+        for label, *_ in SCENARIOS:
+            self.assertRegex(report, rf"{re.escape(label)}: (index used|no index used)")
+        self.assertNotIn("skipped", report)
+        # The full plans follow each scenario line
+        self.assertGreater(report.count("\n"), 2 * len(SCENARIOS))
+        self.assertIn("scenario(s) without index usage.", report)
@@ -1,10 +1,28 @@
-from .views import CreateDeliveriesAPIView,DriverDeliveryUpdateAPIView,DeliveryListAPIView
+from .views import CreateDeliveriesAPIView,DriverDeliveryUpdateAPIView,DriverDeliveryBatchUpdateAPIView,DeliveryListAPIView,DeliveryExportAPIView,RiderDailyStatsListAPIView,DeliveryDailyStatsListAPIView,RiderPerformanceListAPIView,AsyncDeliveryListAPIView,AsyncDriverDeliveryUpdateAPIView,AsyncDriverDeliveryBatchUpdateAPIView
+from django.conf import settings
 from django.urls import path
 
 app_name = "delivery"
 
 urlpatterns = [
-    path("v1/search/delivery/", DeliveryListAPIView.as_view(), name="search_delivery"),
+    path(
+        "v1/search/delivery/",
+        (AsyncDeliveryListAPIView if settings.ASYNC_VIEWS else DeliveryListAPIView).as_view(),
+        name="search_delivery",
+    ),
+    path("v1/export/delivery/", DeliveryExportAPIView.as_view(), name="export_delivery"),
+    path("v1/stats/riders/", RiderDailyStatsListAPIView.as_view(), name="rider_stats"),
+    path("v1/stats/deliveries/", DeliveryDailyStatsListAPIView.as_view(), name="delivery_stats"),
+    path("v1/stats/riders/performance/", RiderPerformanceListAPIView.as_view(), name="rider_performance"),
     path("v1/delivery/create/",CreateDeliveriesAPIView.as_view(),name="create_deliveries"),
-    path("v1/delivery/update/",DriverDeliveryUpdateAPIView.as_view(),name="update_delivery"),
+    path(
+        "v1/delivery/update/",
+        (AsyncDriverDeliveryUpdateAPIView if settings.ASYNC_VIEWS else DriverDeliveryUpdateAPIView).as_view(),
+        name="update_delivery",
+    ),
+    path(
+        "v1/delivery/update/batch/",
+        (AsyncDriverDeliveryBatchUpdateAPIView if settings.ASYNC_VIEWS else DriverDeliveryBatchUpdateAPIView).as_view(),
+        name="batch_update_delivery",
+    ),
 ]
\ No newline at end of file
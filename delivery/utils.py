@@ -1,7 +1,11 @@
-import uuid
+from core.ids import new_id, new_ids
 
 def generate_delivery_id():
-    return f"DEL{uuid.uuid4().hex[:8].upper()}"
+    return new_id("DEL")
 
 def generate_transaction_id():
-    return f"TXN{uuid.uuid4().hex[:8].upper()}"
+    return new_id("TXN")
+
+def generate_delivery_ids(count):
+    # Pre-generate ids for bulk inserts (bulk_create skips save())
+    return new_ids("DEL", count)
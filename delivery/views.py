@@ -1,21 +1,26 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework import viewsets, permissions,generics, filters as drf_filters
 from django_filters.rest_framework import DjangoFilterBackend
+import functools
 from rest_framework.decorators import action
+from asgiref.sync import sync_to_async
 from rest_framework.response import Response
 from django.db import transaction
+from django.db.models import Count, Sum
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.utils import timezone
-from .filters import DeliveryFilter
+from .filters import DeliveryFilter, RiderDailyStatsFilter, RiderPerformanceFilter
+from core.pagination import SearchPagination
+from core.mixins import AsyncDispatchMixin, AsyncValuesListMixin, StreamingExportMixin, ValuesListMixin
 from customer.permissions import (
     IsDriver,
     IsAssignedDriverOrAdmin,
     IsDriverProfileComplete,
     IsCustomerProfileComplete
 )
-from .models import Delivery,Payment
-from .serializers import DeliverySerializer,PaymentSerializer,CreateDeliveriesSerializer,DriverDeliveryUpdateSerializer
+from .models import Delivery,Payment,RiderDailyStats,RiderPerformanceSummary
+from .serializers import DeliverySerializer,PaymentSerializer,CreateDeliveriesSerializer,DriverDeliveryUpdateSerializer,DriverDeliveryBatchUpdateSerializer,RiderDailyStatsSerializer,DeliveryDailyStatsSerializer,RiderPerformanceSerializer
 from drf_spectacular.utils import (
     extend_schema,
     OpenApiExample,
@@ -27,6 +32,7 @@ from drf_spectacular.utils import (
 
 # View for Delivery 
 class DeliveryViewSet(viewsets.ModelViewSet):
+    queryset = Delivery.objects.all()
     serializer_class = DeliverySerializer
     permission_classes = [
         permissions.IsAuthenticated,
@@ -52,12 +58,12 @@ class DeliveryViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
+        queryset = super().get_queryset()
         if user.role == "driver":
-            return Delivery.objects.filter(rider=user)
+            return queryset.filter(rider__user=user)
         if user.role == "admin":
-            return Delivery.objects.all()
-        #return Delivery.objects.filter(order__customer=user)
-        return Delivery.objects.filter(package_id__order_id__customer_id=user)
+            return queryset
+        return queryset.filter(package_id__order_id__customer_id=user)
 
     @extend_schema(
         tags=["Delivery"],
@@ -91,14 +97,16 @@ class DeliveryViewSet(viewsets.ModelViewSet):
 
 # View for Payment
 class PaymentViewSet(viewsets.ModelViewSet):
+    queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         user = self.request.user
+        queryset = super().get_queryset()
         if user.role == "admin":
-            return Payment.objects.all()
-        return Payment.objects.filter(order__customer=user)
+            return queryset
+        return queryset.filter(package_id__order_id__customer_id=user)
     
 
 
@@ -213,6 +221,78 @@ class DriverDeliveryUpdateAPIView(APIView):
     
 
 
+# View for batch delivery updates by driver/rider, e.g. every package dropped at one stop
+class DriverDeliveryBatchUpdateAPIView(APIView):
+    permission_classes = [IsAuthenticated, IsDriverProfileComplete]
+
+    @extend_schema(
+        tags=["Delivery"],
+        summary="Driver Batch Update Deliveries",
+        description="Update the status of many deliveries at once. The whole batch is rejected if any package fails validation.",
+        request=DriverDeliveryBatchUpdateSerializer,
+        responses={200: OpenApiResponse(description="Delivery Statuses Updated Successfully")},
+        examples=[
+            OpenApiExample(
+                "Batch Update Delivery Status Request",
+                value={
+                    "updates": [
+                        {"package_id": "PKGE68...", "delivery_status": "delivered"},
+                        {"package_id": "PKG1A2...", "delivery_status": "delivered", "delivery_notes": "Left at reception"}
+                    ]
+                },
+                request_only=True,
+            ),
+            OpenApiExample(
+                "Batch Update Delivery Status Response",
+                value={
+                    "updated": 2,
+                    "deliveries": [
+                        {"delivery_id": "DEL982...", "package_id": "PKGE68...", "delivery_status": "delivered"},
+                        {"delivery_id": "DEL4F1...", "package_id": "PKG1A2...", "delivery_status": "delivered"}
+                    ]
+                },
+                response_only=True,
+            ),
+        ],
+    )
+
+    def put(self, request):
+        serializer = DriverDeliveryBatchUpdateSerializer(data=request.data, context={"request": request})
+        if serializer.is_valid():
+            deliveries = serializer.save()
+            return Response(
+                {
+                    "updated": len(deliveries),
+                    "deliveries": [
+                        {
+                            "delivery_id": delivery.id,
+                            "package_id": delivery.package_id_id,
+                            "delivery_status": delivery.delivery_status,
+                        }
+                        for delivery in deliveries
+                    ],
+                },
+                status=status.HTTP_200_OK)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+# Async views for driver delivery updates, served under ASGI. The update is
+# a locked read-modify-write inside transaction.atomic, which the async ORM
+# cannot span, so it runs in one thread hop. functools.wraps keeps the
+# extend_schema annotation of the sync put
+class AsyncDriverDeliveryUpdateAPIView(AsyncDispatchMixin, DriverDeliveryUpdateAPIView):
+    @functools.wraps(DriverDeliveryUpdateAPIView.put)
+    async def put(self, request):
+        return await sync_to_async(super().put)(request)
+
+
+class AsyncDriverDeliveryBatchUpdateAPIView(AsyncDispatchMixin, DriverDeliveryBatchUpdateAPIView):
+    @functools.wraps(DriverDeliveryBatchUpdateAPIView.put)
+    async def put(self, request):
+        return await sync_to_async(super().put)(request)
+    
+
+
 # View for Delivery List Filter
 
 @extend_schema(
@@ -220,10 +300,11 @@ class DriverDeliveryUpdateAPIView(APIView):
     summary="Search deliveries",
     description="Returns deliveries depending on the logged-in user's role."
 )
-class DeliveryListAPIView(generics.ListAPIView):
+class DeliveryListAPIView(ValuesListMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated, IsAssignedDriverOrAdmin]
 
-    
+    # DeliverySerializer only renders foreign key ids, so nothing is joined
+    queryset = Delivery.objects.all()
     serializer_class = DeliverySerializer
     
     filter_backends = [
@@ -243,12 +324,111 @@ class DeliveryListAPIView(generics.ListAPIView):
     def get_queryset(self):
 
         user = self.request.user
+        queryset = super().get_queryset()
 
         if user.role == "driver":
-            return Delivery.objects.filter(rider=user)
+            return queryset.filter(rider__user=user)
         if user.role == "admin":
-            return Delivery.objects.all()
-        return Delivery.objects.filter(package_id__order_id__customer_id=user)
+            return queryset
+        return queryset.filter(package_id__order_id__customer_id=user)
 
     ordering_fields = ['picked_up_at', 'delivered_at', 'assigned_at']
     ordering = ['-assigned_at']
+
+    pagination_class = SearchPagination
+    cursor_ordering = ['-assigned_at', 'id']
+
+
+# Async view for delivery filtering search, served under ASGI
+class AsyncDeliveryListAPIView(AsyncValuesListMixin, DeliveryListAPIView):
+    pass
+
+
+@extend_schema(
+    tags=["Admin"],
+    summary="Export deliveries",
+    description="Streams every delivery matching the search filters as NDJSON (default) or CSV.",
+    parameters=[
+        OpenApiParameter(name="output", type=str, enum=["ndjson", "csv"], required=False),
+    ],
+    responses={200: OpenApiResponse(description="NDJSON or CSV stream")},
+)
+# View for streaming delivery exports
+class DeliveryExportAPIView(StreamingExportMixin, DeliveryListAPIView):
+    permission_classes = [IsAdminUser]
+    export_name = "deliveries"
+
+
+@extend_schema(
+    tags=["Admin"],
+    summary="Rider daily stats",
+    description="Deliveries picked up and delivered per rider per day, with the average pickup-to-delivery time, read from the daily rollup.",
+)
+# View for the deliveries per rider per day dashboard
+class RiderDailyStatsListAPIView(generics.ListAPIView):
+    permission_classes = [IsAdminUser]
+
+    queryset = RiderDailyStats.objects.all()
+    serializer_class = RiderDailyStatsSerializer
+
+    filter_backends = [DjangoFilterBackend, drf_filters.OrderingFilter]
+    filterset_class = RiderDailyStatsFilter
+
+    ordering_fields = ['day', 'delivered']
+    ordering = ['-day', 'rider']
+
+    pagination_class = SearchPagination
+    cursor_ordering = ['-day', 'rider']
+
+
+@extend_schema(
+    tags=["Admin"],
+    summary="Daily delivery stats",
+    description="Deliveries picked up and delivered across all riders per day, with the average pickup-to-delivery time, read from the daily rollup.",
+)
+# View for the deliveries per day dashboard
+class DeliveryDailyStatsListAPIView(generics.ListAPIView):
+    permission_classes = [IsAdminUser]
+
+    queryset = RiderDailyStats.objects.all()
+    serializer_class = DeliveryDailyStatsSerializer
+
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = RiderDailyStatsFilter
+
+    def filter_queryset(self, queryset):
+        # Filter the rider rows first, then sum them per day
+        return (
+            super().filter_queryset(queryset)
+            .values("day")
+            .annotate(
+                riders=Count("rider"),
+                picked_up=Sum("picked_up"),
+                delivered=Sum("delivered"),
+                transit_seconds=Sum("transit_seconds"),
+            )
+            .order_by("-day")
+        )
+
+
+@extend_schema(
+    tags=["Admin"],
+    summary="Rider performance",
+    description="Per-rider throughput, on-time rate and median assigned-to-delivered latency, read from the summary that refresh_rider_performance keeps up to date.",
+)
+# View for the rider performance page
+class RiderPerformanceListAPIView(generics.ListAPIView):
+    permission_classes = [IsAdminUser]
+
+    queryset = RiderPerformanceSummary.objects.all()
+    serializer_class = RiderPerformanceSerializer
+
+    filter_backends = [DjangoFilterBackend, drf_filters.OrderingFilter]
+    filterset_class = RiderPerformanceFilter
+
+    ordering_fields = ['delivered', 'on_time_rate', 'median_latency_seconds', 'last_delivered_at']
+    ordering = ['-delivered', 'rider']
+
+    pagination_class = SearchPagination
+    cursor_ordering = ['-delivered', 'rider']
+
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Order, Package
+from .models import Order, OrderStatusCount, Package
 
 
 class PackageInline(admin.TabularInline):
@@ -19,3 +19,9 @@ class OrderAdmin(admin.ModelAdmin):
 class PackageAdmin(admin.ModelAdmin):
     list_display = ("id", "order_id", "dimensions", "fragile")
     search_fields = ("order__id",)
+
+
+@admin.register(OrderStatusCount)
+class OrderStatusCountAdmin(admin.ModelAdmin):
+    list_display = ("order_status", "count")
+
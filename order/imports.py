@@ -0,0 +1,319 @@
+"""
+Bulk order import from CSV or NDJSON manifests.
+
+CSV manifests have one row per package. Rows sharing an `order_ref` form one
+order and must be contiguous; `pickup_address` is read from an order's first
+row. NDJSON manifests have one order per line:
+
+    {"order_ref": "A-1", "pickup_address": "...", "packages": [{...}, ...]}
+
+Each package takes the PackageSerializer fields plus an optional delivery
+`address`. The manifest is read as a stream and handled `chunk_size` orders
+at a time. Each chunk is validated with one bound serializer per kind and
+inserted in its own transaction. Invalid orders are reported by row and
+skipped without stopping the rest of the file.
+"""
+import csv
+import json
+from collections import Counter
+from itertools import zip_longest
+from django.db import DatabaseError, transaction
+from rest_framework import serializers
+from core.ids import unused_ids
+from delivery.models import Delivery
+from delivery.utils import generate_delivery_ids
+from .models import Order, Package
+from .serializers import OrderCreateSerializer, PackageSerializer
+from .services import claim_drivers, count_order_statuses
+from .utils import generate_order_ids, generate_package_ids
+
+# Orders per validation batch and per transaction
+IMPORT_CHUNK_SIZE = 500
+
+# Rows per INSERT statement
+IMPORT_BULK_BATCH_SIZE = 500
+
+MANIFEST_FORMATS = ("csv", "ndjson")
+
+ORDER_COLUMNS = ("pickup_address",)
+
+
+# Serializer for a manifest package: PackageSerializer rules plus the delivery address
+class ManifestPackageSerializer(PackageSerializer):
+    address = serializers.CharField(max_length=350, required=False, allow_blank=True, default="")
+
+    class Meta(PackageSerializer.Meta):
+        fields = PackageSerializer.Meta.fields + ["address"]
+
+
+PACKAGE_COLUMNS = tuple(ManifestPackageSerializer.Meta.fields)
+
+
+def manifest_format(name):
+    """
+    Manifest format from a file name, or None if it is not supported.
+    """
+
+    extension = name.rsplit(".", 1)[-1].lower()
+    if extension == "jsonl":
+        extension = "ndjson"
+    return extension if extension in MANIFEST_FORMATS else None
+
+
+def read_csv_manifest(lines):
+    """
+    Yields one record per order from CSV lines.
+    """
+
+    reader = csv.DictReader(lines)
+
+    missing = {"order_ref", *ORDER_COLUMNS} - set(reader.fieldnames or ())
+    if missing:
+        raise serializers.ValidationError(
+            f"Manifest is missing column(s): {', '.join(sorted(missing))}."
+        )
+
+    record = None
+
+    for row in reader:
+        ref = row["order_ref"] or f"row-{reader.line_num}"
+
+        if record is None or ref != record["ref"]:
+            if record is not None:
+                yield record
+            record = {
+                "ref": ref,
+                "rows": [],
+                "order": {name: row[name] for name in ORDER_COLUMNS},
+                "packages": [],
+            }
+
+        record["rows"].append(reader.line_num)
+        # Empty cells fall back to the field defaults
+        record["packages"].append({
+            name: row[name] for name in PACKAGE_COLUMNS if row.get(name) not in (None, "")
+        })
+
+    if record is not None:
+        yield record
+
+
+def read_ndjson_manifest(lines):
+    """
+    Yields one record per order from NDJSON lines.
+    """
+
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+
+        record = {"ref": f"line-{number}", "rows": [number]}
+
+        try:
+            data = json.loads(line)
+        except ValueError:
+            record["error"] = "Invalid JSON."
+            yield record
+            continue
+
+        if not isinstance(data, dict):
+            record["error"] = "Each line must be a JSON object."
+            yield record
+            continue
+
+        packages = data.get("packages")
+
+        record["ref"] = str(data.get("order_ref") or record["ref"])
+        record["order"] = {name: data.get(name) for name in ORDER_COLUMNS}
+        record["packages"] = packages if isinstance(packages, list) else []
+        yield record
+
+
+MANIFEST_READERS = {
+    "csv": read_csv_manifest,
+    "ndjson": read_ndjson_manifest,
+}
+
+
+def run_validation(serializer, data):
+    """
+    (validated data, None) or (None, errors) for one item, validated with an
+    already bound serializer so fields are not rebuilt per row.
+    """
+
+    try:
+        return serializer.run_validation(data), None
+    except serializers.ValidationError as exc:
+        return None, exc.detail
+
+
+def validate_chunk(records, context):
+    """
+    Fills in `validated` or `errors` for every record of a chunk.
+    """
+
+    order_serializer = OrderCreateSerializer(context=context)
+    package_serializer = ManifestPackageSerializer(context=context)
+
+    for record in records:
+        if "error" in record:
+            record["errors"] = {"non_field_errors": [record.pop("error")]}
+            continue
+
+        order, errors = run_validation(order_serializer, record["order"])
+
+        if not record["packages"]:
+            errors = {**(errors or {}), "packages": ["At least one package is required."]}
+
+        packages = []
+        package_errors = {}
+
+        for index, package_data in enumerate(record["packages"]):
+            package, package_error = run_validation(package_serializer, package_data)
+            if package_error:
+                package_errors[index] = package_error
+            packages.append(package)
+
+        if package_errors:
+            errors = {**(errors or {}), "packages": package_errors}
+
+        if errors:
+            record["errors"] = errors
+        else:
+            record["validated"] = (order, packages)
+
+
+def insert_chunk(records, customer):
+    """
+    Creates the orders, packages and deliveries of the valid records of a
+    chunk in one transaction. The orders claim drivers together with
+    claim_drivers() and each order's deliveries go to its driver; once no
+    driver is free the remaining orders stay pending. Returns the created
+    orders in record order.
+    """
+
+    package_count = sum(len(record["validated"][1]) for record in records)
+
+    with transaction.atomic():
+        drivers = claim_drivers(len(records))
+
+        orders = [
+            Order(
+                id=order_id,
+                customer_id=customer,
+                driver_id=driver,
+                order_status=Order.Status.ASSIGNED if driver else Order.Status.PENDING,
+                total_deliveries=len(record["validated"][1]),
+                total_price=sum(package.get("value", 0) for package in record["validated"][1]),
+                **record["validated"][0]
+            )
+            for order_id, record, driver in zip_longest(
+                unused_ids(Order, generate_order_ids, len(records)), records, drivers
+            )
+        ]
+        Order.objects.bulk_create(orders, batch_size=IMPORT_BULK_BATCH_SIZE)
+        count_order_statuses(Counter(order.order_status for order in orders))
+
+        package_ids = iter(unused_ids(Package, generate_package_ids, package_count))
+        packages = []
+        addresses = []
+
+        for order, record in zip(orders, records):
+            for package_data in record["validated"][1]:
+                package_data = dict(package_data)
+                addresses.append(package_data.pop("address"))
+                packages.append(Package(id=next(package_ids), order_id=order, **package_data))
+
+        Package.objects.bulk_create(packages, batch_size=IMPORT_BULK_BATCH_SIZE)
+
+        deliveries = [
+            Delivery(id=delivery_id, package_id=package, rider=package.order_id.driver_id, address=address)
+            for delivery_id, package, address in zip(
+                unused_ids(Delivery, generate_delivery_ids, package_count), packages, addresses
+            )
+        ]
+        Delivery.objects.bulk_create(deliveries, batch_size=IMPORT_BULK_BATCH_SIZE)
+
+    return orders
+
+
+def import_chunk(records, customer, context, report):
+    validate_chunk(records, context)
+
+    for record in records:
+        if "errors" in record:
+            report["errors"].append({
+                "rows": record["rows"],
+                "order_ref": record["ref"],
+                "errors": record["errors"],
+            })
+
+    valid = [record for record in records if "validated" in record]
+    if not valid:
+        return
+
+    try:
+        orders = insert_chunk(valid, customer)
+    except DatabaseError as exc:
+        for record in valid:
+            report["errors"].append({
+                "rows": record["rows"],
+                "order_ref": record["ref"],
+                "errors": {"non_field_errors": [f"Could not be saved: {exc}"]},
+            })
+        return
+
+    for order, record in zip(orders, valid):
+        report["orders"].append({"order_ref": record["ref"], "id": order.id})
+        report["orders_created"] += 1
+        report["packages_created"] += order.total_deliveries
+
+
+def import_manifest(lines, fmt, customer, chunk_size=IMPORT_CHUNK_SIZE, context=None):
+    """
+    Imports a manifest for `customer` from an iterable of text lines.
+
+    Returns a report with the created orders and the errors of every
+    rejected order, keyed by manifest row (CSV) or line (NDJSON) numbers.
+    A manifest that cannot be decoded or parsed part way keeps the orders
+    read before that point and reports the rest as one error.
+    """
+
+    report = {
+        "orders_created": 0,
+        "packages_created": 0,
+        "orders": [],
+        "errors": [],
+    }
+
+    chunk = []
+    last_row = 0
+
+    # Earlier chunks are already committed when the stream turns out to be
+    # undecodable or malformed, so the error goes into the report
+    try:
+        for record in MANIFEST_READERS[fmt](lines):
+            chunk.append(record)
+            last_row = record["rows"][-1]
+            if len(chunk) == chunk_size:
+                import_chunk(chunk, customer, context or {}, report)
+                chunk = []
+    except (UnicodeDecodeError, csv.Error) as exc:
+        read_error = {
+            "rows": [last_row + 1],
+            "order_ref": None,
+            "errors": {"non_field_errors": [
+                f"Manifest could not be read; rows from {last_row + 1} on were not imported: {exc}"
+            ]},
+        }
+    else:
+        read_error = None
+
+    if chunk:
+        import_chunk(chunk, customer, context or {}, report)
+
+    if read_error:
+        report["errors"].append(read_error)
+
+    report["orders_failed"] = len(report["errors"])
+    return report
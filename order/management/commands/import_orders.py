@@ -0,0 +1,41 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.encoders import JSONEncoder
+from customer.models import CustomUser
+from order.imports import IMPORT_CHUNK_SIZE, MANIFEST_FORMATS, import_manifest, manifest_format
+
+
+class Command(BaseCommand):
+    help = "Import orders with packages and deliveries from a CSV or NDJSON manifest."
+
+    def add_arguments(self, parser):
+        parser.add_argument("manifest", help="Path to the .csv or .ndjson manifest.")
+        parser.add_argument("--customer", required=True, help="Email of the customer placing the orders.")
+        parser.add_argument("--format", choices=MANIFEST_FORMATS, help="Defaults to the file extension.")
+        parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            customer = CustomUser.objects.get(email=options["customer"], role=CustomUser.Role.CUSTOMER)
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"No customer with email {options['customer']}.")
+
+        fmt = options["format"] or manifest_format(options["manifest"])
+        if fmt is None:
+            raise CommandError("Pass --format for manifests without a .csv or .ndjson extension.")
+
+        try:
+            with open(options["manifest"], newline="", encoding="utf-8-sig") as manifest:
+                report = import_manifest(manifest, fmt, customer, chunk_size=options["chunk_size"])
+        except ValidationError as exc:
+            raise CommandError(exc.detail[0] if isinstance(exc.detail, list) else exc.detail)
+
+        # One line per rejected order
+        for error in report["errors"]:
+            self.stdout.write(json.dumps(error, cls=JSONEncoder))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report['orders_created']} order(s) with {report['packages_created']} package(s); "
+            f"{report['orders_failed']} order(s) rejected."
+        ))
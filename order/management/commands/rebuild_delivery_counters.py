@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from order.models import Order
+from order.services import stale_counter_orders
+
+
+class Command(BaseCommand):
+    help = "Rebuild (or check) the per-order total/delivered delivery counters."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report orders with stale counters; exit non-zero if any.",
+        )
+
+    def handle(self, *args, **options):
+        stale = 0
+
+        for order in stale_counter_orders().iterator(chunk_size=2000):
+            stale += 1
+            self.stdout.write(
+                f"{order.id}: total {order.total_deliveries} -> {order.actual_total}, "
+                f"delivered {order.delivered_deliveries} -> {order.actual_delivered}"
+            )
+
+            if not options["check"]:
+                Order.objects.filter(pk=order.pk).update(
+                    total_deliveries=order.actual_total,
+                    delivered_deliveries=order.actual_delivered,
+                )
+
+        if options["check"] and stale:
+            raise CommandError(f"{stale} order(s) have stale delivery counters.")
+
+        action = "Found" if options["check"] else "Rebuilt"
+        self.stdout.write(self.style.SUCCESS(f"{action} {stale} stale order(s)."))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from customer.models import DriverProfile
+from order.services import stale_load_drivers
+
+
+class Command(BaseCommand):
+    help = "Rebuild (or check) DriverProfile.active_orders from open orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report drivers with a stale load; exit non-zero if any.",
+        )
+
+    def handle(self, *args, **options):
+        stale = 0
+
+        for driver in stale_load_drivers().iterator(chunk_size=2000):
+            stale += 1
+            self.stdout.write(
+                f"driver {driver.pk}: active_orders {driver.active_orders} -> {driver.actual_active}"
+            )
+
+            if not options["check"]:
+                DriverProfile.objects.filter(pk=driver.pk).update(
+                    active_orders=driver.actual_active
+                )
+
+        if options["check"] and stale:
+            raise CommandError(f"{stale} driver(s) have a stale active load.")
+
+        action = "Found" if options["check"] else "Rebuilt"
+        self.stdout.write(self.style.SUCCESS(f"{action} {stale} stale driver(s)."))
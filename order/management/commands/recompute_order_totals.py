@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from order.models import Order
+from order.services import stale_total_orders
+
+
+class Command(BaseCommand):
+    help = "Recompute (or check) each order's total_price from its packages."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report orders with stale totals; exit non-zero if any.",
+        )
+
+    def handle(self, *args, **options):
+        stale = 0
+
+        for order in stale_total_orders().iterator(chunk_size=2000):
+            stale += 1
+            self.stdout.write(f"{order.id}: total {order.total_price} -> {order.actual_price}")
+
+            if not options["check"]:
+                Order.objects.filter(pk=order.pk).update(total_price=order.actual_price)
+
+        if options["check"] and stale:
+            raise CommandError(f"{stale} order(s) have stale totals.")
+
+        action = "Found" if options["check"] else "Recomputed"
+        self.stdout.write(self.style.SUCCESS(f"{action} {stale} stale order(s)."))
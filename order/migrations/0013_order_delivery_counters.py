@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-18 12:30
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_delivery_counters(apps, schema_editor):
+    Order = apps.get_model("order", "Order")
+
+    orders = Order.objects.annotate(
+        actual_total=Count("packages__deliveries"),
+        actual_delivered=Count(
+            "packages__deliveries",
+            filter=Q(packages__deliveries__delivery_status="delivered")
+        ),
+    ).filter(actual_total__gt=0)
+
+    for order in orders.iterator(chunk_size=2000):
+        Order.objects.filter(pk=order.pk).update(
+            total_deliveries=order.actual_total,
+            delivered_deliveries=order.actual_delivered,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0012_order_cancel_reason'),
+        ('delivery', '0009_alter_delivery_delivery_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='delivered_deliveries',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total_deliveries',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_delivery_counters, migrations.RunPython.noop),
+    ]
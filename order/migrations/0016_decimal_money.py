@@ -0,0 +1,51 @@
+# Generated by Django 6.0 on 2026-10-18 09:00
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def recompute_totals(apps, schema_editor):
+    Order = apps.get_model("order", "Order")
+    Package = apps.get_model("order", "Package")
+
+    # Package values of an order, leaving out those whose delivery was cancelled
+    charged = (
+        Package.objects
+        .filter(order_id=OuterRef("pk"))
+        .filter(~Q(deliveries__delivery_status="cancelled"))
+        .values("order_id")
+        .annotate(total=Sum("value"))
+        .values("total")
+    )
+
+    Order.objects.update(
+        total_price=Coalesce(
+            Subquery(charged, output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+            Decimal("0"),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0015_widen_ids'),
+        ('delivery', '0011_widen_ids'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='total_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='package',
+            name='value',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(recompute_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-18 09:00
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def seed_status_counts(apps, schema_editor):
+    Order = apps.get_model("order", "Order")
+    OrderStatusCount = apps.get_model("order", "OrderStatusCount")
+
+    counts = dict(
+        Order.objects.values_list("order_status").annotate(count=Count("pk")).order_by()
+    )
+    OrderStatusCount.objects.bulk_create([
+        OrderStatusCount(order_status=status, count=counts.get(status, 0))
+        for status in ("pending", "assigned", "in_transit", "delivered", "cancelled")
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0016_decimal_money'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusCount',
+            fields=[
+                ('order_status', models.CharField(choices=[('pending', 'Pending'), ('assigned', 'Assigned'), ('in_transit', 'In Transit'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], max_length=20, primary_key=True, serialize=False)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_status_counts, migrations.RunPython.noop),
+    ]
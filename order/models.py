@@ -17,7 +17,7 @@ class Order(models.Model):
         
     id = models.CharField(
         primary_key=True,
-        max_length=12,
+        max_length=24,
         editable=False
     )
     customer_id = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="orders")
@@ -30,11 +30,30 @@ class Order(models.Model):
         related_name="dorders"
     )
     pickup_address = models.CharField(max_length=350, null=True,blank=True) 
-    total_price = models.FloatField(default=0.0)
+    # Sum of the values of the order's packages, less cancelled deliveries;
+    # kept in step by order.services
+    total_price = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     order_status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
     cancel_reason = models.CharField(max_length=350, blank=True)
     created_at = models.DateField(default=datetime.datetime.today)
 
+    # Denormalized delivery counters, kept in step by order.services
+    total_deliveries = models.PositiveIntegerField(default=0)
+    delivered_deliveries = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # Match the role-scoped querysets in OrderListAPIView (-created_at)
+        indexes = [
+            models.Index(fields=["customer_id", "-created_at"], name="order_customer_created_idx"),
+            models.Index(fields=["-created_at"], name="order_created_idx"),
+            models.Index(fields=["order_status", "-created_at"], name="order_status_created_idx"),
+            models.Index(
+                fields=["driver_id"],
+                name="order_driver_open_idx",
+                condition=models.Q(order_status__in=["pending", "assigned"]),
+            ),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.id:
             self.id = generate_order_id()
@@ -48,21 +67,41 @@ class Order(models.Model):
 class Package(models.Model):
     id = models.CharField(
         primary_key=True,
-        max_length=12,
+        max_length=24,
         editable=False
     )
     order_id = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="packages")
     description = models.CharField(max_length=150, blank=True)
     dimensions = models.CharField(max_length=50, blank=True)  
-    value = models.FloatField(default=0.0)
+    value = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     fragile = models.BooleanField(default=False)
     receiver_name = models.CharField(max_length=350, blank=True)
     receiver_phone = models.CharField(max_length=20, null=True, blank=True)
 
+    class Meta:
+        # Match the default -value ordering in PackageListAPIView
+        indexes = [
+            models.Index(fields=["-value"], name="package_value_idx"),
+            models.Index(fields=["order_id", "-value"], name="package_order_value_idx"),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.id:
             self.id = generate_package_id()
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return self.id
\ No newline at end of file
+        return self.id
+
+
+# Rollup of orders per status for dashboards, kept in step by order.services
+class OrderStatusCount(models.Model):
+    order_status = models.CharField(
+        primary_key=True,
+        max_length=20,
+        choices=Order.Status.choices
+    )
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.order_status}: {self.count}"
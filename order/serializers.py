@@ -1,9 +1,28 @@
 from rest_framework import serializers
 from .models import Order, Package
 from customer.models import DriverProfile
+from customer.context import get_permission_context
 from delivery.models import Delivery
+from delivery.services import add_rider_stats
 from django.db import transaction
 from django.utils import timezone
+from core.ids import unused_ids
+from .utils import generate_package_ids
+from .services import (
+    claim_driver,
+    add_driver_load,
+    release_driver,
+    pick_up_order,
+    rider_order_deliveries,
+    add_order_totals,
+    package_totals,
+    cancel_order_deliveries,
+    move_order_status,
+    PICKUP_CLOSED_STATUSES,
+)
+
+# Rows per INSERT statement when bulk creating packages
+PACKAGE_BULK_BATCH_SIZE = 500
 
 # Serializer for package 
 class PackageSerializer(serializers.ModelSerializer):
@@ -18,16 +37,17 @@ class PackageSerializer(serializers.ModelSerializer):
             "receiver_phone",
         ]
 
-    def create(self, validated_data):
+    # Validated per row so a bulk insert never starts with an invalid package
+    def validate(self, attrs):
 
-        if not validated_data["receiver_phone"]:
+        if not attrs.get("receiver_phone"):
             raise serializers.ValidationError("Receiver Phone number mandatory.")
         
 
-        if not validated_data["receiver_name"]:
+        if not attrs.get("receiver_name"):
             raise serializers.ValidationError("Receiver Name mandatory.")
 
-        return super().create(validated_data)
+        return attrs
 
 
 # Serializer for order
@@ -37,7 +57,7 @@ class OrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = "__all__"
-        read_only_fields = ("customer_id", "order_status", "created_at")
+        read_only_fields = ("customer_id", "order_status", "created_at", "total_price")
 
     def create(self, validated_data):
         request = self.context["request"]
@@ -61,29 +81,23 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         user = request.user if request else None
 
         if not user or user.role != "customer":
-            print("DEBUG: user.role =", getattr(user, "role", None))
             raise serializers.ValidationError("Only customers can create orders.")
 
-        if not getattr(user, "customer_profile", None) or not user.customer_profile.is_complete:
+        context = get_permission_context(request)
+        if context is None or not context.profile_complete:
             raise serializers.ValidationError("Complete your profile before placing an order.")
 
-        driver = (
-            DriverProfile.objects
-            .filter(
-                availability_status=True,
-                is_complete=True,
-                approval_status="approved"
-            )
-            .exclude(dorders__order_status__in=["pending", "assigned"]) 
-            .first()
-        )
+        # Claiming the driver and creating the order commit together
+        with transaction.atomic():
+            driver = claim_driver()
 
-        order = Order.objects.create(
-            customer_id=user,
-            driver_id=driver,
-            order_status="assigned" if driver else "pending",
-            **validated_data
-        )
+            order = Order.objects.create(
+                customer_id=user,
+                driver_id=driver,
+                order_status="assigned" if driver else "pending",
+                **validated_data
+            )
+            move_order_status(None, order.order_status)
 
         return order
     
@@ -103,12 +117,21 @@ class OrderAssignSerializer(serializers.Serializer):
         return value
 
     def save(self, **kwargs):
-        order = self.context["order"]
         driver = DriverProfile.objects.get(user__email=self.validated_data["driver_email"])
 
-        order.driver_id = driver
-        order.order_status = "assigned"
-        order.save()
+        with transaction.atomic():
+            order = Order.objects.select_for_update().get(
+                pk=self.context["order"].pk
+            )
+
+            # Move the open order from the previous driver's load to the new one
+            release_driver(order)
+            add_driver_load(driver.pk)
+            move_order_status(order.order_status, "assigned")
+
+            order.driver_id = driver
+            order.order_status = "assigned"
+            order.save(update_fields=["driver_id", "order_status"])
 
         return order
     
@@ -157,19 +180,14 @@ class OrderCancelSerializer(serializers.Serializer):
             order = Order.objects.select_for_update().get(
                 pk=validated_data["order"].pk
             )
+            release_driver(order)
+            move_order_status(order.order_status, "cancelled")
             order.order_status = "cancelled"
             order.cancel_reason = validated_data["cancel_reason"]
-            order.save()
-
-            Delivery.objects.filter(
-                package_id__order_id=order.id
-                ).exclude(
-                    delivery_status=Delivery.Status.DELIVERED
-                ).update(
-                    delivery_status=Delivery.Status.CANCELLED,
-                    delivered_at=None
-                )
-            
+            order.save(update_fields=["order_status", "cancel_reason"])
+
+            cancel_order_deliveries(order)
+
         return order
     
 
@@ -209,11 +227,21 @@ class CreatePackagesSerializer(serializers.Serializer):
         order = validated_data["order"]
         packages_data = validated_data["packages"]
 
-        created_packages = []
+        # Pre-generate ids, skipping any that are already taken
+        package_ids = unused_ids(Package, generate_package_ids, len(packages_data))
 
-        for package_data in packages_data:
-            pkg = Package.objects.create(order_id=order, **package_data)
-            created_packages.append(pkg)
+        packages = [
+            Package(id=pkg_id, order_id=order, **package_data)
+            for pkg_id, package_data in zip(package_ids, packages_data)
+        ]
+
+        # All packages are written or none are
+        with transaction.atomic():
+            created_packages = Package.objects.bulk_create(
+                packages,
+                batch_size=PACKAGE_BULK_BATCH_SIZE
+            )
+            add_order_totals(package_totals(created_packages))
 
         return created_packages
 
@@ -301,60 +329,28 @@ class OrderUpdateSerializer(serializers.Serializer):
             )
 
         # Ensure order is not already in transit or delivered
-        if order.order_status in [
-            Order.Status.IN_TRANSIT,
-            Order.Status.DELIVERED,
-            Order.Status.CANCELLED
-        ]:
+        if order.order_status in PICKUP_CLOSED_STATUSES:
             raise serializers.ValidationError(
                 f"Order cannot be moved to picked_up from '{order.order_status}'."
             )
 
-        # Ensure delivery belongs to this rider
-        deliveries = Delivery.objects.filter(
-            package_id__order_id=order.id
-            )
-
-        for delivery in deliveries:
-            if delivery.rider.user != request.user:
-                raise serializers.ValidationError(
-                    "You can only update orders assigned to you."
-                )
-            
-        return attrs  
-
-
-    def create1(self, validated_data):
-
-        with transaction.atomic():
-
-            order = Order.objects.select_for_update().get(
-                pk=validated_data["order"].pk
-            )
+        # Ensure every delivery of the order belongs to this rider
+        rider_id = get_permission_context(request).profile_id
+        deliveries = rider_order_deliveries(order, rider_id)
 
-            # Lock all deliveries belonging to this order
-            deliveries = Delivery.objects.select_for_update().filter(
-                package_id__order_id=order.id
+        if not deliveries["total"]:
+            raise serializers.ValidationError(
+                "No deliveries found for this order."
             )
 
-            if not deliveries.exists():
-                raise serializers.ValidationError(
-                    "No deliveries found for this order."
-                )
-
-            # Update all deliveries
-            now = timezone.now()
-            deliveries.update(
-                delivery_status="picked_up",
-                picked_up_at=now
+        if deliveries["owned"] != deliveries["total"]:
+            raise serializers.ValidationError(
+                "You can only update orders assigned to you."
             )
 
-            # Update order status
-            order.order_status = Order.Status.IN_TRANSIT
-            order.save()
+        attrs["rider_id"] = rider_id
+        return attrs
 
-        return order
-    
     def create(self, validated_data):
 
         with transaction.atomic():
@@ -363,26 +359,13 @@ class OrderUpdateSerializer(serializers.Serializer):
                 pk=validated_data["order"].pk
             )
 
-            deliveries = Delivery.objects.select_for_update().filter(
-                package_id__order_id=order.id
-            )
-
-            now = timezone.now()
-            new_status = validated_data["status"]
-
-            # Update all deliveries individually (safe for timestamps)
-            for delivery in deliveries:
-
-                if new_status == "picked_up":
-                    delivery.delivery_status = Delivery.Status.PICKED_UP
-                    delivery.picked_up_at = now
-
-                delivery.save()
-
-            # Update Order status
-            if new_status == "picked_up":
-                order.order_status = Order.Status.IN_TRANSIT
+            # Re-checked under the lock in case the order moved on meanwhile
+            if order.order_status in PICKUP_CLOSED_STATUSES:
+                raise serializers.ValidationError(
+                    f"Order cannot be moved to picked_up from '{order.order_status}'."
+                )
 
-            order.save()
+            picked_up = pick_up_order(order, validated_data["rider_id"])
+            add_rider_stats(validated_data["rider_id"], timezone.localdate(), picked_up=picked_up)
 
         return order
\ No newline at end of file
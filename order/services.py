@@ -0,0 +1,413 @@
+import heapq
+import operator
+from collections import Counter, defaultdict
+from decimal import Decimal
+from functools import reduce
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Count, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from customer.models import DriverProfile
+from delivery.models import Delivery
+from .models import Order, OrderStatusCount
+
+
+def add_order_deliveries(deliveries):
+    """
+    Increment total_deliveries for the orders of newly created deliveries
+    in one UPDATE.
+    """
+
+    per_order = Counter(
+        delivery.package_id.order_id_id for delivery in deliveries
+    )
+    if not per_order:
+        return
+
+    Order.objects.filter(pk__in=list(per_order)).update(
+        total_deliveries=F("total_deliveries") + Case(
+            *[When(pk=order_id, then=Value(count)) for order_id, count in per_order.items()],
+            default=Value(0),
+        )
+    )
+
+
+def record_delivery_delivered(order, count=1):
+    """
+    Increment delivered_deliveries for an order and refresh its counters.
+    Returns True when every delivery of the order has been delivered.
+    """
+
+    Order.objects.filter(pk=order.pk).update(
+        delivered_deliveries=F("delivered_deliveries") + count
+    )
+    order.refresh_from_db(fields=["total_deliveries", "delivered_deliveries"])
+
+    return (
+        order.total_deliveries > 0
+        and order.total_deliveries == order.delivered_deliveries
+    )
+
+
+def counted_orders():
+    """
+    Orders annotated with their delivery counts computed from Delivery rows.
+    Used to rebuild and check the denormalized counters.
+    """
+
+    return Order.objects.annotate(
+        actual_total=Count("packages__deliveries"),
+        actual_delivered=Count(
+            "packages__deliveries",
+            filter=Q(packages__deliveries__delivery_status="delivered")
+        ),
+    )
+
+
+def stale_counter_orders():
+    """
+    Orders whose denormalized counters disagree with their Delivery rows.
+    """
+
+    return counted_orders().exclude(
+        total_deliveries=F("actual_total"),
+        delivered_deliveries=F("actual_delivered"),
+    )
+
+
+def package_totals(packages):
+    """
+    {order id: summed package value} for a batch of packages.
+    """
+
+    totals = defaultdict(Decimal)
+    for package in packages:
+        totals[package.order_id_id] += Decimal(str(package.value))
+    return totals
+
+
+def add_order_totals(totals):
+    """
+    Add {order id: amount} to Order.total_price; negative amounts subtract.
+    Issues one UPDATE per order with a non-zero amount.
+    """
+
+    for order_id, amount in totals.items():
+        if amount:
+            Order.objects.filter(pk=order_id).update(
+                total_price=F("total_price") + amount
+            )
+
+
+def cancel_order_deliveries(order):
+    """
+    Cancel the undelivered deliveries of an order and take their package
+    values off its total. Call inside a transaction holding the order lock.
+    """
+
+    open_deliveries = Delivery.objects.filter(
+        package_id__order_id=order.pk
+    ).exclude(
+        delivery_status__in=[Delivery.Status.DELIVERED, Delivery.Status.CANCELLED]
+    )
+
+    cancelled_value = open_deliveries.aggregate(
+        total=Sum("package_id__value")
+    )["total"]
+
+    open_deliveries.update(
+        delivery_status=Delivery.Status.CANCELLED,
+        delivered_at=None
+    )
+
+    if cancelled_value:
+        add_order_totals({order.pk: -cancelled_value})
+
+
+def priced_orders():
+    """
+    Orders annotated with their total computed from Package rows, leaving
+    out packages whose delivery was cancelled. Used to rebuild and check
+    total_price.
+    """
+
+    money = DecimalField(max_digits=12, decimal_places=2)
+
+    return Order.objects.annotate(
+        actual_price=Coalesce(
+            Sum(
+                "packages__value",
+                filter=~Q(packages__deliveries__delivery_status="cancelled")
+            ),
+            Value(Decimal("0")),
+            output_field=money,
+        )
+    )
+
+
+def stale_total_orders():
+    """
+    Orders whose total_price disagrees with their packages.
+    """
+
+    return priced_orders().exclude(total_price=F("actual_price"))
+
+
+def apply_order_status_changes(changes):
+    """
+    Add {order status: change} to the existing OrderStatusCount rows in one
+    UPDATE. Returns the number of rows updated.
+    """
+
+    return OrderStatusCount.objects.filter(order_status__in=list(changes)).update(
+        count=F("count") + Case(
+            *[When(order_status=status, then=Value(change)) for status, change in changes.items()],
+            default=Value(0),
+        )
+    )
+
+
+def count_order_statuses(changes):
+    """
+    Apply {order status: change} to the OrderStatusCount rollup in one UPDATE.
+
+    The rows are seeded by a migration; a status whose row is gone (a flushed
+    table, a manual delete) gets it created with a zero count, and then the
+    change is applied to it.
+    """
+
+    changes = {status: change for status, change in changes.items() if change}
+    if not changes:
+        return
+
+    if apply_order_status_changes(changes) == len(changes):
+        return
+
+    existing = set(
+        OrderStatusCount.objects
+        .filter(order_status__in=list(changes))
+        .values_list("order_status", flat=True)
+    )
+    missing = {status: change for status, change in changes.items() if status not in existing}
+
+    # A concurrent first change may have created the row meanwhile; keep it
+    OrderStatusCount.objects.bulk_create(
+        [OrderStatusCount(order_status=status) for status in missing],
+        ignore_conflicts=True,
+    )
+    apply_order_status_changes(missing)
+
+
+def move_order_status(old_status, new_status, count=1):
+    """
+    Record `count` orders moving between statuses; `old_status` is None for
+    new orders.
+    """
+
+    changes = Counter({new_status: count})
+    if old_status:
+        changes[old_status] -= count
+    count_order_statuses(changes)
+
+
+def actual_order_status_counts():
+    """
+    {order status: count} computed from Order rows, every status included.
+    Used to rebuild and check OrderStatusCount.
+    """
+
+    counts = dict(
+        Order.objects.values_list("order_status").annotate(count=Count("pk")).order_by()
+    )
+    return {status: counts.get(status, 0) for status in Order.Status.values}
+
+
+# Order statuses that count towards a driver's active load
+OPEN_ORDER_STATUSES = ("pending", "assigned")
+
+# A driver is offered new orders while below this many open orders
+MAX_OPEN_ORDERS_PER_DRIVER = 1
+
+# Locked candidates tried per claim before giving up
+DRIVER_CLAIM_CANDIDATES = 5
+
+
+def assignable_drivers():
+    return DriverProfile.objects.filter(
+        availability_status=True,
+        is_complete=True,
+        approval_status="approved",
+    )
+
+
+def claim_driver():
+    """
+    Claim the least-loaded assignable driver for a new order.
+
+    Candidates are read with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent
+    claims do not queue on the same row, and the load is bumped with a
+    conditional UPDATE, so a driver can never be claimed twice (this also
+    holds on backends without row locks). Returns the DriverProfile or None.
+    """
+
+    with transaction.atomic():
+        candidates = (
+            assignable_drivers()
+            .select_for_update(skip_locked=True)
+            .filter(active_orders__lt=MAX_OPEN_ORDERS_PER_DRIVER)
+            .order_by("active_orders", "id")
+        )
+
+        for driver in candidates[:DRIVER_CLAIM_CANDIDATES]:
+            claimed = DriverProfile.objects.filter(
+                pk=driver.pk,
+                active_orders=driver.active_orders,
+            ).update(active_orders=F("active_orders") + 1)
+
+            if claimed:
+                driver.active_orders += 1
+                return driver
+
+    return None
+
+
+def claim_drivers(count):
+    """
+    Claim drivers for `count` new orders at once: one locked read of the
+    least-loaded candidates, handed out from a min-heap keyed on (load, id)
+    so a driver takes several orders while under MAX_OPEN_ORDERS_PER_DRIVER,
+    and one conditional UPDATE of their loads. If a concurrent claim moved
+    one of them meanwhile (only possible on backends without row locks) the
+    batch is undone and the drivers are claimed one at a time. Returns one
+    DriverProfile per claimed order, fewer than `count` when drivers run out.
+    """
+
+    if count <= 0:
+        return []
+
+    with transaction.atomic():
+        heap = [
+            (driver.active_orders, driver.pk, driver)
+            for driver in assignable_drivers()
+            .select_for_update(skip_locked=True)
+            .filter(active_orders__lt=MAX_OPEN_ORDERS_PER_DRIVER)
+            .order_by("active_orders", "id")[:count]
+        ]
+        loads = {driver.pk: driver.active_orders for _, _, driver in heap}
+        heapq.heapify(heap)
+
+        drivers = []
+        while heap and len(drivers) < count:
+            load, driver_id, driver = heapq.heappop(heap)
+            drivers.append(driver)
+            if load + 1 < MAX_OPEN_ORDERS_PER_DRIVER:
+                heapq.heappush(heap, (load + 1, driver_id, driver))
+
+        claims = Counter(driver.pk for driver in drivers)
+        if not claims:
+            return []
+
+        claimed = DriverProfile.objects.filter(
+            reduce(operator.or_, (Q(pk=pk, active_orders=loads[pk]) for pk in claims))
+        ).update(
+            active_orders=F("active_orders") + Case(
+                *[When(pk=pk, then=Value(added)) for pk, added in claims.items()],
+                default=Value(0),
+            )
+        )
+
+        if claimed == len(claims):
+            for driver in {driver.pk: driver for driver in drivers}.values():
+                driver.active_orders = loads[driver.pk] + claims[driver.pk]
+            return drivers
+
+        transaction.set_rollback(True)
+
+    drivers = []
+    while len(drivers) < count:
+        driver = claim_driver()
+        if driver is None:
+            break
+        drivers.append(driver)
+    return drivers
+
+
+def add_driver_load(driver_id, count=1):
+    DriverProfile.objects.filter(pk=driver_id).update(
+        active_orders=F("active_orders") + count
+    )
+
+
+def release_driver(order):
+    """
+    Drop an order from its driver's active load. Call before moving the
+    order out of an open status (to in transit, cancelled or a new driver).
+    """
+
+    if order.driver_id_id and order.order_status in OPEN_ORDER_STATUSES:
+        DriverProfile.objects.filter(
+            pk=order.driver_id_id,
+            active_orders__gt=0,
+        ).update(active_orders=F("active_orders") - 1)
+
+
+# Orders in these statuses can no longer be picked up
+PICKUP_CLOSED_STATUSES = (
+    Order.Status.IN_TRANSIT,
+    Order.Status.DELIVERED,
+    Order.Status.CANCELLED,
+)
+
+
+def rider_order_deliveries(order, rider_id):
+    """
+    Delivery count of an order and how many of them are assigned to the
+    rider, in one aggregate query.
+    """
+
+    return Delivery.objects.filter(package_id__order_id=order.pk).aggregate(
+        total=Count("pk"),
+        owned=Count("pk", filter=Q(rider_id=rider_id)),
+    )
+
+
+def pick_up_order(order, rider_id):
+    """
+    Mark the rider's assigned deliveries of the order picked up with a single
+    UPDATE and move the order to in transit. Call inside a transaction holding
+    the order's row lock. Returns the number of deliveries updated.
+    """
+
+    picked_up = Delivery.objects.filter(
+        package_id__order_id=order.pk,
+        rider_id=rider_id,
+        delivery_status=Delivery.Status.ASSIGNED,
+    ).update(
+        delivery_status=Delivery.Status.PICKED_UP,
+        picked_up_at=timezone.now(),
+    )
+
+    release_driver(order)
+    move_order_status(order.order_status, Order.Status.IN_TRANSIT)
+    order.order_status = Order.Status.IN_TRANSIT
+    order.save(update_fields=["order_status"])
+
+    return picked_up
+
+
+def loaded_drivers():
+    """
+    Drivers annotated with their open order count computed from Order rows.
+    Used to rebuild and check active_orders.
+    """
+
+    return DriverProfile.objects.annotate(
+        actual_active=Count(
+            "dorders",
+            filter=Q(dorders__order_status__in=OPEN_ORDER_STATUSES)
+        ),
+    )
+
+
+def stale_load_drivers():
+    return loaded_drivers().exclude(active_orders=F("actual_active"))
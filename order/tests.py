@@ -1,3 +1,903 @@
-from django.test import TestCase
+import csv
+import datetime
+import heapq
+import io
+import json
+import os
+import tempfile
+from decimal import Decimal
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import AsyncClient, TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+from core.ids import TimeOrderedIdGenerator, unused_ids
+from core.serializers import values_serializer_for
+from core.middleware import QUERY_COUNT_HEADER
+from core.testing import QueryBudgetTestCase, clear_caches, make_admin, make_customer, make_driver
+from customer.models import DriverProfile
+from delivery.models import Delivery
+from delivery.utils import generate_delivery_ids
+from .models import Order, Package
+from .serializers import OrderSerializer, PackageSerializer
+from .services import add_order_deliveries, claim_driver, claim_drivers
+from .imports import import_manifest
+from .views import (
+    AsyncOrderListAPIView,
+    AsyncPackageListAPIView,
+    OrderExportAPIView,
+    OrderListAPIView,
+    PackageListAPIView,
+)
+from .utils import generate_order_ids, generate_package_ids
 
-# Create your tests here.
+
+def package_data(count):
+    return [
+        {
+            "description": "Box",
+            "dimensions": "Small",
+            "value": 10,
+            "fragile": False,
+            "receiver_name": "Ama Mensah",
+            "receiver_phone": "+233200000000",
+        }
+        for _ in range(count)
+    ]
+
+
+MANIFEST_HEADER = "order_ref,pickup_address,description,value,fragile,receiver_name,receiver_phone,address\n"
+
+
+def csv_manifest(orders, packages_per_order=2):
+    return MANIFEST_HEADER + "".join(
+        f"A-{order},Accra,Box,{package + 1},false,Ama Mensah,+233200000000,Tema\n"
+        for order in range(orders)
+        for package in range(packages_per_order)
+    )
+
+
+def seed_packages(order, count):
+    return Package.objects.bulk_create([
+        Package(id=package_id, order_id=order, **data)
+        for package_id, data in zip(generate_package_ids(count), package_data(count))
+    ])
+
+
+# Query budgets for the order and package endpoints
+class OrderQueryBudgetTests(QueryBudgetTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.customer)
+
+    def new_order(self):
+        return Order.objects.create(customer_id=self.customer, pickup_address="Accra")
+
+    def test_create_order(self):
+        def call(size):
+            for index in range(size):
+                make_driver(f"driver{index}@example.com")
+            return self.client.post(
+                "/api/v1/order/create/", {"pickup_address": "Accra"}, format="json"
+            )
+
+        # Includes the status rollup UPDATE
+        self.assertQueryBudget(9, call)
+
+    def test_create_packages(self):
+        def call(size):
+            order = self.new_order()
+            return self.client.post(
+                "/api/v1/package/create/",
+                {"order_id": order.id, "packages": package_data(size)},
+                format="json",
+            )
+
+        # Includes the UPDATE adding the package values to the order total
+        self.assertQueryBudget(8, call)
+
+    def test_import_orders(self):
+        make_driver()
+
+        def call(size):
+            manifest = SimpleUploadedFile("manifest.csv", csv_manifest(size).encode("utf-8"))
+            return self.client.post("/api/v1/order/import/", {"manifest": manifest}, format="multipart")
+
+        # SQLite's parameter limit splits the 200 package and delivery rows
+        # of the largest size into a few INSERT batches; one UPDATE counts
+        # the new orders in the status rollup, and the orders claim their
+        # drivers with one read and one UPDATE
+        self.assertQueryBudget(17, call)
+
+    def test_search_orders(self):
+        def call(size):
+            for _ in range(size):
+                seed_packages(self.new_order(), 3)
+            return self.client.get("/api/v1/search/order/")
+
+        self.assertQueryBudget(3, call)
+
+    def test_search_orders_by_cursor(self):
+        def call(size):
+            for _ in range(size):
+                seed_packages(self.new_order(), 3)
+            return self.client.get("/api/v1/search/order/?pagination=cursor")
+
+        self.assertQueryBudget(2, call)
+
+    def test_search_packages_as_driver(self):
+        driver = make_driver()
+        self.client.force_authenticate(driver)
+
+        def call(size):
+            packages = seed_packages(self.new_order(), size)
+            Delivery.objects.bulk_create([
+                Delivery(id=delivery_id, package_id=package, rider=driver.driverprofile)
+                for delivery_id, package in zip(generate_delivery_ids(size), packages)
+            ])
+            seed_packages(self.new_order(), size)
+
+            response = self.client.get("/api/v1/search/package/")
+            self.assertEqual(response.data["count"], size)
+            return response
+
+        self.assertQueryBudget(2, call)
+
+    def test_search_packages(self):
+        def call(size):
+            seed_packages(self.new_order(), size)
+            return self.client.get("/api/v1/search/package/")
+
+        self.assertQueryBudget(2, call)
+
+    def test_pickup_order(self):
+        driver = make_driver()
+        self.client.force_authenticate(driver)
+
+        def call(size):
+            order = self.new_order()
+            packages = seed_packages(order, size)
+            Delivery.objects.bulk_create([
+                Delivery(id=delivery_id, package_id=package, rider=driver.driverprofile)
+                for delivery_id, package in zip(generate_delivery_ids(size), packages)
+            ])
+            response = self.client.put(
+                "/api/v1/order/update/",
+                {"order_id": order.id, "status": "picked_up"},
+                format="json",
+            )
+            self.assertEqual(
+                Delivery.objects.filter(package_id__order_id=order, delivery_status="picked_up").count(),
+                size,
+            )
+            return response
+
+        # Includes the status rollup UPDATE and creating the rider's daily stats row
+        self.assertQueryBudget(12, call)
+
+    def test_cancel_order(self):
+        def call(size):
+            order = self.new_order()
+            seed_packages(order, size)
+            return self.client.put(
+                "/api/v1/order/cancel/",
+                {"order_id": order.id, "cancel_reason": "Mistaken Order"},
+                format="json",
+            )
+
+        # Includes the aggregate of the cancelled package values and the
+        # status rollup UPDATE
+        self.assertQueryBudget(11, call)
+
+
+# The values() read path must render exactly what the serializers do
+class ValuesSerializerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        customer = make_customer()
+        driver = make_driver()
+
+        assigned = Order.objects.create(
+            customer_id=customer,
+            driver_id=driver.driverprofile,
+            order_status=Order.Status.ASSIGNED,
+            delivery_date=datetime.date(2026, 3, 1),
+            pickup_address="Accra",
+        )
+        pending = Order.objects.create(customer_id=customer)
+        Order.objects.create(customer_id=customer, pickup_address="Tema")
+
+        seed_packages(assigned, 3)
+        seed_packages(pending, 2)
+        Package.objects.filter(order_id=pending).update(receiver_phone=None, value=12.5)
+
+    def assertSameJSON(self, serializer_class, queryset):
+        values = values_serializer_for(serializer_class)
+        self.assertEqual(
+            JSONRenderer().render(values.to_representation(values.values(queryset))),
+            JSONRenderer().render(serializer_class(queryset, many=True).data),
+        )
+
+    def test_orders(self):
+        self.assertSameJSON(OrderSerializer, Order.objects.prefetch_related("packages").order_by("id"))
+
+    def test_packages(self):
+        self.assertSameJSON(PackageSerializer, Package.objects.order_by("-value", "id"))
+
+
+# Tests for the streaming order and package exports
+class ExportTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_admin()
+        cls.customer = make_customer()
+        for index in range(5):
+            order = Order.objects.create(
+                customer_id=cls.customer,
+                pickup_address=f"Pickup {index}",
+                order_status=Order.Status.CANCELLED if index % 2 else Order.Status.PENDING,
+            )
+            seed_packages(order, 2)
+
+    def setUp(self):
+        clear_caches()
+        self.client.force_authenticate(self.admin)
+
+    def read(self, response):
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    def test_ndjson_matches_search(self):
+        query = "?orderstatus=pending&ordering=created_at"
+        response = self.client.get(f"/api/v1/export/order/{query}")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        search = self.client.get(f"/api/v1/search/order/{query}").json()["results"]
+
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows, search)
+
+    def test_csv(self):
+        response = self.client.get("/api/v1/export/package/?output=csv&min_value=0")
+        self.assertEqual(response["Content-Type"], "text/csv")
+
+        rows = list(csv.reader(io.StringIO(self.read(response))))
+        self.assertEqual(rows[0], list(PackageSerializer().fields))
+        self.assertEqual(len(rows), 11)
+
+    def test_streams_in_chunks(self):
+        with mock.patch.object(OrderExportAPIView, "export_chunk_size", 2):
+            response = self.client.get("/api/v1/export/order/")
+            chunks = list(response.streaming_content)
+
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(sum(chunk.count(b"\n") for chunk in chunks), 5)
+
+    def test_rejects_unknown_output(self):
+        response = self.client.get("/api/v1/export/order/?output=xml")
+        self.assertEqual(response.status_code, 400)
+
+    def test_admin_only(self):
+        self.client.force_authenticate(self.customer)
+        response = self.client.get("/api/v1/export/order/")
+        self.assertEqual(response.status_code, 403)
+
+
+# Tests for the manifest import
+class ImportTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+        cls.rider = make_driver().driverprofile
+
+    def setUp(self):
+        clear_caches()
+        self.client.force_authenticate(self.customer)
+
+    def upload(self, name, content):
+        manifest = SimpleUploadedFile(name, content.encode("utf-8"))
+        return self.client.post("/api/v1/order/import/", {"manifest": manifest}, format="multipart")
+
+    def test_csv_reports_invalid_rows(self):
+        manifest = (
+            MANIFEST_HEADER
+            + "A-1,Accra,Phone,600,true,Ama Mensah,+233200000001,Tema\n"
+            + "A-1,Accra,Food,25,false,Kofi Boateng,+233200000002,\n"
+            + "A-2,Kumasi,Shoes,80,false,Yaw Mensah,,Adum\n"
+            + "A-3,Takoradi,Bag,abc,false,Esi Arthur,+233200000003,\n"
+            + "A-4,Ho,Book,15,false,Selasi Dzokoto,+233200000004,\n"
+        )
+        response = self.upload("manifest.csv", manifest)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["orders_created"], 2)
+        self.assertEqual(response.data["packages_created"], 3)
+        self.assertEqual(
+            [(error["order_ref"], error["rows"]) for error in response.data["errors"]],
+            [("A-2", [4]), ("A-3", [5])],
+        )
+        self.assertIn("value", response.data["errors"][1]["errors"]["packages"][0])
+
+        order = Order.objects.get(pk=response.data["orders"][0]["id"])
+        self.assertEqual(order.customer_id, self.customer)
+        self.assertEqual(order.total_deliveries, 2)
+        self.assertEqual(
+            sorted(Delivery.objects.filter(package_id__order_id=order).values_list("address", flat=True)),
+            ["", "Tema"],
+        )
+
+        # The only driver is claimed by the first order; the second waits for one
+        self.assertEqual((order.order_status, order.driver_id), (Order.Status.ASSIGNED, self.rider))
+        self.assertFalse(Delivery.objects.filter(package_id__order_id=order).exclude(rider=self.rider).exists())
+
+        second = Order.objects.get(pk=response.data["orders"][1]["id"])
+        self.assertEqual((second.order_status, second.driver_id), (Order.Status.PENDING, None))
+        self.assertFalse(Delivery.objects.filter(package_id__order_id=second, rider__isnull=False).exists())
+
+    def test_imported_order_can_be_picked_up(self):
+        response = self.upload("manifest.csv", csv_manifest(1))
+        order_id = response.data["orders"][0]["id"]
+
+        self.client.force_authenticate(self.rider.user)
+        response = self.client.put(
+            "/api/v1/order/update/",
+            {"order_id": order_id, "status": "picked_up"},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(Order.objects.get(pk=order_id).order_status, Order.Status.IN_TRANSIT)
+        self.assertEqual(
+            Delivery.objects.filter(package_id__order_id=order_id, delivery_status="picked_up").count(),
+            2,
+        )
+        self.assertEqual(DriverProfile.objects.get(pk=self.rider.pk).active_orders, 0)
+
+    def test_ndjson(self):
+        package = {"description": "Box", "receiver_name": "Ama Mensah", "receiver_phone": "+233200000000"}
+        manifest = "\n".join([
+            json.dumps({"order_ref": "N-1", "pickup_address": "Accra", "packages": [package, package]}),
+            "{not json",
+            json.dumps({"order_ref": "N-2", "packages": []}),
+            json.dumps({"order_ref": "N-3", "packages": [package]}),
+        ])
+        response = self.upload("manifest.ndjson", manifest)
+
+        self.assertEqual(response.data["orders_created"], 2)
+        self.assertEqual(
+            [(error["order_ref"], error["rows"]) for error in response.data["errors"]],
+            [("line-2", [2]), ("N-2", [3])],
+        )
+
+    def test_invalid_chunk_does_not_abort_the_file(self):
+        manifest = csv_manifest(5).splitlines(keepends=True)
+        # Third order has no receiver name
+        manifest[5] = manifest[5].replace("Ama Mensah", "")
+
+        report = import_manifest(manifest, "csv", self.customer, chunk_size=2)
+
+        self.assertEqual(report["orders_created"], 4)
+        self.assertEqual([error["order_ref"] for error in report["errors"]], ["A-2"])
+        self.assertEqual(Package.objects.count(), 8)
+
+    def test_undecodable_rows_are_reported(self):
+        manifest = csv_manifest(3).encode("utf-8") + b"A-3,Accra,Box,1,false,Ama \xff,+233200000000,Tema\n"
+        response = self.client.post(
+            "/api/v1/order/import/",
+            {"manifest": SimpleUploadedFile("manifest.csv", manifest)},
+            format="multipart",
+        )
+
+        # A-2 was still open when reading stopped
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["orders_created"], 2)
+        self.assertEqual(response.data["orders_failed"], 1)
+        [error] = response.data["errors"]
+        self.assertEqual(error["rows"], [6])
+        self.assertIn("rows from 6 on were not imported", error["errors"]["non_field_errors"][0])
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_malformed_csv_keeps_committed_chunks(self):
+        # A field over the csv module's size limit
+        oversized = "A-3,Accra," + "x" * (csv.field_size_limit() + 1) + ",1,false,Ama Mensah,+233200000000,Tema\n"
+        manifest = csv_manifest(3).splitlines(keepends=True) + [oversized]
+
+        report = import_manifest(manifest, "csv", self.customer, chunk_size=1)
+
+        # A-0 and A-1 were committed in their own chunks before the error
+        self.assertEqual(report["orders_created"], 2)
+        [error] = report["errors"]
+        self.assertEqual(error["rows"], [6])
+        self.assertIn("field larger than field limit", error["errors"]["non_field_errors"][0])
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_rejects_bad_manifest(self):
+        self.assertEqual(self.upload("manifest.xml", "<orders/>").status_code, 400)
+        self.assertEqual(self.upload("manifest.csv", "description\nBox\n").status_code, 400)
+
+    def test_command(self):
+        out = io.StringIO()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "manifest.csv")
+            with open(path, "w") as manifest:
+                manifest.write(csv_manifest(3))
+
+            call_command("import_orders", path, customer=self.customer.email, stdout=out)
+
+        self.assertIn("Created 3 order(s) with 6 package(s)", out.getvalue())
+
+
+# Tests for the order pickup transition
+class OrderPickupTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+        cls.driver = make_driver()
+        cls.other = make_driver("other@example.com")
+
+    def setUp(self):
+        clear_caches()
+        self.client.force_authenticate(self.driver)
+        self.order = Order.objects.create(
+            customer_id=self.customer,
+            driver_id=self.driver.driverprofile,
+            order_status=Order.Status.ASSIGNED,
+        )
+        packages = seed_packages(self.order, 3)
+        Delivery.objects.bulk_create([
+            Delivery(id=delivery_id, package_id=package, rider=self.driver.driverprofile)
+            for delivery_id, package in zip(generate_delivery_ids(3), packages)
+        ])
+
+    def pick_up(self):
+        return self.client.put(
+            "/api/v1/order/update/",
+            {"order_id": self.order.id, "status": "picked_up"},
+            format="json",
+        )
+
+    def test_picks_up_every_delivery(self):
+        response = self.pick_up()
+
+        self.assertEqual(response.status_code, 200)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.order_status, Order.Status.IN_TRANSIT)
+        deliveries = Delivery.objects.filter(package_id__order_id=self.order)
+        self.assertEqual({(d.delivery_status, d.picked_up_at is not None) for d in deliveries}, {("picked_up", True)})
+
+        self.assertEqual(self.pick_up().status_code, 400)
+
+    def test_rejects_orders_with_other_riders(self):
+        delivery = Delivery.objects.filter(package_id__order_id=self.order).first()
+        Delivery.objects.filter(pk=delivery.pk).update(rider=self.other.driverprofile)
+
+        response = self.pick_up()
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Delivery.objects.filter(delivery_status="picked_up").exists())
+
+    def test_rejects_unassigned_deliveries(self):
+        Delivery.objects.update(rider=None)
+        self.assertEqual(self.pick_up().status_code, 400)
+
+
+# Tests for batch package creation
+class CreatePackagesTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+
+    def setUp(self):
+        clear_caches()
+        self.client.force_authenticate(self.customer)
+        self.order = Order.objects.create(customer_id=self.customer, pickup_address="Accra")
+        seed_packages(self.order, 1)
+        Order.objects.filter(pk=self.order.pk).update(total_price=Decimal("10.00"))
+
+    def create(self, packages):
+        return self.client.post(
+            "/api/v1/package/create/",
+            {"order_id": self.order.id, "packages": packages},
+            format="json",
+        )
+
+    def assertNothingCreated(self):
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.packages.count(), 1)
+        self.assertEqual(self.order.total_price, Decimal("10.00"))
+
+    def test_creates_every_package(self):
+        response = self.create(package_data(3))
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.packages.count(), 4)
+        self.assertEqual(self.order.total_price, Decimal("40.00"))
+
+    def test_blank_receiver_name_rejects_the_request(self):
+        packages = package_data(3)
+        packages[1]["receiver_name"] = ""
+
+        response = self.create(packages)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["packages"][1]["non_field_errors"], ["Receiver Name mandatory."])
+        self.assertNothingCreated()
+
+    def test_missing_receiver_phone_rejects_the_request(self):
+        packages = package_data(3)
+        del packages[2]["receiver_phone"]
+
+        response = self.create(packages)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["packages"][2]["non_field_errors"], ["Receiver Phone number mandatory."])
+        self.assertNothingCreated()
+
+
+# Tests for the incrementally maintained order totals
+class OrderTotalTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+        cls.rider = make_driver().driverprofile
+
+    def setUp(self):
+        clear_caches()
+        self.client.force_authenticate(self.customer)
+        self.order = Order.objects.create(customer_id=self.customer)
+
+    def add_packages(self, values):
+        packages = [dict(data, value=value) for data, value in zip(package_data(len(values)), values)]
+        return self.client.post(
+            "/api/v1/package/create/",
+            {"order_id": self.order.id, "packages": packages},
+            format="json",
+        )
+
+    def test_adding_packages_adds_their_values(self):
+        self.add_packages(["10.10", "0.20"])
+        self.add_packages(["5"])
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_price, Decimal("15.30"))
+
+        response = self.client.get("/api/v1/search/order/")
+        # Rendered as a JSON number, not a string
+        self.assertEqual(json.loads(response.content)["results"][0]["total_price"], 15.3)
+
+    def test_package_cursor_pages_by_value(self):
+        self.add_packages([f"{value}.50" for value in range(15)])
+
+        page = self.client.get("/api/v1/search/package/?pagination=cursor").json()
+        values = [package["value"] for package in page["results"]]
+        page = self.client.get(page["next"]).json()
+        values += [package["value"] for package in page["results"]]
+
+        self.assertIsNone(page["next"])
+        self.assertEqual(values, [value + 0.5 for value in reversed(range(15))])
+
+    def test_rejects_sub_cent_values(self):
+        self.assertEqual(self.add_packages(["0.005"]).status_code, 400)
+
+    def test_cancelling_takes_off_undelivered_packages(self):
+        self.add_packages(["10", "20", "30"])
+        packages = Package.objects.filter(order_id=self.order).order_by("value")
+        Delivery.objects.bulk_create([
+            Delivery(id=delivery_id, package_id=package, rider=self.rider, delivery_status=status)
+            for delivery_id, package, status in zip(
+                generate_delivery_ids(2), packages, ["cancelled", "assigned"]
+            )
+        ])
+        # The already cancelled delivery was taken off earlier
+        Order.objects.filter(pk=self.order.pk).update(total_price=Decimal("50"))
+
+        response = self.client.put(
+            "/api/v1/order/cancel/",
+            {"order_id": self.order.id, "cancel_reason": "Mistaken Order"},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_price, Decimal("30"))
+
+    def test_import_sets_totals(self):
+        import_manifest(csv_manifest(2).splitlines(keepends=True), "csv", self.customer)
+
+        totals = Order.objects.exclude(pk=self.order.pk).values_list("total_price", flat=True)
+        self.assertEqual(list(totals), [Decimal("3.00"), Decimal("3.00")])
+
+    def test_recompute_command(self):
+        self.add_packages(["10", "20"])
+        Order.objects.filter(pk=self.order.pk).update(total_price=Decimal("99"))
+
+        with self.assertRaises(CommandError):
+            call_command("recompute_order_totals", "--check", stdout=io.StringIO())
+
+        call_command("recompute_order_totals", stdout=io.StringIO())
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_price, Decimal("30"))
+        call_command("recompute_order_totals", "--check", stdout=io.StringIO())
+
+
+# Tests for the time-ordered primary keys
+class IdGeneratorTests(TestCase):
+
+    def test_batches_are_sorted_and_unique(self):
+        generator = TimeOrderedIdGenerator()
+        ids = generator.generate_batch("PKG", 1000) + generator.generate_batch("PKG", 1000)
+
+        self.assertEqual(len(set(ids)), 2000)
+        self.assertEqual(ids, sorted(ids))
+        self.assertTrue(all(pk.startswith("PKG") for pk in ids))
+        self.assertEqual({len(pk) for pk in ids}, {Package._meta.pk.max_length})
+
+    def test_ids_sort_by_time(self):
+        generator = TimeOrderedIdGenerator()
+        with mock.patch("core.ids.time.time_ns", return_value=2_000_000_000_000_000_000):
+            later = generator.generate("ORD")
+
+        self.assertLess(TimeOrderedIdGenerator().generate("ORD"), later)
+
+    def test_clock_going_back_keeps_order(self):
+        generator = TimeOrderedIdGenerator()
+        first = generator.generate("DEL")
+        with mock.patch("core.ids.time.time_ns", return_value=0):
+            second = generator.generate("DEL")
+
+        self.assertLess(first, second)
+
+    def test_unused_ids_replace_taken_ones(self):
+        order = Order.objects.create(customer_id=make_customer())
+        batches = iter([[order.pk, "ORDNEW1"], ["ORDNEW2"]])
+
+        with self.assertNumQueries(2):
+            ids = unused_ids(Order, lambda count: next(batches), 2)
+
+        self.assertEqual(ids, ["ORDNEW1", "ORDNEW2"])
+
+    def test_models_use_the_generator(self):
+        order = Order.objects.create(customer_id=make_customer())
+        self.assertTrue(order.pk.startswith("ORD"))
+        self.assertLess(order.pk, generate_order_ids(1)[0])
+
+
+# The async search views must answer exactly as the sync ones do
+class AsyncSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+        cls.admin = make_admin()
+        other = make_customer("other@example.com")
+
+        for index in range(14):
+            order = Order.objects.create(customer_id=cls.customer, pickup_address=f"Accra {index}")
+            seed_packages(order, index % 3 + 1)
+        seed_packages(Order.objects.create(customer_id=other, pickup_address="Tema"), 2)
+
+    def setUp(self):
+        clear_caches()
+
+    def get(self, view_class, path, user):
+        request = APIRequestFactory().get(path)
+        force_authenticate(request, user)
+
+        view = view_class.as_view()
+        response = async_to_sync(view)(request) if view_class.view_is_async else view(request)
+        return response.render()
+
+    def assertSameResponse(self, sync_view, async_view, path, user):
+        expected = self.get(sync_view, path, user)
+        actual = self.get(async_view, path, user)
+
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(actual.content, expected.content)
+        return json.loads(actual.content)
+
+    def test_order_pages(self):
+        for path in ["/", "/?page=2", "/?ordering=total_price", "/?search=Accra 1"]:
+            for user in [self.customer, self.admin]:
+                with self.subTest(path=path, user=user.email):
+                    self.assertSameResponse(OrderListAPIView, AsyncOrderListAPIView, path, user)
+
+        first = self.assertSameResponse(OrderListAPIView, AsyncOrderListAPIView, "/", self.customer)
+        self.assertEqual(first["count"], 14)
+        self.assertTrue(all(order["packages"] for order in first["results"]))
+
+    def test_cursor_pages(self):
+        page = self.assertSameResponse(
+            OrderListAPIView, AsyncOrderListAPIView, "/?pagination=cursor", self.admin
+        )
+        ids = [order["id"] for order in page["results"]]
+
+        while page["next"]:
+            page = self.assertSameResponse(OrderListAPIView, AsyncOrderListAPIView, page["next"], self.admin)
+            ids += [order["id"] for order in page["results"]]
+
+        self.assertEqual(ids, list(Order.objects.order_by("-created_at", "id").values_list("id", flat=True)))
+
+    def test_package_pages(self):
+        for path in ["/", "/?page=2", "/?pagination=cursor", "/?fragile=false"]:
+            with self.subTest(path=path):
+                self.assertSameResponse(PackageListAPIView, AsyncPackageListAPIView, path, self.customer)
+
+    def test_errors(self):
+        for path in ["/?page=9", "/?cursor=bogus"]:
+            with self.subTest(path=path):
+                self.assertEqual(self.get(AsyncOrderListAPIView, path, self.customer).status_code, 404)
+
+        self.assertEqual(self.get(AsyncOrderListAPIView, "/", None).status_code, 401)
+
+    @override_settings(QUERY_BUDGET_HEADERS=True)
+    def test_asgi_request(self):
+        # Through the ASGI handler and the async-capable middleware
+        response = async_to_sync(AsyncClient().get)(
+            "/api/v1/search/order/",
+            headers={"Authorization": f"Bearer {AccessToken.for_user(self.customer)}"},
+        )
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()["count"], 14)
+        self.assertIn(QUERY_COUNT_HEADER, response)
+
+
+# Tests for driver claims and the tracked driver load
+class DriverLoadTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_customer()
+        cls.drivers = [make_driver(f"driver{index}@example.com") for index in range(3)]
+
+    def setUp(self):
+        clear_caches()
+
+    def loads(self):
+        return list(
+            DriverProfile.objects.filter(user__in=self.drivers).order_by("id").values_list("active_orders", flat=True)
+        )
+
+    def set_loads(self, *loads):
+        for driver, load in zip(self.drivers, loads):
+            DriverProfile.objects.filter(user=driver).update(active_orders=load)
+
+    def create_order(self):
+        response = self.client.post("/api/v1/order/create/", {"pickup_address": "Accra"}, format="json")
+        return Order.objects.get(pk=response.data["id"])
+
+    @mock.patch("order.services.MAX_OPEN_ORDERS_PER_DRIVER", 3)
+    def test_claims_the_least_loaded_driver(self):
+        self.set_loads(2, 0, 1)
+
+        self.assertEqual(claim_driver().user, self.drivers[1])
+        self.assertEqual(self.loads(), [2, 1, 1])
+
+        # Ties go to the lowest id
+        self.assertEqual(claim_driver().user, self.drivers[1])
+        self.assertEqual(claim_driver().user, self.drivers[2])
+        self.assertEqual(self.loads(), [2, 2, 2])
+
+        self.set_loads(3, 3, 3)
+        self.assertIsNone(claim_driver())
+        self.assertEqual(self.loads(), [3, 3, 3])
+
+    @mock.patch("order.services.MAX_OPEN_ORDERS_PER_DRIVER", 3)
+    def test_claims_drivers_in_one_batch(self):
+        self.set_loads(2, 0, 1)
+
+        with self.assertNumQueries(4):
+            drivers = claim_drivers(4)
+
+        # Same order as four claim_driver() calls
+        self.assertEqual(
+            [driver.user for driver in drivers],
+            [self.drivers[1], self.drivers[1], self.drivers[2], self.drivers[0]],
+        )
+        self.assertEqual(self.loads(), [3, 2, 2])
+
+        self.assertEqual([driver.user for driver in claim_drivers(5)], [self.drivers[1], self.drivers[2]])
+        self.assertEqual(claim_drivers(2), [])
+        self.assertEqual(self.loads(), [3, 3, 3])
+
+    def test_batch_claim_falls_back_when_a_driver_moved(self):
+        heapify = heapq.heapify
+
+        def concurrent_claim(heap):
+            # Another claim takes the first candidate after it was read
+            DriverProfile.objects.filter(user=self.drivers[0]).update(active_orders=1)
+            heapify(heap)
+
+        with mock.patch("order.services.heapq.heapify", side_effect=concurrent_claim):
+            drivers = claim_drivers(2)
+
+        # The batch was undone and the drivers claimed one at a time
+        self.assertEqual([driver.user for driver in drivers], [self.drivers[0], self.drivers[1]])
+        self.assertEqual(self.loads(), [1, 1, 0])
+
+    def test_load_follows_the_order(self):
+        self.set_loads(1, 1, 0)
+        driver = self.drivers[2]
+
+        self.client.force_authenticate(self.customer)
+        order = self.create_order()
+        self.assertEqual((order.driver_id.user, self.loads()), (driver, [1, 1, 1]))
+
+        response = self.client.put(
+            "/api/v1/order/cancel/", {"order_id": order.id, "cancel_reason": "Mistaken Order"}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.loads(), [1, 1, 0])
+
+        order = self.create_order()
+        self.assertEqual(self.loads(), [1, 1, 1])
+
+        packages = seed_packages(order, 2)
+        deliveries = Delivery.objects.bulk_create([
+            Delivery(id=delivery_id, package_id=package, rider=driver.driverprofile)
+            for delivery_id, package in zip(generate_delivery_ids(2), packages)
+        ])
+        add_order_deliveries(deliveries)
+
+        # Picking the order up frees the driver for the next claim
+        self.client.force_authenticate(driver)
+        response = self.client.put("/api/v1/order/update/", {"order_id": order.id, "status": "picked_up"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.loads(), [1, 1, 0])
+
+        for package in packages:
+            response = self.client.put(
+                "/api/v1/delivery/update/", {"package_id": package.id, "delivery_status": "delivered"}, format="json"
+            )
+            self.assertEqual(response.status_code, 201)
+
+        order.refresh_from_db()
+        self.assertEqual((order.order_status, self.loads()), (Order.Status.DELIVERED, [1, 1, 0]))
+
+    def test_profile_save_keeps_the_load(self):
+        profile = DriverProfile.objects.get(user=self.drivers[0])
+        DriverProfile.objects.filter(pk=profile.pk).update(active_orders=1)
+
+        # A stale instance saved by a profile edit
+        profile.vehicle_number = "MT-2"
+        profile.save()
+
+        profile.refresh_from_db()
+        self.assertEqual((profile.vehicle_number, profile.active_orders), ("MT-2", 1))
+
+    def test_rebuild_driver_load_repairs_drift(self):
+        Order.objects.create(
+            customer_id=self.customer,
+            driver_id=self.drivers[0].driverprofile,
+            order_status=Order.Status.ASSIGNED,
+        )
+        self.set_loads(0, 4, 0)
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_driver_load", "--check", stdout=io.StringIO())
+
+        output = io.StringIO()
+        call_command("rebuild_driver_load", stdout=output)
+
+        self.assertIn("Rebuilt 2 stale driver(s).", output.getvalue())
+        self.assertEqual(self.loads(), [1, 0, 0])
+        call_command("rebuild_driver_load", "--check", stdout=io.StringIO())
@@ -6,8 +6,15 @@ from .views import (
     OrderCancelAPIView,
     OrderListAPIView,
     PackageListAPIView,
-    OrderPickupUpdateAPIView
+    OrderPickupUpdateAPIView,
+    OrderExportAPIView,
+    PackageExportAPIView,
+    OrderImportAPIView,
+    OrderStatusStatsAPIView,
+    AsyncOrderListAPIView,
+    AsyncPackageListAPIView
     )
+from django.conf import settings
 from django.urls import path
 
 app_name = "order"
@@ -15,8 +22,20 @@ app_name = "order"
 
 urlpatterns = [
     path("v1/order/create/", OrderCreateAPIView.as_view(), name="create_order"),
-    path("v1/search/order/", OrderListAPIView.as_view(), name="search_order"),
-    path("v1/search/package/", PackageListAPIView.as_view(), name="search_package"),
+    path("v1/order/import/", OrderImportAPIView.as_view(), name="import_orders"),
+    path(
+        "v1/search/order/",
+        (AsyncOrderListAPIView if settings.ASYNC_VIEWS else OrderListAPIView).as_view(),
+        name="search_order",
+    ),
+    path(
+        "v1/search/package/",
+        (AsyncPackageListAPIView if settings.ASYNC_VIEWS else PackageListAPIView).as_view(),
+        name="search_package",
+    ),
+    path("v1/export/order/", OrderExportAPIView.as_view(), name="export_order"),
+    path("v1/export/package/", PackageExportAPIView.as_view(), name="export_package"),
+    path("v1/stats/orders/", OrderStatusStatsAPIView.as_view(), name="order_stats"),
     path("v1/order/assign/", OrderAssignAPIView.as_view(), name="assign_order"),
     path("v1/order/update/", OrderPickupUpdateAPIView.as_view(), name="update_order"),
     path("v1/order/cancel/", OrderCancelAPIView.as_view(), name="cancel_order"),
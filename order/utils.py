@@ -1,7 +1,15 @@
-import uuid
+from core.ids import new_id, new_ids
 
 def generate_package_id():
-    return f"PKG{uuid.uuid4().hex[:8].upper()}"
+    return new_id("PKG")
 
 def generate_order_id():
-    return f"ORD{uuid.uuid4().hex[:8].upper()}"
+    return new_id("ORD")
+
+def generate_package_ids(count):
+    # Pre-generate ids for bulk inserts (bulk_create skips save())
+    return new_ids("PKG", count)
+
+def generate_order_ids(count):
+    # Pre-generate ids for bulk inserts (bulk_create skips save())
+    return new_ids("ORD", count)
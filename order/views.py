@@ -1,7 +1,9 @@
+import codecs
 from rest_framework import viewsets, permissions,generics, filters as drf_filters
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Order, Package
+from .models import Order, OrderStatusCount, Package
 from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth import get_user_model
@@ -16,6 +18,9 @@ from .serializers import (
     OrderUpdateSerializer
 )
 from .filters import OrderFilter,PackageFilter
+from .imports import import_manifest, manifest_format
+from core.pagination import SearchPagination
+from core.mixins import AsyncValuesListMixin, StreamingExportMixin, ValuesListMixin
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from customer.permissions import (
     IsCustomer,
@@ -39,6 +44,8 @@ UserR = get_user_model()
 
 # View for Orders
 class OrderViewSet(viewsets.ModelViewSet):
+    # OrderSerializer nests the packages of every order
+    queryset = Order.objects.prefetch_related("packages")
     serializer_class = OrderSerializer
     permission_classes = [
         IsAuthenticated,
@@ -48,17 +55,19 @@ class OrderViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
+        queryset = super().get_queryset()
         if user.role == "admin":
-            return Order.objects.all()
-        return Order.objects.filter(customer=user)
+            return queryset
+        return queryset.filter(customer_id=user)
 
 
 class PackageViewSet(viewsets.ModelViewSet):
+    queryset = Package.objects.all()
     serializer_class = PackageSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Package.objects.filter(order__customer=self.request.user)
+        return super().get_queryset().filter(order_id__customer_id=self.request.user)
 
     def perform_create(self, serializer):
         order_id = self.kwargs.get("order_id")
@@ -203,10 +212,11 @@ class OrderCancelAPIView(APIView):
     description="Returns Orders depending on the logged-in user's role."
 )
 # View for order filtering search
-class OrderListAPIView(generics.ListAPIView):
+class OrderListAPIView(ValuesListMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated]
 
-    
+    # OrderSerializer nests the packages of every order
+    queryset = Order.objects.prefetch_related("packages")
     serializer_class = OrderSerializer
 
     filter_backends = [
@@ -223,16 +233,25 @@ class OrderListAPIView(generics.ListAPIView):
     def get_queryset(self):
 
         user = self.request.user
+        queryset = super().get_queryset()
         
         if user.is_staff:
-            return Order.objects.all()
+            return queryset
             
-        return Order.objects.filter(customer_id=user)
+        return queryset.filter(customer_id=user)
 
 
     ordering_fields = ['created_at', 'total_price']
     ordering = ['-created_at']
 
+    pagination_class = SearchPagination
+    cursor_ordering = ['-created_at', 'id']
+
+
+# Async view for order filtering search, served under ASGI
+class AsyncOrderListAPIView(AsyncValuesListMixin, OrderListAPIView):
+    pass
+
 
 # View for creating packages for orders
 class CreatePackagesAPIView(APIView):
@@ -352,8 +371,10 @@ class PackageDetailsUpdateAPIView(APIView):
     summary="Search Packages",
     description="Returns Packages depending on the logged-in user's role."
 )
-class PackageListAPIView(generics.ListAPIView):
+class PackageListAPIView(ValuesListMixin, generics.ListAPIView):
 
+    # PackageSerializer has no relations to join
+    queryset = Package.objects.all()
     serializer_class = PackageSerializer
     permission_classes = [IsAuthenticated]
 
@@ -375,17 +396,18 @@ class PackageListAPIView(generics.ListAPIView):
 
     def get_queryset(self):
         user = self.request.user
+        queryset = super().get_queryset()
 
         if user.role == "admin":
-            return Package.objects.all()
+            return queryset
 
         if user.role == "driver":
-            return Package.objects.filter(
-                order_id__deliveries__rider=user
+            return queryset.filter(
+                deliveries__rider__user=user
             )
 
         # customer
-        return Package.objects.filter(
+        return queryset.filter(
             order_id__customer_id=user
         )
     
@@ -395,6 +417,14 @@ class PackageListAPIView(generics.ListAPIView):
 
     ordering = ["-value"]
 
+    pagination_class = SearchPagination
+    cursor_ordering = ["-value", "id"]
+
+
+# Async view for package filtering search, served under ASGI
+class AsyncPackageListAPIView(AsyncValuesListMixin, PackageListAPIView):
+    pass
+
 
 
 class OrderPickupUpdateAPIView(APIView):
@@ -448,4 +478,118 @@ class OrderPickupUpdateAPIView(APIView):
         return Response(
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
-        )
\ No newline at end of file
+        )
+
+
+@extend_schema(
+    tags=["Admin"],
+    summary="Export Orders",
+    description="Streams every order matching the search filters as NDJSON (default) or CSV.",
+    parameters=[
+        OpenApiParameter(name="output", type=str, enum=["ndjson", "csv"], required=False),
+    ],
+    responses={200: OpenApiResponse(description="NDJSON or CSV stream")},
+)
+# View for streaming order exports
+class OrderExportAPIView(StreamingExportMixin, OrderListAPIView):
+    permission_classes = [IsAdminUser]
+    export_name = "orders"
+
+
+@extend_schema(
+    tags=["Admin"],
+    summary="Export Packages",
+    description="Streams every package matching the search filters as NDJSON (default) or CSV.",
+    parameters=[
+        OpenApiParameter(name="output", type=str, enum=["ndjson", "csv"], required=False),
+    ],
+    responses={200: OpenApiResponse(description="NDJSON or CSV stream")},
+)
+# View for streaming package exports
+class PackageExportAPIView(StreamingExportMixin, PackageListAPIView):
+    permission_classes = [IsAdminUser]
+    export_name = "packages"
+
+
+# View for importing orders with packages from a CSV/NDJSON manifest
+class OrderImportAPIView(APIView):
+    permission_classes = [IsAuthenticated, IsCustomerProfileComplete]
+    parser_classes = [MultiPartParser]
+
+    @extend_schema(
+        tags=["Orders"],
+        summary="Import Orders",
+        description=(
+            "Upload a CSV (one row per package, grouped by order_ref) or NDJSON "
+            "(one order per line) manifest as `manifest`. Valid orders are created "
+            "with their packages and deliveries; invalid ones are reported by row."
+        ),
+        request={
+            "multipart/form-data": {
+                "type": "object",
+                "properties": {"manifest": {"type": "string", "format": "binary"}},
+                "required": ["manifest"],
+            }
+        },
+        responses={201: OpenApiResponse(description="Import report")},
+        examples=[
+            OpenApiExample(
+                "Import Orders Response",
+                value={
+                    "orders_created": 1,
+                    "packages_created": 2,
+                    "orders": [{"order_ref": "A-1", "id": "ORDB..."}],
+                    "errors": [
+                        {
+                            "rows": [4],
+                            "order_ref": "A-2",
+                            "errors": {"packages": {"0": ["Receiver Phone number mandatory."]}}
+                        }
+                    ],
+                    "orders_failed": 1
+                },
+                response_only=True,
+            ),
+        ],
+    )
+
+    def post(self, request):
+        manifest = request.FILES.get("manifest")
+        if manifest is None:
+            return Response({"manifest": ["No manifest file was uploaded."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        fmt = manifest_format(manifest.name)
+        if fmt is None:
+            return Response(
+                {"manifest": ["Upload a .csv or .ndjson manifest."]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        report = import_manifest(
+            codecs.iterdecode(manifest, "utf-8-sig"),
+            fmt,
+            request.user,
+            context={"request": request}
+        )
+
+        return Response(
+            report,
+            status=status.HTTP_201_CREATED if report["orders_created"] else status.HTTP_400_BAD_REQUEST
+        )
+
+
+@extend_schema(
+    tags=["Admin"],
+    summary="Order Status Counts",
+    description="Number of orders in each status, read from the per-status rollup.",
+    responses={200: OpenApiResponse(description="Order counts per status")},
+)
+# View for the orders per status dashboard
+class OrderStatusStatsAPIView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        counts = dict.fromkeys(Order.Status.values, 0)
+        counts.update(OrderStatusCount.objects.values_list("order_status", "count"))
+
+        return Response({"counts": counts, "total": sum(counts.values())})